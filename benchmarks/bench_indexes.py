@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Query plans and timings for the payment hot-path lookups, before and after
+the 0002_hot_path_indexes migration.
+
+    python benchmarks/bench_indexes.py                      # 1M schedule rows on SQLite
+    python benchmarks/bench_indexes.py --rows 100000
+    python benchmarks/bench_indexes.py --database-url postgresql://...   # empty scratch DB
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, insert, text
+
+from database import Base
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from models.user_payments import UserPayments
+from migrations.m0002_hot_path_indexes import hot_path_indexes
+
+PERIODS = 36
+BATCH = 20000
+
+QUERIES = {
+    'window (loan_id, due_date)': (
+        "SELECT * FROM loan_tables WHERE loan_id = :loan_id "
+        "AND due_date >= :start AND due_date <= :end ORDER BY due_date LIMIT 2"
+    ),
+    'max(period) by loan_id': "SELECT max(period) FROM loan_tables WHERE loan_id = :loan_id",
+    'metadata by loan_id': "SELECT * FROM loan_metadata WHERE loan_id = :loan_id",
+    'metadata by user_id': "SELECT * FROM loan_metadata WHERE user_id = :user_id",
+    'payments (loan_id, payment_date)': (
+        "SELECT * FROM user_payments WHERE loan_id = :loan_id AND payment_date >= :start"
+    ),
+}
+
+
+def create_schema(engine):
+    tables = [LoanMetadata.__table__, LoanTables.__table__, UserPayments.__table__]
+    Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as connection:
+        for index in hot_path_indexes():
+            index.drop(bind=connection)
+
+
+def load_data(engine, n_rows):
+    n_loans = max(1, n_rows // PERIODS)
+    start = date(2024, 1, 15)
+    due_dates = [start + relativedelta(months=i) for i in range(PERIODS)]
+    metadata, rows, payments = [], [], []
+
+    def flush(connection, force=False):
+        if rows and (force or len(rows) >= BATCH):
+            connection.execute(insert(LoanTables), rows)
+            rows.clear()
+        if metadata and (force or len(metadata) >= BATCH):
+            connection.execute(insert(LoanMetadata), metadata)
+            metadata.clear()
+        if payments and (force or len(payments) >= BATCH):
+            connection.execute(insert(UserPayments), payments)
+            payments.clear()
+
+    with engine.begin() as connection:
+        for n in range(n_loans):
+            loan_id = f"loan-{n:08d}"
+            user_id = f"user-{n // 2:08d}"
+            metadata.append({
+                'user_id': user_id, 'loan_id': loan_id, 'amount': 10000, 'term': PERIODS,
+                'rate': 0.24, 'installment': 392.33, 'payed': 0, 'balance': 10000,
+                'defaulted_payments': 0, 'defaulted_amount': 0, 'start_date': due_dates[0],
+                'end_date': due_dates[-1], 'risk_distance': 1.2, 'risk_score': 24.0,
+                'risk_category': 'Low', 'closest_cluster': 0, 'user_risk': 75.0,
+            })
+            for period, due_date in enumerate(due_dates, start=1):
+                rows.append({
+                    'loan_id': loan_id, 'late_payment_fee': 0, 'service_fee': 0, 'insurance_fee': 0,
+                    'interest': 100.0, 'principal': 292.33, 'installment': 392.33, 'period': period,
+                    'due_date': due_date, 'payed_amount': 0, 'outstanding_balance': 0, 'status': 'pending',
+                })
+                if period <= 6:
+                    payments.append({
+                        'user_id': user_id, 'loan_id': loan_id, 'document_id': f"doc-{n}-{period}",
+                        'payment_date': due_date, 'payed_amount': 392.33,
+                    })
+            flush(connection)
+        flush(connection, force=True)
+    return n_loans
+
+
+def explain(connection, sql, params):
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = connection.execute(text(prefix + sql), params).all()
+    return ' | '.join(str(row[-1]) for row in rows)
+
+
+def run_queries(engine, n_loans, repeats):
+    rng = random.Random(42)
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            samples = []
+            for _ in range(repeats):
+                n = rng.randrange(n_loans)
+                params = {
+                    'loan_id': f"loan-{n:08d}", 'user_id': f"user-{n // 2:08d}",
+                    'start': date(2025, 1, 1), 'end': date(2025, 3, 31),
+                }
+                started = time.perf_counter()
+                connection.execute(text(sql), params).all()
+                samples.append(time.perf_counter() - started)
+            samples.sort()
+            results[name] = (samples[len(samples) // 2] * 1000, explain(connection, sql, params))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='loan_tables rows to generate')
+    parser.add_argument('--repeats', type=int, default=50, help='lookups per query')
+    parser.add_argument('--database-url', help='scratch database (tables are dropped and recreated)')
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.database_url
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    engine = create_engine(url)
+
+    create_schema(engine)
+    started = time.perf_counter()
+    n_loans = load_data(engine, args.rows)
+    print(f"Loaded {n_loans * PERIODS} schedule rows for {n_loans} loans in {time.perf_counter() - started:.1f}s")
+
+    before = run_queries(engine, n_loans, args.repeats)
+    with engine.begin() as connection:
+        for index in hot_path_indexes():
+            index.create(bind=connection)
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text('ANALYZE'))
+    after = run_queries(engine, n_loans, args.repeats)
+
+    print(f"\n{'query':<34} {'before ms':>10} {'after ms':>10} {'speedup':>9}")
+    for name in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<34} {b:>10.3f} {a:>10.3f} {b / a if a else float('inf'):>8.1f}x")
+    print("\nQuery plans")
+    for name in QUERIES:
+        print(f"- {name}\n    before: {before[name][1]}\n    after:  {after[name][1]}")
+
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
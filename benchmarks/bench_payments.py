@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Concurrent payment posting: N threads apply payments to a small set of hot
+loans through the single-transaction record path, then every loan's schedule
+is checked against the user_payments ledger for lost updates. The same
+payments are finally applied as one remittance batch for comparison.
+
+    python benchmarks/bench_payments.py --workers 1 4 8
+    python benchmarks/bench_payments.py --database-url postgresql://...   # empty scratch DB
+
+SQLite serializes writers, so its numbers only show the harness working;
+row locking is exercised on PostgreSQL.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, event, insert, select, func, exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from models.user_payments import UserPayments
+from services.payment_service import apply_payment
+from services.payment_ingest_service import ingest_payments
+from utils.date_utils import get_payment_date
+
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning)
+
+PERIODS = 12
+MAX_RETRIES = 20
+
+
+def create_schema(engine, n_loans):
+    tables = [LoanMetadata.__table__, LoanTables.__table__, UserPayments.__table__]
+    Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+    # Previous period due last month, current period due this month
+    first_due = get_payment_date() - relativedelta(months=1, days=10)
+    metadata, rows = [], []
+    for n in range(n_loans):
+        loan_id = f"loan-{n:06d}"
+        metadata.append({
+            'user_id': f"user-{n:06d}", 'loan_id': loan_id, 'amount': 12000, 'term': PERIODS, 'rate': 24.0,
+            'installment': 1100.0, 'payed': 0, 'balance': 12000, 'defaulted_payments': 0, 'defaulted_amount': 0,
+            'start_date': first_due, 'end_date': first_due + relativedelta(months=PERIODS - 1),
+            'risk_distance': 1.0, 'risk_score': 20.0, 'risk_category': 'Low', 'closest_cluster': 0, 'user_risk': 75.0,
+        })
+        for period in range(1, PERIODS + 1):
+            rows.append({
+                'loan_id': loan_id, 'late_payment_fee': 0, 'service_fee': 0, 'insurance_fee': 0,
+                'interest': 100.0, 'principal': 1000.0, 'installment': 1100.0, 'calc_installment': None,
+                'period': period, 'due_date': first_due + relativedelta(months=period - 1), 'payment_date': None,
+                'late_days': 0, 'payed_amount': 0, 'outstanding_balance': 0, 'consecutive_defaulted': 0,
+                'status': 'payed' if period == 1 else 'pending',
+            })
+    with engine.begin() as connection:
+        connection.execute(insert(LoanMetadata), metadata)
+        connection.execute(insert(LoanTables), rows)
+
+
+def post(Session, data):
+    """Apply one payment, retrying when the database reports a lock conflict"""
+    for attempt in range(MAX_RETRIES):
+        session = Session()
+        try:
+            apply_payment(session, data)
+            session.commit()
+            return attempt
+        except sa_exc.OperationalError:
+            session.rollback()
+            time.sleep(0.001 * (attempt + 1))
+        finally:
+            session.close()
+    raise RuntimeError(f"Payment {data['document_id']} kept conflicting")
+
+
+def lost_updates(engine):
+    """Loans whose current-period payed_amount disagrees with the payment ledger"""
+    with engine.connect() as connection:
+        ledger = dict(connection.execute(
+            select(UserPayments.loan_id, func.sum(UserPayments.payed_amount)).group_by(UserPayments.loan_id)
+        ).all())
+        schedule = dict(connection.execute(
+            select(LoanTables.loan_id, func.sum(LoanTables.payed_amount)).group_by(LoanTables.loan_id)
+        ).all())
+    return sum(1 for loan_id, total in ledger.items() if round(float(total), 2) != round(float(schedule[loan_id]), 2))
+
+
+def make_engine(url, workers):
+    if not url.startswith('sqlite'):
+        return create_engine(url, pool_size=workers, max_overflow=0)
+
+    # SQLite has no FOR UPDATE; take the write lock when the transaction
+    # begins so the locked read is not answered from a stale snapshot
+    engine = create_engine(url, connect_args={'timeout': 30, 'isolation_level': None})
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    return engine
+
+
+def make_payments(n_loans, n_payments):
+    rng = random.Random(7)
+    return [
+        {'loan_id': f"loan-{rng.randrange(n_loans):06d}", 'installment': 50.0, 'document_id': f"doc-{n}"}
+        for n in range(n_payments)
+    ]
+
+
+def run(url, workers, n_loans, n_payments):
+    engine = make_engine(url, workers)
+    create_schema(engine, n_loans)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    payments = make_payments(n_loans, n_payments)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        retries = sum(executor.map(lambda data: post(Session, data), payments))
+    elapsed = time.perf_counter() - started
+
+    lost = lost_updates(engine)
+    engine.dispose()
+    return n_payments / elapsed, retries, lost
+
+
+def run_batch(url, n_loans, n_payments):
+    engine = make_engine(url, 1)
+    create_schema(engine, n_loans)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    started = time.perf_counter()
+    report = ingest_payments(session, make_payments(n_loans, n_payments), get_payment_date())
+    elapsed = time.perf_counter() - started
+    session.close()
+
+    lost = lost_updates(engine)
+    engine.dispose()
+    return report['applied'] / elapsed, lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help='parallel payers per run')
+    parser.add_argument('--loans', type=int, default=20, help='hot loans the payments are spread over')
+    parser.add_argument('--payments', type=int, default=2000, help='payments posted per run')
+    parser.add_argument('--database-url', help='scratch database (tables are dropped and recreated)')
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.database_url
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    print(f"{'workers':>8} {'payments/s':>12} {'retries':>8} {'lost updates':>13}")
+    for workers in args.workers:
+        rate, retries, lost = run(url, workers, args.loans, args.payments)
+        print(f"{workers:>8} {rate:>12.1f} {retries:>8} {lost:>13}")
+    rate, lost = run_batch(url, args.loans, args.payments)
+    print(f"{'batch':>8} {rate:>12.1f} {'-':>8} {lost:>13}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
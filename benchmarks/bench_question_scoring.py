@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Questionnaire scoring: the previous recursive strategies (one call per
+question, list(self.data)[i] at each level, fresh instances per section)
+versus the stateless engine, one section at a time and as one batch per
+section type.
+
+    python benchmarks/bench_question_scoring.py             # 10k submissions
+    python benchmarks/bench_question_scoring.py --submissions 1000 --questions 40
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.question_scoring import QuestionScoring
+
+
+class LegacyDefault:
+    """Default.score_question before the rewrite"""
+
+    def __init__(self):
+        self.count = 0
+        self.data = {}
+
+    def apply_bias_correction(self, raw_score):
+        normalized = (raw_score - 1) / 4
+        corrected = 1 / (1 + math.exp(-6 * (normalized - 0.5)))
+        return 1 + (corrected * 8)
+
+    def score_question(self, *args, i=0):
+        section_data = args[0]
+        if isinstance(section_data, dict) and 'data' in section_data:
+            likert_data = section_data['data']
+        else:
+            likert_data = section_data
+        if len(self.data) == 0:
+            self.data = {**self.data, **dict(likert_data)}
+        if i == len(self.data):
+            if len(self.data) == 0:
+                return 5.0
+            return self.apply_bias_correction(self.count / len(self.data))
+        key = list(self.data)[i]
+        value = self.data[key]
+        try:
+            partial = int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
+        except (ValueError, TypeError):
+            partial = 3
+        self.count = self.count + partial
+        return self.score_question(self, args, i=i+1)
+
+
+class LegacyDemographics:
+    """DemographicsScoring.score_question before the rewrite"""
+
+    def __init__(self):
+        self.count = 0
+        self.data = {}
+        self.gender_multiplier = 1.0
+
+    def field_score(self, key):
+        data = self.data[key]
+        if key == 'gender':
+            if data == 'F':
+                self.gender_multiplier = 1.4
+                return 8.0
+            self.gender_multiplier = 1.0
+            return 3.0
+        elif key == 'occupation':
+            if data == 'Empleado':
+                return 8.0
+            elif data == 'Desempleado':
+                return 2.0
+            return 5.0
+        return 0.0
+
+    def score_question(self, *args, i=0):
+        if len(self.data) == 0:
+            self.data = {**self.data, **dict(args[0])}
+        relevant_data = {k: v for k, v in self.data.items() if k in ['gender', 'occupation']}
+        if i == len(relevant_data):
+            base_score = self.count / len(relevant_data) if len(relevant_data) > 0 else 4.0
+            return base_score * self.gender_multiplier
+        key = list(relevant_data)[i]
+        self.count = self.count + self.field_score(key)
+        return self.score_question(self, args, i=i+1)
+
+
+def make_submissions(n, questions, seed=42):
+    rng = random.Random(seed)
+    answers = [1, 2, 3, 4, 5, '1', '2', '3', '4', '5', '', None]
+    return [{
+        'demographics': {'gender': rng.choice(['F', 'M']), 'age': rng.randint(18, 70),
+                         'occupation': rng.choice(['Empleado', 'Desempleado', 'Independiente'])},
+        'section1': {'data': {f"q{q}": rng.choice(answers) for q in range(questions)}},
+        'section2': {'data': {f"q{q}": rng.choice(answers) for q in range(questions // 2)}},
+    } for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=10_000)
+    parser.add_argument('--questions', type=int, default=30, help='answers in section1 (section2 has half)')
+    args = parser.parse_args()
+
+    submissions = make_submissions(args.submissions, args.questions)
+    sections = [('demographics', LegacyDemographics), ('section1', LegacyDefault), ('section2', LegacyDefault)]
+
+    timings = {}
+    started = time.perf_counter()
+    expected = [[legacy().score_question(s[name]) for name, legacy in sections] for s in submissions]
+    timings['recursive'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scorers = {name: QuestionScoring(name) for name, _ in sections}
+    single = [[scorers[name].use_scoring(s[name]) for name, _ in sections] for s in submissions]
+    timings['engine, one by one'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = [scorers[name].score_batch([s[name] for s in submissions]) for name, _ in sections]
+    batch = [list(scores) for scores in zip(*columns)]
+    timings['engine, batch'] = time.perf_counter() - started
+
+    assert single == expected and batch == expected, 'engine scores differ from the recursion'
+    print(f"{args.submissions} submissions x 3 sections (scores identical to the recursion)")
+    print(f"{'path':<20} {'seconds':>9} {'submissions/s':>15} {'speedup':>9}")
+    base = timings['recursive']
+    for name, seconds in timings.items():
+        print(f"{name:<20} {seconds:>9.3f} {args.submissions / seconds:>15.0f} {base / seconds:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Risk model training: the previous pure-Python path (element-by-element
+standardization, first-k seeds, 10 fixed k-means iterations over lists of
+lists) versus the NumPy path (standardized matrix, k-means++ seeds, early
+stop on centroid shift), on synthetic non-defaulter survey scores; then
+re-scoring the same users one calculate_risk_distance call at a time versus
+one calculate_risk_distances batch. --memory adds the peak traced memory of
+in-memory training (records list + fit) versus fit_stream over chunks that
+are generated on the fly, as a database cursor would deliver them.
+
+    python benchmarks/bench_risk_model.py                    # 100k non-defaulters
+    python benchmarks/bench_risk_model.py --rows 20000
+    python benchmarks/bench_risk_model.py --skip-legacy      # NumPy path only
+    python benchmarks/bench_risk_model.py --skip-legacy --memory --rows 500000
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from utils.risk_distance_calculator import RiskDistanceCalculator
+
+logging.disable(logging.INFO)
+
+FEATURES = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity',
+            'futureOrientation', 'financialKnowledge', 'locusOfControl', 'socialInfluence',
+            'resilience', 'familismo', 'respect', 'risk_level']
+
+
+def make_non_defaulters(n, seed=42):
+    """Survey scores around a few respondent profiles"""
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(0).uniform(20, 80, size=(4, len(FEATURES)))
+    scores = centers[rng.integers(4, size=n)] + rng.normal(0, 8, size=(n, len(FEATURES)))
+    return [dict(zip(FEATURES, row)) for row in np.clip(scores, 0, 100).round(1).tolist()]
+
+
+def chunk_source(n, chunk_size=10_000):
+    """The same kind of rows, generated chunk by chunk on every pass"""
+    def chunks():
+        for start in range(0, n, chunk_size):
+            yield make_non_defaulters(min(chunk_size, n - start), seed=start)
+    return chunks
+
+
+def traced(run):
+    """(seconds, peak MB) of run()"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+def legacy_train(non_defaulters):
+    """RiskDistanceCalculator._initialize_model before the NumPy rewrite"""
+    features = [[float(nd.get(col, 0) or 0) for col in FEATURES] for nd in non_defaulters]
+    means, stds = [], []
+    for column in zip(*features):
+        mean = sum(column) / len(column)
+        variance = sum((x - mean) ** 2 for x in column) / len(column)
+        means.append(mean)
+        stds.append(math.sqrt(variance) if variance > 0 else 1)
+    points = [[(value - means[i]) / stds[i] for i, value in enumerate(row)] for row in features]
+
+    k = min(3, max(2, len(points) // 2))
+    centroids = points[:k]
+    for _ in range(10):
+        clusters = [[] for _ in range(k)]
+        for point in points:
+            distances = [math.sqrt(sum((a - b) ** 2 for a, b in zip(point, centroid))) for centroid in centroids]
+            clusters[distances.index(min(distances))].append(point)
+        centroids = [[sum(dim) / len(cluster) for dim in zip(*cluster)] if cluster else centroids[i]
+                     for i, cluster in enumerate(clusters)]
+    return points, np.array(centroids)
+
+
+def inertia(points, centroids):
+    """Mean squared distance to the closest centroid"""
+    points = np.asarray(points)
+    return float((((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)).min(axis=1).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--skip-legacy', action='store_true')
+    parser.add_argument('--memory', action='store_true', help='compare peak memory of in-memory and streaming training')
+    args = parser.parse_args()
+
+    non_defaulters = make_non_defaulters(args.rows)
+    results = {}
+
+    started = time.perf_counter()
+    calculator = RiskDistanceCalculator(non_defaulters)
+    seconds = time.perf_counter() - started
+    points = (calculator.feature_matrix(non_defaulters) - calculator.feature_means) / calculator.feature_stds
+    results['numpy k-means++'] = (seconds, inertia(points, calculator.non_defaulter_centroids))
+
+    if not args.skip_legacy:
+        started = time.perf_counter()
+        legacy_points, legacy_centroids = legacy_train(non_defaulters)
+        seconds = time.perf_counter() - started
+        results['pure python'] = (seconds, inertia(legacy_points, legacy_centroids))
+
+    print(f"{args.rows} non-defaulters x {len(FEATURES)} features")
+    print(f"{'path':<18} {'seconds':>9} {'inertia':>9}")
+    for name, (seconds, score) in results.items():
+        print(f"{name:<18} {seconds:>9.3f} {score:>9.3f}")
+    if 'pure python' in results:
+        print(f"speedup: {results['pure python'][0] / results['numpy k-means++'][0]:.1f}x")
+
+    started = time.perf_counter()
+    single = [calculator.calculate_risk_distance(user) for user in non_defaulters]
+    one_by_one = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = calculator.calculate_risk_distances(non_defaulters)
+    batched = time.perf_counter() - started
+    assert batch == single, 'batch scores differ from single-user scores'
+    print(f"scoring: {one_by_one:.3f}s one by one, {batched:.3f}s batched ({one_by_one / batched:.1f}x)")
+
+    if args.memory:
+        del non_defaulters, points, calculator, single, batch
+        print(f"{'training':<18} {'seconds':>9} {'peak MB':>9}")
+        seconds, peak = traced(lambda: RiskDistanceCalculator(make_non_defaulters(args.rows)))
+        print(f"{'in memory':<18} {seconds:>9.2f} {peak:>9.1f}")
+        seconds, peak = traced(lambda: RiskDistanceCalculator([]).fit_stream(chunk_source(args.rows)))
+        print(f"{'streaming':<18} {seconds:>9.2f} {peak:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Loan book ingestion: one save_table-style request per loan (prepare_data +
+two executemany INSERTs + commit) versus save_tables' columnar conversion
+and COPY (executemany off PostgreSQL), one transaction per chunk.
+
+    python benchmarks/bench_save_tables.py                  # 10k loans x 36 periods on SQLite
+    python benchmarks/bench_save_tables.py --loans 1000
+    python benchmarks/bench_save_tables.py --database-url postgresql://...   # empty scratch DB
+"""
+import argparse
+import copy
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, insert, exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from services.table_ingest_service import save_tables
+from utils.table_utils import prepare_data
+
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning)
+# The ingest service logs a line per run; keep the table readable
+logging.disable(logging.INFO)
+
+
+def make_loans(n_loans, periods):
+    start = date(2025, 1, 15)
+    due_dates = [(start + relativedelta(months=i)).isoformat() for i in range(periods)]
+    return [{
+        'metadata': {
+            'user_id': f"user-{n:08d}", 'amount': 10000, 'term': periods, 'rate': 24, 'risk_distance': 1.2,
+            'risk_score': 24.0, 'risk_category': 'Low', 'closest_cluster': 0, 'user_risk': 75.0,
+        },
+        'data': [{
+            'due_date': due_date, 'service_fee': 12.5, 'insurance_fee': 3.2, 'interest': 100.0,
+            'principal': 292.33, 'installment': 408.03, 'period': period, 'balance': 10000 - 292.33 * period,
+        } for period, due_date in enumerate(due_dates, start=1)],
+    } for n in range(n_loans)]
+
+
+def reset(engine):
+    tables = [LoanMetadata.__table__, LoanTables.__table__]
+    Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def per_request(Session, loans):
+    for loan in loans:
+        rows, metadata = prepare_data(loan)
+        session = Session()
+        session.execute(insert(LoanTables), rows)
+        session.execute(insert(LoanMetadata), metadata)
+        session.commit()
+        session.close()
+
+
+def batched(Session, loans, chunk_size):
+    session = Session()
+    report = save_tables(session, loans, chunk_size=chunk_size)
+    session.close()
+    assert report['rejected'] == 0, report['results'][:3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=10_000)
+    parser.add_argument('--periods', type=int, default=36)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='loans per transaction for save_tables')
+    parser.add_argument('--database-url', help='scratch database (tables are dropped and recreated)')
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.database_url
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    engine = create_engine(url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    loans = make_loans(args.loans, args.periods)
+    rows = args.loans * args.periods
+
+    timings = {}
+    for name, run in (('per-request save_table', lambda batch: per_request(Session, batch)),
+                      ('save_tables', lambda batch: batched(Session, batch, args.chunk_size))):
+        reset(engine)
+        batch = copy.deepcopy(loans)
+        started = time.perf_counter()
+        run(batch)
+        timings[name] = time.perf_counter() - started
+
+    print(f"{args.loans} loans x {args.periods} periods ({rows} rows) on {engine.dialect.name}")
+    print(f"{'path':<24} {'seconds':>9} {'rows/s':>11}")
+    for name, seconds in timings.items():
+        print(f"{name:<24} {seconds:>9.2f} {rows / seconds:>11.0f}")
+    base, new = timings['per-request save_table'], timings['save_tables']
+    print(f"speedup: {base / new:.1f}x")
+
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Read-path serialization: ORM to_dict + serialize_dates versus the Core
+column-tuple serializer, both ending in a JSON body.
+
+    python benchmarks/bench_serialization.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, insert, exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.loan_tables import LoanTables
+from utils.serialization import get_serializer, dumps
+from utils.table_utils import serialize_dates
+
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning)
+
+
+def load(session, n_rows):
+    start = date(2024, 1, 15)
+    rows = []
+    for n in range(n_rows):
+        period = n % 36 + 1
+        rows.append({
+            'loan_id': f"loan-{n // 36:08d}", 'late_payment_fee': 0, 'service_fee': 12.5, 'insurance_fee': 3.2,
+            'interest': 100.0, 'principal': 292.33, 'installment': 392.33, 'calc_installment': None,
+            'period': period, 'due_date': start + relativedelta(months=period - 1), 'payment_date': None,
+            'late_days': 0, 'payed_amount': 0, 'outstanding_balance': 0, 'consecutive_defaulted': 0,
+            'status': 'pending',
+        })
+    session.execute(insert(LoanTables), rows)
+    session.commit()
+
+
+def legacy(session):
+    rows = session.query(LoanTables).all()
+    return json.dumps(serialize_dates([serialize_dates(row.to_dict()) for row in rows]))
+
+
+def fast(session):
+    serializer = get_serializer(LoanTables)
+    return dumps(serializer.convert_all(session.execute(serializer.select()).all()))
+
+
+def best_of(fn, Session, repeats):
+    timings = []
+    for _ in range(repeats):
+        session = Session()
+        started = time.perf_counter()
+        body = fn(session)
+        timings.append(time.perf_counter() - started)
+        session.close()
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine, tables=[LoanTables.__table__])
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    load(session, args.rows)
+    session.close()
+
+    legacy_s, legacy_body = best_of(legacy, Session, args.repeats)
+    fast_s, fast_body = best_of(fast, Session, args.repeats)
+    assert json.loads(legacy_body) == json.loads(fast_body), 'serializers disagree'
+
+    print(f"rows: {args.rows}")
+    print(f"to_dict + serialize_dates: {legacy_s * 1000:8.1f} ms")
+    print(f"core column serializer:    {fast_s * 1000:8.1f} ms")
+    print(f"speedup:                   {legacy_s / fast_s:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,27 @@ echo "S3 Bucket: $S3_BUCKET"
 echo "Stack Name: $STACK_NAME"
 echo "Region: $AWS_REGION"
 
+# Apply schema migrations before the new code goes live
+if [ -z "$SKIP_MIGRATIONS" ]; then
+    echo "Applying schema migrations..."
+    DOPPLER_TOKEN=${DOPPLER_TOKEN} python3 manage.py migrate
+fi
+
+# The Lambda loads the risk model artifact at startup; fetch or train one, and stop if there is none
+RISK_MODEL_FILE="src/artifacts/risk_model.json"
+if [ -n "$RISK_MODEL_URI" ]; then
+    echo "Fetching risk model from $RISK_MODEL_URI..."
+    mkdir -p src/artifacts
+    aws s3 cp "$RISK_MODEL_URI" "$RISK_MODEL_FILE"
+elif [ -n "$RISK_MODEL_QUERY" ]; then
+    echo "Training risk model..."
+    DOPPLER_TOKEN=${DOPPLER_TOKEN} python3 manage.py train-risk-model --query "$RISK_MODEL_QUERY" --output "$RISK_MODEL_FILE" --publish
+fi
+if ! python3 manage.py check-risk-model --model "$RISK_MODEL_FILE"; then
+    echo "No valid risk model at $RISK_MODEL_FILE: set RISK_MODEL_URI (s3://...) or RISK_MODEL_QUERY, or run manage.py train-risk-model"
+    exit 1
+fi
+
 # Create deployment package
 echo "Creating deployment package..."
 rm -rf package/
@@ -29,7 +50,7 @@ python3 -m pip install \
 --implementation cp \
 --python-version 3.13 \
 --only-binary=:all: --upgrade \
-numpy pandas numpy-financial psycopg2-binary sqlalchemy requests
+numpy pandas numpy-financial psycopg2-binary sqlalchemy requests cryptography
 
 # Copy source code
 echo "Copying source code..."
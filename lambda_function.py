@@ -1,3 +1,4 @@
+import base64
 import json
 import logging
 import os
@@ -9,9 +10,19 @@ print("[MODULE] lambda_function.py loading...")
 sys.stdout.flush()
 
 from config import Config
+from utils.serialization import dumps
+from utils.cache import loan_cache
+from utils.amortization_engine import schedule_templates
+import database
 from database import init_db
 from services.table_service import get_table_by_id, get_tables, save_table, get_metadata, get_metadata_by_user_id, get_loan_by_loan_id
-from services.payment_service import record_payment, get_payment, end_of_month_update
+from services.payment_service import record_payment, get_payment, end_of_month_update, get_end_of_month_status
+from services.payment_ingest_service import record_payments_batch
+from services.table_ingest_service import save_tables_batch
+from services.quote_service import get_quote_grid
+from utils.risk_distance_calculator import refresh_risk_calculator
+from services.risk_scoring_service import score_risk_batch
+from services.portfolio_service import get_portfolio_summary
 
 # Configure logging for Lambda
 logging.basicConfig(
@@ -25,6 +36,18 @@ logger = logging.getLogger(__name__)
 # Initialize database connection
 db = init_db()
 
+# Load the trained risk model once per container instead of training on first use
+try:
+    refresh_risk_calculator()
+except (OSError, ValueError) as e:
+    logger.warning(f"Risk model not loaded at startup: {e}")
+
+# Request bodies passed through as raw text (remittance files) instead of parsed as JSON
+RAW_BODY_FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'jsonl', 'application/jsonl': 'jsonl'}
+
+# Seconds kept in reserve when a month-end slice runs against the Lambda timeout
+END_OF_MONTH_SAFETY_MARGIN = 5
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler for data-tracker service
@@ -35,11 +58,18 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         path = event.get('path') or event.get('rawPath', '/')
         body = event.get('body')
         path_parameters = event.get('pathParameters') or {}
+        query_params = event.get('queryStringParameters') or {}
         headers = event.get('headers') or {}
         origin = headers.get('origin') or headers.get('Origin')
 
+        content_type = (headers.get('content-type') or headers.get('Content-Type') or '').split(';')[0].strip()
+
         request_data = {}
-        if body:
+        if body and content_type in RAW_BODY_FORMATS:
+            if event.get('isBase64Encoded'):
+                body = base64.b64decode(body).decode('utf-8')
+            request_data = {'body': body, 'format': RAW_BODY_FORMATS[content_type], **query_params}
+        elif body:
             try:
                 request_data = json.loads(body)
             except json.JSONDecodeError:
@@ -48,18 +78,24 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if http_method == 'OPTIONS':
             return create_response(200, {}, origin)
 
-        return handle_route(http_method, path, path_parameters, request_data, origin)
+        return handle_route(http_method, path, path_parameters, request_data, origin, context, query_params, headers)
     except Exception as e:
         return create_response(500, {'error': 'Internal server error'}, None)
 
-def handle_route(http_method: str, path: str, path_parameters: Dict[str, Any], request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
+def handle_route(http_method: str, path: str, path_parameters: Dict[str, Any], request_data: Dict[str, Any], origin: str, context: Any = None, query_params: Dict[str, Any] = None, headers: Dict[str, Any] = None) -> Dict[str, Any]:
     """Handles routing logic for lambda_handler"""
     route_map = {
-        ('GET', '/get-tables'): lambda: handle_get_tables(origin),
+        ('GET', '/get-tables'): lambda: handle_get_tables(query_params, origin),
         ('POST', '/save-table'): lambda: handle_save_table(request_data, origin),
-        ('GET', '/get-metadata'): lambda: handle_get_metadata(origin),
-        ('POST', '/record-payment'): lambda: handle_record_payment(request_data, origin),
-        ('POST', '/end-of-month-update'): lambda: handle_end_of_month_update(origin),
+        ('POST', '/save-tables/batch'): lambda: handle_save_tables_batch(request_data, origin),
+        ('POST', '/quotes/grid'): lambda: handle_quote_grid(request_data, origin),
+        ('POST', '/risk-model/refresh'): lambda: handle_refresh_risk_model(origin),
+        ('POST', '/risk-scores/batch'): lambda: handle_score_risk_batch(request_data, origin),
+        ('GET', '/get-metadata'): lambda: handle_get_metadata(query_params, origin),
+        ('GET', '/portfolio/summary'): lambda: handle_portfolio_summary(query_params, origin),
+        ('POST', '/record-payment'): lambda: handle_record_payment(request_data, origin, headers),
+        ('POST', '/record-payments/batch'): lambda: handle_record_payments_batch(request_data, origin),
+        ('POST', '/end-of-month-update'): lambda: handle_end_of_month_update(request_data, origin, context),
     }
 
     # Exact match routes
@@ -75,6 +111,7 @@ def handle_route(http_method: str, path: str, path_parameters: Dict[str, Any], r
         ('GET', '/get-metadata-by-id/', handle_get_metadata_by_id),
         ('GET', '/get-loan-by-loan-id/', handle_get_loan_by_loan_id),
         ('GET', '/get-payment', handle_get_payment),
+        ('GET', '/end-of-month-status', handle_end_of_month_status),
     ]
     for method, prefix, handler in prefix_routes:
         if http_method == method and path.startswith(prefix):
@@ -84,12 +121,21 @@ def handle_route(http_method: str, path: str, path_parameters: Dict[str, Any], r
     return create_response(404, {'error': f'Endpoint not found: {http_method} {path}'}, origin)
 
 def handle_health(origin: str) -> Dict[str, Any]:
-    return create_response(200, {'status': 'healthy', 'service': 'data-tracker'}, origin)
+    schema = 'current' if database.schema_current else 'outdated'
+    return create_response(200, {
+        'status': 'healthy',
+        'service': 'data-tracker',
+        'schema': schema,
+        'cache': loan_cache.snapshot(),
+        'schedule_templates': schedule_templates.snapshot()
+    }, origin)
 
-def handle_get_tables(origin: str) -> Dict[str, Any]:
+def handle_get_tables(query_params: Dict[str, Any], origin: str) -> Dict[str, Any]:
     try:
-        result = get_tables()
+        result = get_tables(query_params)
         return create_response(200, result, origin)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
     except Exception as e:
         logger.error(f"Error logging tables: {str(e)}")
         return create_response(500, {'error': 'Internal server error'}, origin)
@@ -102,18 +148,78 @@ def handle_get_table_by_id(path: str, path_parameters: Dict[str, Any], origin: s
     return create_response(200, result, origin)
 
 def handle_save_table(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
-    logger.info(f"Saving table with data: {request_data}")
-    result = save_table(request_data)
+    metadata = request_data.get('metadata') or {}
+    source = 'terms' if request_data.get('terms') and not request_data.get('data') else f"{len(request_data.get('data') or [])} rows"
+    logger.info(f"Saving table for user {metadata.get('user_id')} from {source}")
+    try:
+        result = save_table(request_data)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    return create_response(200, result, origin)
+
+def handle_save_tables_batch(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    try:
+        result = save_tables_batch(request_data)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    except Exception as e:
+        logger.error(f"Error saving table batch: {str(e)}")
+        return create_response(500, {'error': 'Internal server error'}, origin)
+    logger.info(f"Saved {result['saved']}/{result['received']} loans")
+    return create_response(200, result, origin)
+
+def handle_quote_grid(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    try:
+        result = get_quote_grid(request_data)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    except Exception as e:
+        logger.error(f"Error computing quote grid: {str(e)}")
+        return create_response(500, {'error': 'Internal server error'}, origin)
+    return create_response(200, result, origin)
+
+def handle_refresh_risk_model(origin: str) -> Dict[str, Any]:
+    try:
+        model = refresh_risk_calculator()
+    except FileNotFoundError as e:
+        return create_response(404, {'error': f'Risk model artifact not found: {e.filename}'}, origin)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading risk model: {str(e)}")
+        return create_response(400, {'error': str(e)}, origin)
+    return create_response(200, {'model': model}, origin)
+
+def handle_score_risk_batch(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    try:
+        result = score_risk_batch(request_data)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    except RuntimeError as e:
+        return create_response(503, {'error': str(e)}, origin)
+    except Exception as e:
+        logger.error(f"Error scoring risk batch: {str(e)}")
+        return create_response(500, {'error': 'Internal server error'}, origin)
     return create_response(200, result, origin)
 
-def handle_get_metadata(origin: str) -> Dict[str, Any]:
+def handle_get_metadata(query_params: Dict[str, Any], origin: str) -> Dict[str, Any]:
     try:
-        result = get_metadata()
+        result = get_metadata(query_params)
         return create_response(200, result, origin)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
     except Exception as e:
         logger.error(f"Error logging metadata: {str(e)}")
         return create_response(500, {'error': 'Internal server error'}, origin)
 
+def handle_portfolio_summary(query_params: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    try:
+        result = get_portfolio_summary(query_params)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    except Exception as e:
+        logger.error(f"Error summarizing portfolio: {str(e)}")
+        return create_response(500, {'error': 'Internal server error'}, origin)
+    return create_response(200, result, origin)
+
 def handle_get_metadata_by_id(path: str, path_parameters: Dict[str, Any], origin: str) -> Dict[str, Any]:
     user_id = path_parameters.get('user_id') or path.split('/')[-1]
     result, status_code = get_metadata_by_user_id(user_id)
@@ -124,8 +230,10 @@ def handle_get_loan_by_loan_id(path: str, path_parameters: Dict[str, Any], origi
     result, status_code = get_loan_by_loan_id(loan_id)
     return create_response(status_code, result, origin)
 
-def handle_record_payment(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
-    result = record_payment(request_data)
+def handle_record_payment(request_data: Dict[str, Any], origin: str, headers: Dict[str, Any] = None) -> Dict[str, Any]:
+    headers = headers or {}
+    idempotency_key = headers.get('Idempotency-Key') or headers.get('idempotency-key')
+    result = record_payment(request_data, idempotency_key)
     try:
         test = json.dumps(result)
         logger.info(f"Current row: {test}")
@@ -133,6 +241,16 @@ def handle_record_payment(request_data: Dict[str, Any], origin: str) -> Dict[str
         logger.error(f"Error logging current row: {str(e)}")
     return create_response(200, result, origin)
 
+def handle_record_payments_batch(request_data: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    try:
+        result = record_payments_batch(request_data)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+    except Exception as e:
+        logger.error(f"Error recording payment batch: {str(e)}")
+        return create_response(500, {'error': 'Internal server error'}, origin)
+    return create_response(200, result, origin)
+
 def handle_get_payment(path, path_parameters: Dict[str, Any], origin: str) -> Dict[str, Any]:
     loan_id = path_parameters.get('loan_id') or path.split('/')[-2]
     month_offset = path_parameters.get('month_offset') or path.split('/')[-1]
@@ -145,20 +263,54 @@ def handle_get_payment(path, path_parameters: Dict[str, Any], origin: str) -> Di
         return create_response(500, {'error': 'Internal server error'}, origin)
     return create_response(200, result, origin)
 
-def handle_end_of_month_update(origin: str) -> Dict[str, Any]:
+def handle_end_of_month_update(request_data: Dict[str, Any], origin: str, context: Any = None) -> Dict[str, Any]:
     try:
-        result = end_of_month_update()
+        time_budget = None
+        if context is not None:
+            time_budget = context.get_remaining_time_in_millis() / 1000 - END_OF_MONTH_SAFETY_MARGIN
+        result = end_of_month_update(job_key=request_data.get('job_key'), time_budget=time_budget)
+        if result.get('continue') and context is not None:
+            continue_end_of_month_job(context, result['job_key'])
         return create_response(200, result, origin)
     except Exception as e:
         logger.error(f"Error in end of month update: {str(e)}")
         return create_response(500, {'error': 'Internal server error'}, origin)
 
+def continue_end_of_month_job(context: Any, job_key: str) -> None:
+    """Asynchronously re-invoke this function to pick the job up from its checkpoint"""
+    import boto3
+
+    event = {
+        'httpMethod': 'POST',
+        'path': '/end-of-month-update',
+        'body': json.dumps({'job_key': job_key})
+    }
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps(event)
+        )
+        logger.info(f"Re-invoked month-end job {job_key}")
+    except Exception as e:
+        # The checkpoint is committed; a manual POST with job_key resumes it
+        logger.error(f"Could not re-invoke month-end job {job_key}: {str(e)}")
+
+def handle_end_of_month_status(path: str, path_parameters: Dict[str, Any], origin: str) -> Dict[str, Any]:
+    job_key = path_parameters.get('job_key') or path.rstrip('/').split('/')[-1]
+    if job_key == 'end-of-month-status':
+        job_key = None
+    result = get_end_of_month_status(job_key)
+    if result is None:
+        return create_response(404, {'error': 'End of month job not found'}, origin)
+    return create_response(200, result, origin)
+
 def create_response(status_code: int, body: Dict[str, Any], origin: str = None) -> Dict[str, Any]:
     """Create a properly formatted API Gateway response"""
     headers = {
         'Content-Type': 'application/json',
         'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Origin'
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Origin, Idempotency-Key'
     }
     
     # Set CORS origin based on request origin
@@ -169,6 +321,6 @@ def create_response(status_code: int, body: Dict[str, Any], origin: str = None)
     return {
         'statusCode': status_code,
         'headers': headers,
-        'body': json.dumps(body)
+        'body': dumps(body)
     }
     
\ No newline at end of file
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Operational commands for the data-tracker service, run outside the Lambda"""
+import argparse
+import logging
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger('manage')
+
+
+def cmd_migrate(args):
+    from database import create_db_engine
+    from migrations import upgrade, check_schema, pending_migrations
+
+    engine = create_db_engine(args.database_url)
+    if args.check:
+        with engine.connect() as connection:
+            pending = [m.revision for m in pending_migrations(connection)]
+        for revision in pending:
+            print(f"pending: {revision}")
+        return 0 if check_schema(engine) else 1
+
+    applied = upgrade(engine)
+    if applied:
+        for revision in applied:
+            print(f"applied: {revision}")
+    else:
+        print("Schema is up to date")
+    return 0
+
+
+def cmd_month_end(args):
+    import json
+    from datetime import date
+    from services.month_end_job_service import run_parallel_job, COMPLETED
+
+    today = date.fromisoformat(args.date) if args.date else None
+    try:
+        report = run_parallel_job(
+            args.workers, database_url=args.database_url, chunk_size=args.chunk_size, job_key=args.job_key, today=today
+        )
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    if report is None:
+        print(f"No month-end job found: {args.job_key}" if args.job_key else "Not the last day of the month")
+        return 0 if not args.job_key else 1
+    print(json.dumps(report, indent=2))
+    return 0 if report['status'] == COMPLETED and report['failed_loans'] == 0 else 1
+
+
+def cmd_ingest_payments(args):
+    import json
+    from datetime import date
+    from database import create_db_engine
+    from sqlalchemy.orm import sessionmaker
+    from services.payment_ingest_service import parse_payments, ingest_payments
+
+    with open(args.file, encoding='utf-8') as f:
+        items = parse_payments(f.read(), args.format)
+    payment_date = date.fromisoformat(args.payment_date) if args.payment_date else None
+
+    engine = create_db_engine(args.database_url)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        report = ingest_payments(session, items, payment_date, chunk_size=args.chunk_size)
+    finally:
+        session.close()
+        engine.dispose()
+
+    if not args.verbose:
+        report['results'] = [result for result in report['results'] if result['code'] != 'applied']
+    print(json.dumps(report, indent=2))
+    return 0 if report['rejected'] == 0 else 1
+
+
+def cmd_ingest_tables(args):
+    import json
+    from database import create_db_engine
+    from sqlalchemy.orm import sessionmaker
+    from services.table_ingest_service import save_tables
+
+    with open(args.file, encoding='utf-8') as f:
+        text = f.read()
+    loans = json.loads(text) if text.lstrip().startswith('[') else [
+        json.loads(line) for line in text.splitlines() if line.strip()
+    ]
+
+    engine = create_db_engine(args.database_url)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        report = save_tables(session, loans, chunk_size=args.chunk_size)
+    finally:
+        session.close()
+        engine.dispose()
+
+    if not args.verbose:
+        report['results'] = [result for result in report['results'] if result['code'] != 'saved']
+    print(json.dumps(report, indent=2))
+    return 0 if report['rejected'] == 0 else 1
+
+
+def cmd_train_risk_model(args):
+    import json
+    from utils.risk_distance_calculator import RiskDistanceCalculator, save_model, query_chunk_source
+
+    calculator = RiskDistanceCalculator([], seed=args.seed)
+    if args.query:
+        # Streamed in chunks: memory stays bounded however many non-defaulters there are
+        from database import create_db_engine
+        from sqlalchemy import text
+        from sqlalchemy.orm import sessionmaker
+
+        engine = create_db_engine(args.database_url)
+        try:
+            trained = calculator.fit_stream(query_chunk_source(sessionmaker(bind=engine), text(args.query), args.chunk_size))
+        finally:
+            engine.dispose()
+    else:
+        if args.input:
+            with open(args.input, encoding='utf-8') as f:
+                content = f.read()
+            non_defaulters = json.loads(content) if content.lstrip().startswith('[') else [
+                json.loads(line) for line in content.splitlines() if line.strip()
+            ]
+        else:
+            from services.non_defaulter_service import get_all_non_defaulters
+            non_defaulters = get_all_non_defaulters()
+            if isinstance(non_defaulters, dict) and 'error' in non_defaulters:
+                logger.error(f"Could not load non-defaulters: {non_defaulters['error']}")
+                return 1
+        trained = calculator.fit(non_defaulters)
+
+    if not trained:
+        logger.error('Need at least two non-defaulters to train')
+        return 1
+    path = save_model(calculator, args.output)
+    if args.publish:
+        from database import create_db_engine
+        from sqlalchemy.orm import sessionmaker
+        from services.risk_model_store import publish_model
+
+        engine = create_db_engine(args.database_url)
+        session = sessionmaker(bind=engine)()
+        try:
+            publish_model(session, calculator)
+            session.commit()
+        finally:
+            session.close()
+            engine.dispose()
+    print(json.dumps({'path': path, 'published': args.publish, **calculator.model_info}, indent=2))
+    return 0
+
+
+def cmd_check_risk_model(args):
+    import json
+    from utils.risk_distance_calculator import load_model, model_path
+
+    path = args.model or model_path()
+    try:
+        calculator = load_model(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"No usable risk model at {path}: {e}")
+        return 1
+    print(json.dumps({'path': path, **calculator.model_info}, indent=2))
+    return 0
+
+
+def cmd_update_risk_model(args):
+    import json
+    from database import create_db_engine
+    from sqlalchemy import text
+    from sqlalchemy.orm import sessionmaker
+    from services.risk_update_service import apply_model_updates, query_feature_lookup
+
+    engine = create_db_engine(args.database_url)
+    features_engine = create_db_engine(args.features_database_url) if args.features_database_url else engine
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        lookup = query_feature_lookup(sessionmaker(bind=features_engine), text(args.features_query))
+        report = apply_model_updates(session, lookup, model_path=args.model, batch_size=args.batch_size)
+    finally:
+        session.close()
+        engine.dispose()
+        features_engine.dispose()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='data-tracker management commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help='Apply pending schema migrations')
+    migrate.add_argument('--database-url', help='Override the configured database (e.g. sqlite:///local.db)')
+    migrate.add_argument('--check', action='store_true', help='Only report pending migrations; exit 1 if behind')
+    migrate.set_defaults(func=cmd_migrate)
+
+    month_end = subparsers.add_parser('month-end', help="Run this month's month-end job using parallel workers")
+    month_end.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                           help='Worker processes, and shards of a new job (default: CPU count)')
+    month_end.add_argument('--chunk-size', type=int, default=500, help='Loans per transaction in each worker')
+    month_end.add_argument('--job-key', help='Resume this job (YYYY-MM) on any day')
+    month_end.add_argument('--date', help="Run as of this date (YYYY-MM-DD); a new job only starts on a month's last day")
+    month_end.add_argument('--database-url', help='Override the configured database')
+    month_end.set_defaults(func=cmd_month_end)
+
+    ingest = subparsers.add_parser('ingest-payments', help='Apply a bank remittance file (CSV or JSON lines)')
+    ingest.add_argument('file', help='Payments file; CSV needs a header with loan_id and installment (or amount)')
+    ingest.add_argument('--format', choices=['csv', 'jsonl'], help='File format (guessed from the content by default)')
+    ingest.add_argument('--chunk-size', type=int, default=500, help='Loans per transaction')
+    ingest.add_argument('--payment-date', help='Effective payment date (YYYY-MM-DD); defaults to today + 20 days')
+    ingest.add_argument('--database-url', help='Override the configured database')
+    ingest.add_argument('--verbose', action='store_true', help='List every result, not just rejected items')
+    ingest.set_defaults(func=cmd_ingest_payments)
+
+    tables = subparsers.add_parser('ingest-tables', help='Load many loan schedules (JSON list or JSON lines)')
+    tables.add_argument('file', help="Loans in save-table's {metadata, data} shape, one per line or as a JSON list")
+    tables.add_argument('--chunk-size', type=int, default=1000, help='Loans per transaction')
+    tables.add_argument('--database-url', help='Override the configured database')
+    tables.add_argument('--verbose', action='store_true', help='List every result, not just rejected loans')
+    tables.set_defaults(func=cmd_ingest_tables)
+
+    train = subparsers.add_parser('train-risk-model', help='Train the risk distance model and write its artifact')
+    train.add_argument('--input', help='Non-defaulter survey scores (JSON list or JSON lines); defaults to the survey service')
+    train.add_argument('--output', help='Artifact path (default: RISK_MODEL_PATH or src/artifacts/risk_model.json)')
+    train.add_argument('--query', help='SELECT returning the feature columns; streamed in chunks with bounded memory')
+    train.add_argument('--chunk-size', type=int, default=10000, help='Rows per chunk with --query')
+    train.add_argument('--database-url', help='Database for --query and --publish (defaults to the configured one)')
+    train.add_argument('--publish', action='store_true',
+                       help='Also publish the model to the database, where Lambdas load it on refresh')
+    train.add_argument('--seed', type=int, default=42, help='k-means++ seed')
+    train.set_defaults(func=cmd_train_risk_model)
+
+    check = subparsers.add_parser('check-risk-model', help='Load the risk model artifact; exit 1 if missing or invalid')
+    check.add_argument('--model', help='Artifact to check (default: RISK_MODEL_PATH or src/artifacts/risk_model.json)')
+    check.set_defaults(func=cmd_check_risk_model)
+
+    online = subparsers.add_parser('update-risk-model',
+                                   help='Fold finished loans into the risk model published in the database')
+    online.add_argument('features_query', help='SELECT user_id and the feature columns WHERE user_id IN :user_ids')
+    online.add_argument('--model', help='Artifact to start from when it is newer than the published model '
+                                        '(default: RISK_MODEL_PATH or src/artifacts/risk_model.json)')
+    online.add_argument('--batch-size', type=int, default=1000, help='Events folded (and published) per step')
+    online.add_argument('--database-url', help='Loan database holding the finished-loan queue')
+    online.add_argument('--features-database-url', help='Database for the features query (defaults to --database-url)')
+    online.set_defaults(func=cmd_update_risk_model)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
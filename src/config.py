@@ -1,27 +1,15 @@
 import os
-import requests
 import logging
+from secrets_provider import get_secrets_provider
 
 logger = logging.getLogger(__name__)
 
 def get_doppler_secret(key, default=None):
-    """Get secret from Doppler API"""
-    token = os.environ.get('DOPPLER_TOKEN')
-    if not token:
-        return default
-    
-    try:
-        response = requests.get(
-            'https://api.doppler.com/v3/configs/config/secrets/download',
-            headers={'Authorization': f'Bearer {token}'},
-            params={'format': 'json'}
-        )
-        response.raise_for_status()
-        secrets = response.json()
-        return secrets.get(key, default)
-    except Exception as e:
-        logger.error(f"Error getting Doppler secret {key}: {e}")
+    """Get secret from the cached Doppler bundle"""
+    provider = get_secrets_provider()
+    if provider is None:
         return default
+    return provider.get(key, default)
 
 class Config:
     @property
@@ -9,26 +9,28 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 engine = None
 SessionLocal = None
+schema_current = None
 
-def init_db():
+def create_db_engine(database_url=None):
+    """Create an engine for the configured database or an explicit URL"""
+    config = Config()
+    url = database_url or config.SQLALCHEMY_DATABASE_URI
+    # SQLite stand-ins (tests, offline migrations) don't take pool options
+    options = {} if url.startswith('sqlite') else config.SQLALCHEMY_ENGINE_OPTIONS
+    return create_engine(url, **options)
+
+def init_db(database_url=None):
     """Initialize database connection for Lambda"""
-    global engine, SessionLocal
+    global engine, SessionLocal, schema_current
     
     if engine is None:
-        config = Config()
-        engine = create_engine(
-            config.SQLALCHEMY_DATABASE_URI,
-            **config.SQLALCHEMY_ENGINE_OPTIONS
-        )
+        engine = create_db_engine(database_url)
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         
-        # Import all models to register them with Base
-        from models.loan_metadata import LoanMetadata
-        from models.loan_tables import LoanTables
-        from models.user_payments import UserPayments
-        
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=engine)
+        # Schema changes are applied ahead of deploy by `manage.py migrate`;
+        # here we only compare the stored fingerprint instead of running DDL
+        from migrations import check_schema
+        schema_current = check_schema(engine)
 
     return SessionLocal
 
@@ -0,0 +1,105 @@
+"""
+Versioned schema migrations.
+
+Migrations are applied ahead of deploy with `python manage.py migrate`. Each
+applied revision is recorded in `schema_version` together with a fingerprint
+of the whole migration chain up to it, so the Lambda only has to read one row
+at startup to know whether the schema matches the code.
+"""
+import hashlib
+import logging
+from datetime import datetime
+
+from sqlalchemy import Table, Column, String, DateTime, MetaData, select, insert, inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+from migrations import (
+    m0001_initial, m0002_hot_path_indexes, m0003_month_end_jobs, m0004_payment_requests, m0005_risk_model_events,
+    m0006_month_end_job_shards, m0007_risk_model_artifacts,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ordered list of migration modules; append new revisions at the end
+MIGRATIONS = [
+    m0001_initial,
+    m0002_hot_path_indexes,
+    m0003_month_end_jobs,
+    m0004_payment_requests,
+    m0005_risk_model_events,
+    m0006_month_end_job_shards,
+    m0007_risk_model_artifacts,
+]
+
+version_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', version_metadata,
+    Column('revision', String(100), primary_key=True),
+    Column('fingerprint', String(64), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def schema_fingerprint(upto=None):
+    """Cumulative fingerprint of the migration chain (up to `upto`, inclusive)"""
+    digest = hashlib.sha256()
+    for migration in MIGRATIONS:
+        digest.update(migration.revision.encode())
+        if migration.revision == upto:
+            break
+    return digest.hexdigest()
+
+
+def head_revision():
+    return MIGRATIONS[-1].revision
+
+
+def applied_revisions(connection):
+    """Return the set of revisions recorded in schema_version"""
+    if not inspect(connection).has_table(schema_version.name):
+        return set()
+    rows = connection.execute(select(schema_version.c.revision)).all()
+    return {row[0] for row in rows}
+
+
+def pending_migrations(connection):
+    applied = applied_revisions(connection)
+    return [m for m in MIGRATIONS if m.revision not in applied]
+
+
+def upgrade(engine):
+    """Apply every pending migration, one transaction per revision"""
+    version_metadata.create_all(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        pending = pending_migrations(connection)
+
+    applied = []
+    for migration in pending:
+        with engine.begin() as connection:
+            logger.info(f"Applying migration {migration.revision}")
+            migration.upgrade(connection)
+            connection.execute(insert(schema_version).values(
+                revision=migration.revision,
+                fingerprint=schema_fingerprint(migration.revision),
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.revision)
+    return applied
+
+
+def check_schema(engine):
+    """Cheap startup check: compare the head revision's fingerprint row"""
+    try:
+        with engine.connect() as connection:
+            stored = connection.execute(
+                select(schema_version.c.fingerprint).where(schema_version.c.revision == head_revision())
+            ).scalar()
+    except SQLAlchemyError as e:
+        logger.error(f"Could not read schema version: {str(e)}")
+        return False
+
+    if stored != schema_fingerprint():
+        logger.error(f"Database schema is not at revision {head_revision()}; run `python manage.py migrate`")
+        return False
+    return True
@@ -0,0 +1,18 @@
+"""Initial schema: the tables previously created by Base.metadata.create_all"""
+from database import Base
+
+revision = '0001_initial'
+
+
+def upgrade(connection):
+    # Import all models to register them with Base
+    from models.loan_metadata import LoanMetadata
+    from models.loan_tables import LoanTables
+    from models.user_payments import UserPayments
+
+    # checkfirst keeps this safe on databases created before migrations existed
+    Base.metadata.create_all(
+        bind=connection,
+        tables=[LoanMetadata.__table__, LoanTables.__table__, UserPayments.__table__],
+        checkfirst=True
+    )
@@ -0,0 +1,34 @@
+"""
+Composite indexes for the payment and metadata hot paths.
+
+The unique index on loan_metadata.loan_id fails if duplicate loan_ids exist;
+resolve those before applying this revision.
+"""
+revision = '0002_hot_path_indexes'
+
+
+INDEX_NAMES = [
+    'ix_loan_tables_loan_id_due_date',
+    'ix_loan_tables_loan_id_period',
+    'ux_loan_metadata_loan_id',
+    'ix_loan_metadata_user_id',
+    'ix_user_payments_loan_id_payment_date',
+]
+
+
+def hot_path_indexes():
+    from models.loan_metadata import LoanMetadata
+    from models.loan_tables import LoanTables
+    from models.user_payments import UserPayments
+
+    indexes = {
+        index.name: index
+        for table in (LoanTables.__table__, LoanMetadata.__table__, UserPayments.__table__)
+        for index in table.indexes
+    }
+    return [indexes[name] for name in INDEX_NAMES]
+
+
+def upgrade(connection):
+    for index in hot_path_indexes():
+        index.create(bind=connection, checkfirst=True)
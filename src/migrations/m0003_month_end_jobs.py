@@ -0,0 +1,10 @@
+"""Checkpoint table for resumable month-end jobs"""
+from database import Base
+
+revision = '0003_month_end_jobs'
+
+
+def upgrade(connection):
+    from models.month_end_job import MonthEndJob
+
+    Base.metadata.create_all(bind=connection, tables=[MonthEndJob.__table__], checkfirst=True)
@@ -0,0 +1,10 @@
+"""Idempotency records for payment posting"""
+from database import Base
+
+revision = '0004_payment_requests'
+
+
+def upgrade(connection):
+    from models.payment_request import PaymentRequest
+
+    Base.metadata.create_all(bind=connection, tables=[PaymentRequest.__table__], checkfirst=True)
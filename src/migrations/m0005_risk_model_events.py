@@ -0,0 +1,10 @@
+"""Finished-loan events feeding online risk model updates"""
+from database import Base
+
+revision = '0005_risk_model_events'
+
+
+def upgrade(connection):
+    from models.risk_model_event import RiskModelEvent
+
+    Base.metadata.create_all(bind=connection, tables=[RiskModelEvent.__table__], checkfirst=True)
@@ -0,0 +1,10 @@
+"""Per-shard checkpoints for month-end jobs run by parallel workers"""
+from database import Base
+
+revision = '0006_month_end_job_shards'
+
+
+def upgrade(connection):
+    from models.month_end_job_shard import MonthEndJobShard
+
+    Base.metadata.create_all(bind=connection, tables=[MonthEndJobShard.__table__], checkfirst=True)
@@ -0,0 +1,10 @@
+"""Shared risk model artifact read by every Lambda on startup and refresh"""
+from database import Base
+
+revision = '0007_risk_model_artifacts'
+
+
+def upgrade(connection):
+    from models.risk_model_artifact import RiskModelArtifact
+
+    Base.metadata.create_all(bind=connection, tables=[RiskModelArtifact.__table__], checkfirst=True)
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date
+from sqlalchemy import Column, Integer, String, Numeric, Date, Index
 from database import Base
 
 class LoanMetadata(Base):
     __tablename__ = 'loan_metadata'
+    __table_args__ = (
+        Index('ux_loan_metadata_loan_id', 'loan_id', unique=True),
+        Index('ix_loan_metadata_user_id', 'user_id'),
+    )
 
     nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
     user_id = Column(String(150), nullable=False)
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date
+from sqlalchemy import Column, Integer, String, Numeric, Date, Index
 from database import Base
 
 class LoanTables(Base):
     __tablename__ = 'loan_tables'
-    
+    __table_args__ = (
+        # Current schedule window lookups in payment_service
+        Index('ix_loan_tables_loan_id_due_date', 'loan_id', 'due_date'),
+        # max(period) by loan in calculate_period
+        Index('ix_loan_tables_loan_id_period', 'loan_id', 'period'),
+    )
+
     nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
     loan_id = Column(String(150), nullable=False)
     late_payment_fee = Column(Numeric, nullable=True)
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime
+from database import Base
+
+class MonthEndJob(Base):
+    __tablename__ = 'month_end_jobs'
+
+    nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
+    job_key = Column(String(20), unique=True, nullable=False)  # YYYY-MM of the month being closed
+    status = Column(String(20), nullable=False)
+    payment_date = Column(Date, nullable=False)
+    cursor_loan_id = Column(String(150), nullable=True)  # last loan_id committed
+    total_loans = Column(Integer, nullable=False)
+    updated_loans = Column(Integer, nullable=False, default=0)
+    skipped_loans = Column(Integer, nullable=False, default=0)
+    failed_loans = Column(Integer, nullable=False, default=0)
+    chunks = Column(Integer, nullable=False, default=0)
+    invocations = Column(Integer, nullable=False, default=0)
+    processing_seconds = Column(Numeric, nullable=False, default=0)
+    last_error = Column(String(500), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    def to_dict(self):
+        processed = self.updated_loans + self.skipped_loans + self.failed_loans
+        seconds = float(self.processing_seconds or 0)
+        return {
+            'job_key': self.job_key,
+            'status': self.status,
+            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
+            'cursor_loan_id': self.cursor_loan_id,
+            'total_loans': self.total_loans,
+            'processed_loans': processed,
+            'updated_loans': self.updated_loans,
+            'skipped_loans': self.skipped_loans,
+            'failed_loans': self.failed_loans,
+            'progress': round(min(100.0, processed * 100.0 / self.total_loans), 2) if self.total_loans else 100.0,
+            'chunks': self.chunks,
+            'invocations': self.invocations,
+            'processing_seconds': round(seconds, 3),
+            'loans_per_second': round(self.updated_loans / seconds, 1) if seconds > 0 else 0.0,
+            'last_error': self.last_error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
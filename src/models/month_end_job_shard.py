@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Index
+from database import Base
+
+class MonthEndJobShard(Base):
+    """Checkpoint of one worker's shard when a month-end job is run by parallel workers"""
+    __tablename__ = 'month_end_job_shards'
+    __table_args__ = (
+        Index('ux_month_end_job_shards_job_key_shard', 'job_key', 'shard', unique=True),
+    )
+
+    nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
+    job_key = Column(String(20), nullable=False)
+    shard = Column(Integer, nullable=False)
+    shards = Column(Integer, nullable=False)  # shard_for(loan_id, shards) == shard
+    status = Column(String(20), nullable=False)
+    cursor_loan_id = Column(String(150), nullable=True)  # last loan_id of this shard committed
+    updated_loans = Column(Integer, nullable=False, default=0)
+    skipped_loans = Column(Integer, nullable=False, default=0)
+    failed_loans = Column(Integer, nullable=False, default=0)
+    chunks = Column(Integer, nullable=False, default=0)
+    processing_seconds = Column(Numeric, nullable=False, default=0)
+    last_error = Column(String(500), nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'shard': self.shard,
+            'status': self.status,
+            'cursor_loan_id': self.cursor_loan_id,
+            'updated_loans': self.updated_loans,
+            'skipped_loans': self.skipped_loans,
+            'failed_loans': self.failed_loans,
+            'chunks': self.chunks,
+            'processing_seconds': round(float(self.processing_seconds or 0), 3),
+            'last_error': self.last_error,
+        }
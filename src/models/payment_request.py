@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from database import Base
+
+class PaymentRequest(Base):
+    """Stored outcome of a posted payment, replayed when the same request is retried"""
+    __tablename__ = 'payment_requests'
+    __table_args__ = (
+        Index('ux_payment_requests_request_key', 'request_key', unique=True),
+    )
+
+    nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
+    request_key = Column(String(300), nullable=False)  # Idempotency-Key header or loan_id:document_id
+    loan_id = Column(String(150), nullable=False)
+    document_id = Column(String(150), nullable=True)
+    response = Column(Text, nullable=True)  # JSON body returned to the first request
+    created_at = Column(DateTime, nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from database import Base
+
+class RiskModelArtifact(Base):
+    """The shared risk model: published by train-risk-model / update-risk-model, read by every Lambda"""
+    __tablename__ = 'risk_model_artifacts'
+
+    nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)  # 'default' is the model scoring uses
+    artifact = Column(Text, nullable=False)  # RiskDistanceCalculator.to_artifact() as JSON
+    trained_at = Column(String(40), nullable=True)
+    online_updates = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
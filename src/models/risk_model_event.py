@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from database import Base
+
+class RiskModelEvent(Base):
+    """A loan that finished fully paid, waiting to be folded into the risk model's centroids"""
+    __tablename__ = 'risk_model_events'
+    __table_args__ = (
+        Index('ux_risk_model_events_loan_id', 'loan_id', unique=True),
+        Index('ix_risk_model_events_applied_at', 'applied_at'),
+    )
+
+    nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
+    loan_id = Column(String(150), nullable=False)
+    user_id = Column(String(150), nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    applied_at = Column(DateTime, nullable=True)  # NULL until an update run has processed it
+    outcome = Column(String(20), nullable=True)  # applied / no_features
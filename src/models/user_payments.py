@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date
+from sqlalchemy import Column, Integer, String, Numeric, Date, Index
 from database import Base
 
 class UserPayments(Base):
     __tablename__ = 'user_payments'
+    __table_args__ = (
+        Index('ix_user_payments_loan_id_payment_date', 'loan_id', 'payment_date'),
+    )
 
     nrow = Column(Integer, unique=True, autoincrement=True, primary_key=True)
     user_id = Column(String(150), nullable=False)
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+logger = logging.getLogger(__name__)
+
+DOPPLER_SECRETS_URL = 'https://api.doppler.com/v3/configs/config/secrets/download'
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_TIMEOUT_SECONDS = 3
+DEFAULT_SNAPSHOT_PATH = '/tmp/doppler-secrets.bin'
+BOOTSTRAP_BACKOFF_SECONDS = 1.0
+MAX_BOOTSTRAP_BACKOFF_SECONDS = 60.0
+
+
+_NONCE_SIZE = 12
+_SNAPSHOT_AAD = b'doppler-snapshot-v1'
+
+
+def _snapshot_key(token):
+    """AES-256 key for the snapshot, derived from the Doppler token with HKDF"""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_SNAPSHOT_AAD).derive(token.encode())
+
+
+def encrypt_snapshot(token, payload):
+    """AES-GCM encrypt a secrets bundle so it can be parked in /tmp"""
+    nonce = os.urandom(_NONCE_SIZE)
+    return nonce + AESGCM(_snapshot_key(token)).encrypt(nonce, payload, _SNAPSHOT_AAD)
+
+
+def decrypt_snapshot(token, blob):
+    """Decrypt a snapshot, returning None if it was tampered with or written under another token"""
+    if len(blob) <= _NONCE_SIZE:
+        return None
+    try:
+        return AESGCM(_snapshot_key(token)).decrypt(blob[:_NONCE_SIZE], blob[_NONCE_SIZE:], _SNAPSHOT_AAD)
+    except InvalidTag:
+        return None
+
+
+class SecretsProvider:
+    """
+    Per-process cache for the Doppler secrets bundle.
+
+    The bundle is downloaded once and kept in memory for `ttl` seconds. Once
+    stale it keeps being served while a background thread refreshes it. Every
+    successful download is also written to an AES-GCM encrypted snapshot in
+    /tmp, readable by the owner only, so a re-initialised container can start without waiting on the
+    network. A failed first load is retried after a backoff (1 s doubling up
+    to 60 s); calls in between get an empty bundle instead of blocking.
+    """
+
+    def __init__(self, token, ttl=DEFAULT_TTL_SECONDS, timeout=DEFAULT_TIMEOUT_SECONDS,
+                 snapshot_path=DEFAULT_SNAPSHOT_PATH):
+        self.token = token
+        self.ttl = ttl
+        self.timeout = timeout
+        self.snapshot_path = snapshot_path
+        self._bundle = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.stats = {
+            'fetches': 0,
+            'fetch_failures': 0,
+            'background_refreshes': 0,
+            'snapshot_loads': 0,
+            'backoff_skips': 0,
+            'last_fetch_ms': None,
+        }
+
+    def get(self, key, default=None):
+        """Get a single secret from the cached bundle"""
+        return self.get_bundle().get(key, default)
+
+    def get_bundle(self):
+        """Return the cached bundle, loading or refreshing it as needed"""
+        bundle = self._bundle
+        if bundle is None:
+            if time.monotonic() < self._retry_at:
+                self.stats['backoff_skips'] += 1
+                return {}
+            with self._lock:
+                if self._bundle is None and time.monotonic() >= self._retry_at:
+                    self._bootstrap()
+            return self._bundle or {}
+        if self._is_stale():
+            self._refresh_in_background()
+        return bundle
+
+    def _is_stale(self):
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    def _bootstrap(self):
+        """First load: prefer the on-disk snapshot, fall back to Doppler"""
+        snapshot = self._load_snapshot()
+        if snapshot is not None:
+            self._bundle, age = snapshot
+            self._fetched_at = time.monotonic() - age
+            self.stats['snapshot_loads'] += 1
+            if self._is_stale():
+                self._refresh_in_background()
+            return
+        if self._refresh():
+            self._backoff = 0.0
+            return
+        self._backoff = min(max(self._backoff * 2, BOOTSTRAP_BACKOFF_SECONDS), MAX_BOOTSTRAP_BACKOFF_SECONDS)
+        self._retry_at = time.monotonic() + self._backoff
+        logger.warning(f"Doppler bootstrap failed; retrying in {self._backoff:g} s")
+
+    def _refresh(self):
+        """Download the bundle synchronously; keep the old one on failure"""
+        started = time.perf_counter()
+        try:
+            response = requests.get(
+                DOPPLER_SECRETS_URL,
+                headers={'Authorization': f'Bearer {self.token}'},
+                params={'format': 'json'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            bundle = response.json()
+        except Exception as e:
+            self.stats['fetch_failures'] += 1
+            logger.error(f"Error fetching Doppler secrets: {e}")
+            return False
+        finally:
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.stats['last_fetch_ms'] = elapsed_ms
+
+        self._bundle = bundle
+        self._fetched_at = time.monotonic()
+        self.stats['fetches'] += 1
+        logger.info(f"Fetched Doppler secrets bundle in {elapsed_ms} ms")
+        self._save_snapshot(bundle)
+        return True
+
+    def _refresh_in_background(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self.stats['background_refreshes'] += 1
+        self._refresh_thread = threading.Thread(target=self._refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def _load_snapshot(self):
+        """Return (bundle, age_seconds) from the snapshot file, or None"""
+        try:
+            fd = os.open(self.snapshot_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+            with os.fdopen(fd, 'rb') as f:
+                info = os.fstat(f.fileno())
+                if info.st_uid != os.getuid() or info.st_mode & 0o077:
+                    logger.warning("Ignoring Doppler snapshot readable by other users")
+                    return None
+                blob = f.read()
+            age = max(0.0, time.time() - info.st_mtime)
+        except OSError:
+            return None
+        payload = decrypt_snapshot(self.token, blob)
+        if payload is None:
+            logger.warning("Ignoring Doppler snapshot that failed verification")
+            return None
+        try:
+            bundle = json.loads(payload)
+        except ValueError:
+            return None
+        return (bundle, age) if isinstance(bundle, dict) else None
+
+    def _save_snapshot(self, bundle):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}"
+        try:
+            blob = encrypt_snapshot(self.token, json.dumps(bundle).encode())
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                os.fchmod(f.fileno(), 0o600)  # O_CREAT's mode does not apply to an existing file
+                f.write(blob)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write Doppler snapshot: {e}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_secrets_provider():
+    """Return the process-wide provider, or None when no Doppler token is set"""
+    global _provider
+    token = os.environ.get('DOPPLER_TOKEN')
+    if not token:
+        return None
+    if _provider is None or _provider.token != token:
+        with _provider_lock:
+            if _provider is None or _provider.token != token:
+                _provider = SecretsProvider(
+                    token,
+                    ttl=float(os.environ.get('DOPPLER_SECRETS_TTL', DEFAULT_TTL_SECONDS)),
+                    timeout=float(os.environ.get('DOPPLER_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)),
+                    snapshot_path=os.environ.get('DOPPLER_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+                )
+    return _provider
@@ -0,0 +1,65 @@
+import json
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, insert
+from models.payment_request import PaymentRequest
+from utils.serialization import dumps
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+
+def request_key(data, idempotency_key=None):
+    """
+    Dedupe key for a payment: the client's Idempotency-Key when given,
+    otherwise loan_id + document_id. None when the request can't be keyed.
+    """
+    if idempotency_key:
+        return f"key:{idempotency_key}"
+    loan_id, document_id = data.get('loan_id'), data.get('document_id')
+    if loan_id and document_id:
+        return f"doc:{loan_id}:{document_id}"
+    return None
+
+
+def find_response(session, key):
+    """Stored response for `key`, or None if the request hasn't been applied"""
+    stored = session.execute(
+        select(PaymentRequest.response).where(PaymentRequest.request_key == key)
+    ).scalar_one_or_none()
+    return json.loads(stored) if stored is not None else None
+
+
+def find_applied_keys(session, keys):
+    """The subset of `keys` already recorded, in one query"""
+    if not keys:
+        return set()
+    return set(session.execute(
+        select(PaymentRequest.request_key).where(PaymentRequest.request_key.in_(keys))
+    ).scalars())
+
+
+def save_responses(session, entries):
+    """
+    Record (key, data, response) entries in the caller's transaction.
+
+    A concurrent request that already stored the same key makes the commit
+    fail with IntegrityError, and the caller replays that request's response.
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    session.execute(insert(PaymentRequest.__table__), [{
+        'request_key': key,
+        'loan_id': data.get('loan_id'),
+        'document_id': data.get('document_id') or None,
+        'response': dumps(response),
+        'created_at': now,
+    } for key, data, response in entries])
@@ -5,6 +5,7 @@ from sqlalchemy import update
 from models.loan_metadata import LoanMetadata
 from database import get_db_session, close_db_session
 from utils.amortization_utils import safe_float
+from utils.cache import loan_keys, invalidate_on_commit
 
 # Configure logging for Lambda
 logging.basicConfig(
@@ -41,6 +42,7 @@ def update_loan_metadata(loan_id, current_row, session=None):
             payed=new_payed
         )
         session.execute(stmt)
+        invalidate_on_commit(session, loan_keys(loan_id, metadata.user_id))
         session.commit()
         
         logger.info(f"Updated metadata for loan {loan_id}: balance={new_balance}, payed={new_payed}")
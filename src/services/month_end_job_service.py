@@ -0,0 +1,290 @@
+import bisect
+import calendar
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_metadata import LoanMetadata
+from models.month_end_job import MonthEndJob
+from models.month_end_job_shard import MonthEndJobShard
+from services.month_end_service import fetch_loan_chunk, process_loan_chunk, shard_for, DEFAULT_CHUNK_SIZE
+from utils.date_utils import get_payment_date
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+RUNNING = 'running'
+COMPLETED = 'completed'
+
+
+def is_last_day_of_month(today):
+    return today.day == calendar.monthrange(today.year, today.month)[1]
+
+
+def get_job(session, job_key=None):
+    """Job for `job_key`, or the most recently started one"""
+    query = session.query(MonthEndJob)
+    if job_key:
+        return query.filter_by(job_key=job_key).first()
+    return query.order_by(MonthEndJob.started_at.desc()).first()
+
+
+def get_shards(session, job_key):
+    """Shard checkpoints of a job run by parallel workers; empty for a Lambda job"""
+    return session.query(MonthEndJobShard).filter_by(job_key=job_key).order_by(MonthEndJobShard.shard).all()
+
+
+def start_or_resume_job(session, job_key=None, today=None, shards=None):
+    """
+    Return the job to work on.
+
+    An explicit `job_key` resumes that job on any day. Without one, this
+    month's job is resumed or, on the last day of the month, created; with
+    `shards`, a new job is created with one checkpoint per shard for
+    parallel workers. Returns None when there is nothing to start.
+    """
+    today = today or date.today()
+    if job_key:
+        return get_job(session, job_key)
+
+    job_key = today.strftime('%Y-%m')
+    job = get_job(session, job_key)
+    if job is not None or not is_last_day_of_month(today):
+        return job
+
+    now = datetime.utcnow()
+    job = MonthEndJob(
+        job_key=job_key,
+        status=RUNNING,
+        payment_date=get_payment_date(today=today),
+        cursor_loan_id=None,
+        total_loans=session.execute(select(func.count()).select_from(LoanMetadata)).scalar(),
+        updated_loans=0,
+        skipped_loans=0,
+        failed_loans=0,
+        chunks=0,
+        invocations=0,
+        processing_seconds=0,
+        started_at=now,
+        updated_at=now
+    )
+    session.add(job)
+    session.add_all([
+        MonthEndJobShard(job_key=job_key, shard=shard, shards=shards, status=RUNNING, updated_loans=0,
+                         skipped_loans=0, failed_loans=0, chunks=0, processing_seconds=0, updated_at=now)
+        for shard in range(shards or 0)
+    ])
+    session.commit()
+    logger.info(f"Started month-end job {job_key} for {job.total_loans} loans"
+                + (f" in {shards} shards" if shards else ''))
+    return job
+
+
+def _lock_job(session, job_key):
+    return session.execute(
+        select(MonthEndJob).where(MonthEndJob.job_key == job_key).with_for_update()
+    ).scalar_one()
+
+
+def run_job_slice(session, job_key, time_budget=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Process chunks of a job until it completes or `time_budget` seconds run out.
+
+    Each chunk's schedule/metadata writes and the cursor advance commit in one
+    transaction while the job row is locked, so every loan is rolled exactly
+    once even if an invocation is killed or two slices race. Returns the job
+    status plus `continue`, which is True when work remains and the slice
+    stopped only because its budget ran out.
+    """
+    started = time.perf_counter()
+    last_chunk_seconds = 0.0
+
+    job = _lock_job(session, job_key)
+    if get_shards(session, job_key):
+        session.commit()
+        logger.warning(f"Month-end job {job_key} is run by parallel workers (manage.py month-end); not rolling here")
+        return {**job.to_dict(), 'continue': False}
+    job.invocations += 1
+    session.commit()
+
+    stopped_on_budget = False
+    while True:
+        if time_budget is not None and time.perf_counter() - started + last_chunk_seconds >= time_budget:
+            stopped_on_budget = True
+            break
+
+        chunk_started = time.perf_counter()
+        job = _lock_job(session, job_key)
+        if job.status == COMPLETED:
+            session.commit()
+            break
+
+        try:
+            loan_ids = fetch_loan_chunk(session, job.cursor_loan_id, chunk_size)
+            if not loan_ids:
+                job.status = COMPLETED
+                job.completed_at = datetime.utcnow()
+                job.updated_at = job.completed_at
+                session.commit()
+                logger.info(f"Month-end job {job_key} completed")
+                break
+
+            counts = process_loan_chunk(session, loan_ids, job.payment_date)
+            last_chunk_seconds = time.perf_counter() - chunk_started
+            job.cursor_loan_id = loan_ids[-1]
+            job.updated_loans += counts['updated_loans']
+            job.skipped_loans += counts['skipped_loans']
+            job.failed_loans += counts['failed_loans']
+            job.chunks += 1
+            job.processing_seconds = float(job.processing_seconds or 0) + last_chunk_seconds
+            job.last_error = None
+            job.updated_at = datetime.utcnow()
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error in month-end job {job_key}: {str(e)}")
+            job = _lock_job(session, job_key)
+            job.last_error = str(e)[:500]
+            job.updated_at = datetime.utcnow()
+            session.commit()
+            break
+
+    job = get_job(session, job_key)
+    return {**job.to_dict(), 'continue': stopped_on_budget and job.status != COMPLETED}
+
+
+def _lock_shard(session, job_key, shard):
+    return session.execute(
+        select(MonthEndJobShard).where(MonthEndJobShard.job_key == job_key, MonthEndJobShard.shard == shard)
+        .with_for_update()
+    ).scalar_one()
+
+
+def run_job_shard(database_url, job_key, shard, loan_ids, payment_date, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Worker entry point: roll one shard's loans (`loan_ids`, sorted) with a private engine.
+
+    Like run_job_slice, each chunk's writes and the shard cursor advance
+    commit in one transaction while the shard row is locked, so a re-run or
+    a duplicate worker continues after the last committed loan.
+    """
+    from database import create_db_engine
+
+    engine = create_db_engine(database_url)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        while True:
+            chunk_started = time.perf_counter()
+            checkpoint = _lock_shard(session, job_key, shard)
+            if checkpoint.status == COMPLETED:
+                session.commit()
+                break
+            start = 0 if checkpoint.cursor_loan_id is None else bisect.bisect_right(loan_ids, checkpoint.cursor_loan_id)
+            chunk_ids = loan_ids[start:start + chunk_size]
+            try:
+                if not chunk_ids:
+                    checkpoint.status = COMPLETED
+                    checkpoint.updated_at = datetime.utcnow()
+                    session.commit()
+                    break
+
+                counts = process_loan_chunk(session, chunk_ids, payment_date)
+                checkpoint.cursor_loan_id = chunk_ids[-1]
+                checkpoint.updated_loans += counts['updated_loans']
+                checkpoint.skipped_loans += counts['skipped_loans']
+                checkpoint.failed_loans += counts['failed_loans']
+                checkpoint.chunks += 1
+                checkpoint.processing_seconds = float(checkpoint.processing_seconds or 0) + time.perf_counter() - chunk_started
+                checkpoint.last_error = None
+                checkpoint.updated_at = datetime.utcnow()
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                logger.error(f"Error in month-end job {job_key} shard {shard}: {str(e)}")
+                checkpoint = _lock_shard(session, job_key, shard)
+                checkpoint.last_error = str(e)[:500]
+                checkpoint.updated_at = datetime.utcnow()
+                session.commit()
+                break
+        return _lock_shard(session, job_key, shard).to_dict()
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def run_parallel_job(workers, database_url=None, chunk_size=DEFAULT_CHUNK_SIZE, job_key=None, today=None):
+    """
+    Run a month-end job with loans sharded by hash across worker processes.
+
+    Goes through the same job row and last-day-of-month guard as the Lambda:
+    a new job gets one checkpoint per shard, a re-run resumes only the
+    unfinished shards, and a completed job rolls nothing. A job the Lambda
+    started raises RuntimeError. Returns the job report, or None when there
+    is nothing to start.
+    """
+    from database import create_db_engine
+
+    started = time.perf_counter()
+    engine = create_db_engine(database_url)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        job = start_or_resume_job(session, job_key, today=today, shards=workers)
+        if job is None:
+            return None
+        job_key, payment_date = job.job_key, job.payment_date
+        checkpoints = get_shards(session, job_key)
+        if not checkpoints:
+            raise RuntimeError(f"Month-end job {job_key} was started by /end-of-month-update; continue it there")
+
+        shards = checkpoints[0].shards
+        pending = [checkpoint.shard for checkpoint in checkpoints if checkpoint.status != COMPLETED]
+        shard_ids = {shard: [] for shard in pending}
+        if pending:
+            # Sorted here rather than by the database collation: workers bisect their cursor into these lists
+            for loan_id in sorted(session.execute(select(LoanMetadata.loan_id)).scalars()):
+                shard = shard_for(loan_id, shards)
+                if shard in shard_ids:
+                    shard_ids[shard].append(loan_id)
+        session.commit()
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = [
+                    executor.submit(run_job_shard, database_url, job_key, shard, shard_ids[shard], payment_date, chunk_size)
+                    for shard in pending
+                ]
+                for future in futures:
+                    future.result()
+
+        job = _lock_job(session, job_key)
+        checkpoints = get_shards(session, job_key)
+        for field in ('updated_loans', 'skipped_loans', 'failed_loans', 'chunks'):
+            setattr(job, field, sum(getattr(checkpoint, field) for checkpoint in checkpoints))
+        job.processing_seconds = float(job.processing_seconds or 0) + time.perf_counter() - started  # Wall clock
+        job.last_error = next((c.last_error for c in checkpoints if c.last_error), None)
+        job.invocations += 1
+        job.updated_at = datetime.utcnow()
+        if job.status != COMPLETED and all(checkpoint.status == COMPLETED for checkpoint in checkpoints):
+            job.status = COMPLETED
+            job.completed_at = job.updated_at
+        session.commit()
+
+        report = {**job.to_dict(), 'workers': workers, 'shards': [checkpoint.to_dict() for checkpoint in checkpoints]}
+    finally:
+        session.close()
+        engine.dispose()
+
+    report['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Parallel month-end job {job_key} is {report['status']}: {report['updated_loans']} loans rolled "
+                f"with {workers} workers")
+    return report
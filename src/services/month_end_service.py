@@ -0,0 +1,182 @@
+import logging
+import sys
+import time
+import zlib
+from decimal import Decimal
+
+from sqlalchemy import select, func, insert
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from utils.amortization_utils import settle_period
+from utils.bulk_utils import bulk_update
+from utils.cache import loan_keys, invalidate_on_commit
+from utils.date_utils import get_payment_date, get_schedule_window
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Schedule columns written back by the month-end roll
+ROLL_COLUMNS = ['late_payment_fee', 'calc_installment', 'outstanding_balance', 'late_days', 'consecutive_defaulted', 'status']
+
+
+def _as_dict(row):
+    return {k: float(v) if isinstance(v, Decimal) else v for k, v in row._mapping.items()}
+
+
+def fetch_loan_chunk(session, after_loan_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """loan_ids of the next chunk ordered by loan_id, starting after `after_loan_id`"""
+    stmt = select(LoanMetadata.loan_id).order_by(LoanMetadata.loan_id).limit(chunk_size)
+    if after_loan_id is not None:
+        stmt = stmt.where(LoanMetadata.loan_id > after_loan_id)
+    return session.execute(stmt).scalars().all()
+
+
+def fetch_loans(session, loan_ids, lock=False):
+    """Month-end inputs for an explicit list of loans, ordered by loan_id; `lock` takes FOR UPDATE"""
+    stmt = select(
+        LoanMetadata.loan_id, LoanMetadata.user_id, LoanMetadata.balance, LoanMetadata.payed, LoanMetadata.rate
+    ).where(LoanMetadata.loan_id.in_(loan_ids)).order_by(LoanMetadata.loan_id)
+    if lock:
+        stmt = stmt.with_for_update()
+    return [_as_dict(row) for row in session.execute(stmt)]
+
+
+def fetch_schedule_windows(session, loan_ids, start_date, end_date):
+    """Current two-row schedule window and max period for many loans in one query"""
+    table = LoanTables.__table__
+    ranked = select(
+        *table.c,
+        func.row_number().over(
+            partition_by=table.c.loan_id, order_by=(table.c.due_date, table.c.nrow)
+        ).label('window_rank')
+    ).where(
+        table.c.loan_id.in_(loan_ids),
+        table.c.due_date >= start_date,
+        table.c.due_date <= end_date,
+    ).subquery()
+    max_periods = select(
+        table.c.loan_id, func.max(table.c.period).label('max_period')
+    ).where(table.c.loan_id.in_(loan_ids)).group_by(table.c.loan_id).subquery()
+
+    stmt = select(ranked, max_periods.c.max_period).join(
+        max_periods, max_periods.c.loan_id == ranked.c.loan_id
+    ).where(ranked.c.window_rank <= 2).order_by(ranked.c.loan_id, ranked.c.window_rank)
+
+    windows = {}
+    for row in session.execute(stmt):
+        values = _as_dict(row)
+        values.pop('window_rank')
+        max_period = values.pop('max_period')
+        window = windows.setdefault(values['loan_id'], {'rows': [], 'max_period': max_period})
+        window['rows'].append(values)
+    return windows
+
+
+def roll_loan(loan, window, payment_date, payment=0.0):
+    """
+    Apply calculate_current_row's rules to one loan in memory.
+
+    Returns the schedule row update, the metadata update and the extension
+    row to insert (or None), without touching the database.
+    """
+    res, metadata_update, extension = settle_period(loan, window, payment_date, payment)
+    schedule_update = {'nrow': res['nrow'], **{c: res.get(c) for c in ROLL_COLUMNS}}
+    return schedule_update, metadata_update, extension
+
+
+def process_loan_chunk(session, loan_ids, payment_date):
+    """
+    Roll a chunk of loans and stage the bulk writes; the caller commits.
+
+    The loans are locked FOR UPDATE before their balances and schedule
+    windows are read, so a payment committing meanwhile waits for the chunk
+    instead of being overwritten by its absolute writes.
+    """
+    loans = fetch_loans(session, loan_ids, lock=True)
+    start_date, end_date = get_schedule_window(payment_date)
+    windows = fetch_schedule_windows(session, [loan['loan_id'] for loan in loans], start_date, end_date)
+
+    schedule_updates, metadata_updates, extensions = [], [], []
+    failed = 0
+    skipped = len(loan_ids) - len(loans)  # Deleted since the chunk was listed
+    for loan in loans:
+        window = windows.get(loan['loan_id'])
+        if not window:
+            skipped += 1
+            continue
+        try:
+            schedule_update, metadata_update, extension = roll_loan(loan, window, payment_date)
+        except Exception as e:
+            logger.error(f"Error rolling loan {loan['loan_id']}: {str(e)}")
+            failed += 1
+            continue
+        schedule_updates.append(schedule_update)
+        metadata_updates.append(metadata_update)
+        if extension:
+            extensions.append(extension)
+
+    invalidate_on_commit(session, [
+        key for loan in loans for key in loan_keys(loan['loan_id'], loan.get('user_id'))
+    ])
+    bulk_update(session, LoanTables.__table__, 'nrow', schedule_updates)
+    bulk_update(session, LoanMetadata.__table__, 'loan_id', metadata_updates)
+    if extensions:
+        session.execute(insert(LoanTables.__table__), extensions)
+
+    return {'updated_loans': len(metadata_updates), 'skipped_loans': skipped, 'failed_loans': failed}
+
+
+def new_report():
+    return {'updated_loans': 0, 'skipped_loans': 0, 'failed_loans': 0, 'chunks': 0}
+
+
+def add_counts(report, counts):
+    for key in ('updated_loans', 'skipped_loans', 'failed_loans'):
+        report[key] += counts[key]
+    report['chunks'] += 1
+    return report
+
+
+def finish_report(report, elapsed):
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['loans_per_second'] = round(report['updated_loans'] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+
+def run_month_end(session, chunk_size=DEFAULT_CHUNK_SIZE, payment_date=None):
+    """Roll every loan forward in keyset-ordered chunks, one commit per chunk"""
+    payment_date = payment_date or get_payment_date()
+    report = new_report()
+    started = time.perf_counter()
+    after_loan_id = None
+
+    while True:
+        loan_ids = fetch_loan_chunk(session, after_loan_id, chunk_size)
+        if not loan_ids:
+            break
+        try:
+            counts = process_loan_chunk(session, loan_ids, payment_date)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error processing month-end chunk after {after_loan_id}: {str(e)}")
+            counts = {'updated_loans': 0, 'skipped_loans': 0, 'failed_loans': len(loan_ids)}
+        add_counts(report, counts)
+        after_loan_id = loan_ids[-1]
+
+    finish_report(report, time.perf_counter() - started)
+    logger.info(f"Month-end rolled {report['updated_loans']} loans at {report['loans_per_second']} loans/s")
+    return report
+
+
+def shard_for(loan_id, shards):
+    """Stable shard number for a loan_id"""
+    return zlib.crc32(loan_id.encode()) % shards
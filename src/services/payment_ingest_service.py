@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from models.user_payments import UserPayments
+from database import get_db_session, close_db_session
+from services.month_end_service import fetch_loans, fetch_schedule_windows
+from services.idempotency_service import request_key, find_applied_keys, save_responses
+from services.risk_update_service import loan_finished, queue_finished_loans
+from utils.amortization_utils import settle_period, safe_float
+from utils.bulk_utils import bulk_update
+from utils.cache import loan_keys, invalidate_on_commit
+from utils.date_utils import get_payment_date, get_schedule_window
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Per-item result codes
+APPLIED = 'applied'
+INVALID = 'invalid'
+NOT_FOUND = 'not_found'
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+
+
+def parse_payments(text, fmt=None):
+    """
+    Payment items from a remittance file body.
+
+    `fmt` is 'jsonl' or 'csv'; when omitted it is guessed from the first
+    non-blank character. CSV files need a header row naming the fields.
+    """
+    text = text.lstrip('﻿')
+    if fmt is None:
+        fmt = 'jsonl' if text.lstrip().startswith('{') else 'csv'
+    if fmt == 'jsonl':
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    raise ValueError(f"Unsupported payment file format: {fmt}")
+
+
+def normalize_payment(item):
+    """Validated payment dict; raises ValueError for unusable items"""
+    if not isinstance(item, dict):
+        raise ValueError('payment must be an object')
+    loan_id = str(item.get('loan_id') or '').strip()
+    if not loan_id:
+        raise ValueError('loan_id is required')
+    try:
+        amount = safe_float(item.get('installment', item.get('amount')))
+    except (TypeError, ValueError):
+        raise ValueError('installment must be a number')
+    if amount <= 0:
+        raise ValueError('installment must be positive')
+    value_date = item.get('payment_date')
+    try:
+        value_date = date.fromisoformat(value_date) if value_date else None
+    except (TypeError, ValueError):
+        raise ValueError('payment_date must be a date (YYYY-MM-DD)')
+    payment = {
+        'loan_id': loan_id,
+        'user_id': item.get('user_id') or '',
+        'document_id': item.get('document_id') or '',
+        'installment': amount,
+        # Orders a loan's payments; the effective date is the batch's
+        'value_date': value_date,
+    }
+    payment['request_key'] = request_key(payment, item.get('idempotency_key'))
+    return payment
+
+
+def _result(index, item, code, **extra):
+    return {'index': index, 'loan_id': item.get('loan_id'), 'document_id': item.get('document_id'), 'code': code, **extra}
+
+
+def _stored_row(res, payment_date):
+    """calculate_period output back in loan_tables column types"""
+    return {**res, 'due_date': date.fromisoformat(res['due_date']), 'payment_date': payment_date}
+
+
+def apply_payment_chunk(session, batch, payment_date):
+    """
+    Apply the payments for one chunk of loans; the caller commits.
+
+    `batch` maps loan_id to its [(index, payment)] in application order.
+    Loans are locked FOR UPDATE, payments already recorded under their
+    idempotency key are skipped, every other payment for a loan is chained
+    in memory, and the final schedule rows, metadata, extension rows,
+    UserPayments and idempotency records land in one bulk statement each.
+    Returns per-item results.
+    """
+    start_date, end_date = get_schedule_window(payment_date)
+    loan_ids = sorted(batch)
+    loans = {loan['loan_id']: loan for loan in fetch_loans(session, loan_ids, lock=True)}
+    windows = fetch_schedule_windows(session, loan_ids, start_date, end_date)
+    applied_keys = find_applied_keys(session, [
+        item['request_key'] for loan_id in loan_ids for _, item in batch[loan_id] if item['request_key']
+    ])
+
+    rows, metadata, extensions, payments, responses, results, finished = {}, {}, [], [], [], [], {}
+    for loan_id in loan_ids:
+        loan, window = loans.get(loan_id), windows.get(loan_id)
+        if loan is None or window is None:
+            results.extend(_result(index, item, NOT_FOUND) for index, item in batch[loan_id])
+            continue
+
+        current = 0 if len(window['rows']) == 1 else 1
+        for index, item in batch[loan_id]:
+            if item['request_key'] in applied_keys:
+                results.append(_result(index, item, DUPLICATE))
+                continue
+            res, metadata_update, extension = settle_period(loan, window, payment_date, item['installment'])
+            stored = _stored_row(res, payment_date)
+            window['rows'][current] = stored
+            rows[stored['nrow']] = stored
+            loan.update(balance=metadata_update['balance'], payed=metadata_update['payed'])
+            metadata[loan_id] = metadata_update
+            if extension:
+                extensions.append(extension)
+                window['max_period'] = extension['period']
+            elif loan_finished(res, window, extension):
+                finished[loan_id] = loan['user_id']
+            payments.append({
+                'user_id': item['user_id'] or loan['user_id'], 'loan_id': loan_id, 'document_id': item['document_id'],
+                'payment_date': payment_date, 'payed_amount': item['installment'],
+            })
+            if item['request_key']:
+                responses.append((item['request_key'], item, res))
+            results.append(_result(
+                index, item, APPLIED, status=res['status'], outstanding_balance=res['outstanding_balance']
+            ))
+        invalidate_on_commit(session, loan_keys(loan_id, loan['user_id']))
+
+    bulk_update(session, LoanTables.__table__, 'nrow', [
+        {k: v for k, v in row.items() if k != 'loan_id'} for row in rows.values()
+    ])
+    bulk_update(session, LoanMetadata.__table__, 'loan_id', list(metadata.values()))
+    if extensions:
+        session.execute(insert(LoanTables.__table__), extensions)
+    if payments:
+        session.execute(insert(UserPayments.__table__), payments)
+    save_responses(session, responses)
+    queue_finished_loans(session, finished)
+    return results
+
+
+def ingest_payments(session, items, payment_date=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate, group and apply a batch of payments.
+
+    Payments are grouped by loan and applied in value-date order (file order
+    for ties), `chunk_size` loans per transaction. Repeats of a loan_id +
+    document_id, within the file or from an earlier posting, are skipped.
+    Returns a report with one result code per input item, in input order.
+    """
+    payment_date = payment_date or get_payment_date()
+    started = time.perf_counter()
+
+    results, by_loan, seen_keys = [], {}, set()
+    for index, item in enumerate(items):
+        try:
+            payment = normalize_payment(item)
+        except ValueError as e:
+            results.append(_result(index, item if isinstance(item, dict) else {}, INVALID, error=str(e)))
+            continue
+        if payment['request_key'] in seen_keys:
+            results.append(_result(index, payment, DUPLICATE))
+            continue
+        if payment['request_key']:
+            seen_keys.add(payment['request_key'])
+        by_loan.setdefault(payment['loan_id'], []).append((index, payment))
+    for loan_payments in by_loan.values():
+        loan_payments.sort(key=lambda entry: entry[1]['value_date'] or date.min)
+
+    loan_ids = sorted(by_loan)
+    for offset in range(0, len(loan_ids), chunk_size):
+        batch = {loan_id: by_loan[loan_id] for loan_id in loan_ids[offset:offset + chunk_size]}
+        try:
+            chunk_results = apply_payment_chunk(session, batch, payment_date)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error applying payments for loans {loan_ids[offset]}..: {str(e)}")
+            chunk_results = [
+                _result(index, item, FAILED) for loan_payments in batch.values() for index, item in loan_payments
+            ]
+        results.extend(chunk_results)
+
+    results.sort(key=lambda result: result['index'])
+    elapsed = time.perf_counter() - started
+    applied = sum(1 for result in results if result['code'] == APPLIED)
+    report = {
+        'received': len(items),
+        'applied': applied,
+        'rejected': len(items) - applied,
+        'payment_date': payment_date.isoformat(),
+        'elapsed_seconds': round(elapsed, 3),
+        'payments_per_second': round(applied / elapsed, 1) if elapsed > 0 else 0.0,
+        'results': results,
+    }
+    logger.info(f"Ingested {applied}/{len(items)} payments at {report['payments_per_second']} payments/s")
+    return report
+
+
+def record_payments_batch(request_data):
+    """
+    /record-payments/batch entry point.
+
+    Accepts {'payments': [...]} or a raw remittance file as {'body', 'format'};
+    an optional 'payment_date' (YYYY-MM-DD) overrides the effective date.
+    """
+    if 'payments' in request_data:
+        items = request_data['payments']
+        if not isinstance(items, list):
+            raise ValueError("'payments' must be a list")
+    elif 'body' in request_data:
+        items = parse_payments(request_data['body'], request_data.get('format'))
+    else:
+        raise ValueError("Provide 'payments' or a CSV / JSON lines body")
+    payment_date = request_data.get('payment_date')
+    payment_date = date.fromisoformat(payment_date) if payment_date else None
+
+    session = get_db_session()
+    try:
+        return ingest_payments(session, items, payment_date)
+    finally:
+        close_db_session(session)
@@ -1,17 +1,21 @@
 from datetime import date
-from dateutil.relativedelta import relativedelta
 
 import logging
 import sys
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import update, insert
 from models.loan_tables import LoanTables
 from models.loan_metadata import LoanMetadata
 from models.user_payments import UserPayments
 from database import get_db_session, close_db_session
-from utils.amortization_utils import calculate_period, safe_float
-from utils.date_utils import get_last_date_of_month
+from utils.amortization_utils import calculate_period, period_inputs, settle_period, safe_float
+from utils.date_utils import get_payment_date, get_schedule_window
+from utils.cache import loan_cache, window_key, loan_keys, invalidate_on_commit
 from services.metadata_service import update_loan_metadata
+from services.idempotency_service import request_key, find_response, save_responses
+from services.risk_update_service import loan_finished, queue_finished_loans
+from services.month_end_job_service import start_or_resume_job, run_job_slice, get_job, COMPLETED
+from services.month_end_service import fetch_loans, fetch_schedule_windows
 
 # Configure logging for Lambda
 logging.basicConfig(
@@ -49,46 +53,67 @@ def get_table_by_loan_id(loan_id):
         close_db_session(session)
 
 
+def load_schedule_window(session, loan_id, start_date, end_date):
+    """Previous and current schedule rows for a loan, read through the loan cache"""
+    def load():
+        current = session.query(LoanTables).filter(
+            LoanTables.loan_id == loan_id,
+            LoanTables.due_date >= start_date,
+            LoanTables.due_date <= end_date,
+        ).order_by(LoanTables.due_date.asc()).limit(2).all()
+        return {'start_date': start_date, 'end_date': end_date, 'rows': [row.to_dict() for row in current]}
+
+    window = loan_cache.get_or_load(window_key(loan_id), load)
+    if (window['start_date'], window['end_date']) != (start_date, end_date):
+        # Month-offset previews use other windows; keep the common one cached
+        window = load()
+    # calculate_period edits rows in place, so hand out copies
+    return [dict(row) for row in window['rows']]
+
+
+def preview_current_row(session, data):
+    """
+    The row calculate_current_row would produce, computed without writing.
+
+    No metadata update and no extension period are staged, so the preview
+    only reads the (cached) schedule window.
+    """
+    payment_date = get_payment_date(data.get("month_offset"))
+    start_date, end_date = get_schedule_window(payment_date)
+
+    window = load_schedule_window(session, data.get("loan_id"), start_date, end_date)
+    if not window:
+        return {'message': 'No current row found'}
+
+    inputs = period_inputs(window)
+    period = inputs['current']['period']
+    res = calculate_period(payment=safe_float(data.get("installment", 0)), payment_date=payment_date, **inputs)
+    return {'row': res, 'period': period}
+
+
 def calculate_current_row(session, data):
     loan_id = data.get("loan_id")
     payment = safe_float(data.get("installment", 0))
-    payment_date = date.today() + relativedelta(months=data.get("month_offset") or 0, days=20)
-    end_date = get_last_date_of_month(payment_date)
-    start_date = end_date - relativedelta(months=2)
+    payment_date = get_payment_date(data.get("month_offset"))
+    start_date, end_date = get_schedule_window(payment_date)
 
-
-
-    current = session.query(LoanTables).filter(
-        LoanTables.loan_id == loan_id,
-        LoanTables.due_date >= start_date,
-        LoanTables.due_date <= end_date,
-    ).order_by(LoanTables.due_date.asc()).limit(2).all()
-    
-    # Convert to dictionaries
-    current_editable = [row.to_dict() for row in current]
+    current_editable = load_schedule_window(session, loan_id, start_date, end_date)
 
     # Check if current list is empty
     if not current_editable:
         close_db_session(session)
         return {'message': 'No current row found'}
 
-    is_first_period = True if len(current_editable) == 1 else False
-    outstanding_from_prev = 0.0 if is_first_period else safe_float(current_editable[0]['outstanding_balance'])
-    last_status = None if is_first_period else current_editable[0]['status']
-    consecutive_defaulted = 0 if is_first_period else current_editable[0].get('consecutive_defaulted', 0)
+    inputs = period_inputs(current_editable)
     # Select the appropriate current row
-    current_row = current_editable[0] if is_first_period else current_editable[1]
+    current_row = inputs['current']
 
     res = calculate_period(
         session=session, 
         loan_id=loan_id,
-        current=current_row, 
         payment=payment, 
         payment_date=payment_date, 
-        outstanding_from_prev=outstanding_from_prev, 
-        last_status=last_status,
-        consecutive_defaulted=consecutive_defaulted,
-        is_first_period=is_first_period
+        **inputs
     )
 
     # Update loan metadata
@@ -97,62 +122,114 @@ def calculate_current_row(session, data):
     return {'row': res, 'period': current_row['period']}
 
 
-def record_payment(data):
+def lock_payment_state(session, loan_id, start_date, end_date):
+    """
+    Locked loan and schedule window for a payment, or (None, None) if there is
+    no current row.
+
+    The metadata row is locked FOR UPDATE in its own statement before the
+    window is read: under READ COMMITTED a payer that waited on the lock then
+    reads the schedule as the previous payer committed it.
+    """
+    loans = fetch_loans(session, [loan_id], lock=True)
+    if not loans:
+        return None, None
+    window = fetch_schedule_windows(session, [loan_id], start_date, end_date).get(loan_id)
+    if window is None:
+        return None, None
+    return loans[0], window
+
+
+def apply_payment(session, data):
+    """
+    Stage one payment in the caller's transaction.
+
+    Returns the updated schedule row, or None when the loan has no current row.
+    """
+    loan_id = data.get("loan_id")
+    payment = safe_float(data.get("installment", 0))
+    payment_date = get_payment_date(data.get("month_offset"))
+    start_date, end_date = get_schedule_window(payment_date)
+
+    loan, window = lock_payment_state(session, loan_id, start_date, end_date)
+    if loan is None:
+        return None
+
+    res, metadata_update, extension = settle_period(loan, window, payment_date, payment)
+    values = {k: v for k, v in res.items() if k not in ('nrow', 'loan_id')}
+    values.update(due_date=date.fromisoformat(res['due_date']), payment_date=payment_date)
+    session.execute(update(LoanTables).where(LoanTables.nrow == res['nrow']).values(**values))
+    session.execute(
+        update(LoanMetadata).where(LoanMetadata.loan_id == loan_id)
+        .values(balance=metadata_update['balance'], payed=metadata_update['payed'])
+    )
+    if extension:
+        session.execute(insert(LoanTables.__table__), [extension])
+    if loan_finished(res, window, extension):
+        queue_finished_loans(session, {loan_id: loan['user_id']})
+    session.execute(insert(UserPayments.__table__), [{
+        'user_id': data.get('user_id', ''),
+        'loan_id': loan_id,
+        'document_id': data.get('document_id', ''),
+        'payment_date': payment_date,
+        'payed_amount': payment,
+    }])
+    invalidate_on_commit(session, loan_keys(loan_id, loan['user_id']))
+    return res
+
+
+def record_payment(data, idempotency_key=None):
+    """
+    Apply a payment in a single transaction with the loan row locked.
+
+    Requests keyed by `idempotency_key` or loan_id + document_id are applied
+    once; a retry is answered with the stored response.
+    """
+    key = request_key(data, idempotency_key)
+    session = get_db_session()
     try:
-        session = get_db_session()
-        loan_id = data.get("loan_id")
-        current_row = calculate_current_row(session, data)
-        
-        # Update loan tables
-        stmt = update(LoanTables).where(LoanTables.loan_id == loan_id).where(LoanTables.period == current_row['period']).values(**current_row['row'])
-        session.execute(stmt)
-        
-        # Register payment in user_payments table
-        user_payment = UserPayments(
-            user_id=data.get('user_id', ''),
-            loan_id=loan_id,
-            document_id=data.get('document_id', ''),
-            payment_date=current_row['row']['payment_date'],
-            payed_amount=safe_float(data.get('installment', 0))
-        )
-        session.add(user_payment)
-        
+        if key:
+            stored = find_response(session, key)
+            if stored is not None:
+                logger.info(f"Replaying stored response for payment {key}")
+                return stored
+        row = apply_payment(session, data)
+        if row is None:
+            session.rollback()
+            return {'message': 'No current row found'}
+        if key:
+            save_responses(session, [(key, data, row)])
         session.commit()
-        close_db_session(session)
-        return current_row['row'] if current_row else {'message': 'No current row found'}
+        return row
+    except IntegrityError:
+        # A concurrent retry of the same request committed first
+        session.rollback()
+        stored = find_response(session, key)
+        if stored is not None:
+            return stored
+        logger.error(f"Error recording payment {key}: duplicate request without a stored response")
+        return {'message': 'Error recording payment'}
     except Exception as e:
+        session.rollback()
         logger.error(f"Error recording payment: {str(e)}")
         return {'message': 'Error recording payment'}
+    finally:
+        close_db_session(session)
 
 
-def end_of_month_update():
-    from datetime import date
-    import calendar
-    
-    # Check if today is the last day of the month
-    today = date.today()
-    last_day = calendar.monthrange(today.year, today.month)[1]
-    if today.day != last_day:
-        return {'message': 'Not the last day of the month', 'updated_loans': 0}
-    
+def end_of_month_update(job_key=None, time_budget=None):
+    """Start or continue the month-end job, working for at most `time_budget` seconds"""
     session = get_db_session()
     try:
-        # Get all loan metadata
-        loan_metadata = session.query(LoanMetadata).all()
-        updated_count = 0
-        
-        for metadata in loan_metadata:
-            try:
-                # Send 0 payment for each loan
-                data = {'loan_id': metadata.loan_id, 'installment': 0, 'month_offset': 0}
-                calculate_current_row(session, data)
-                updated_count += 1
-            except Exception as e:
-                logger.error(f"Error updating loan {metadata.loan_id}: {str(e)}")
-                continue
-        
-        session.commit()
-        return {'message': 'End of month update completed', 'updated_loans': updated_count}
+        job = start_or_resume_job(session, job_key)
+        if job is None:
+            if job_key:
+                return {'message': f'No end of month job found: {job_key}', 'updated_loans': 0}
+            return {'message': 'Not the last day of the month', 'updated_loans': 0}
+
+        result = run_job_slice(session, job.job_key, time_budget=time_budget)
+        message = 'End of month update completed' if result['status'] == COMPLETED else 'End of month update in progress'
+        return {'message': message, **result}
     except Exception as e:
         session.rollback()
         logger.error(f"Error in end_of_month_update: {str(e)}")
@@ -160,11 +237,28 @@ def end_of_month_update():
     finally:
         close_db_session(session)
 
-## The following functions are placeholders for future implementation
+
+def get_end_of_month_status(job_key=None):
+    session = get_db_session()
+    try:
+        job = get_job(session, job_key)
+        if job is None:
+            return None
+        return job.to_dict()
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting end of month status: {str(e)}")
+        return None
+    finally:
+        close_db_session(session)
+
 def get_payment(loan_id, month_offset):
+    """Side-effect-free preview of the next payment row"""
     session = get_db_session()
-    data = {'loan_id': loan_id, 'month_offset': month_offset or 0}
-    current_row = calculate_current_row(session, data)
-    close_db_session(session)
-    return current_row if current_row else {'message': 'No current row found'}
- 
\ No newline at end of file
+    try:
+        data = {'loan_id': loan_id, 'month_offset': month_offset or 0}
+        return preview_current_row(session, data)
+    except SQLAlchemyError as e:
+        logger.error(f"Error previewing payment: {str(e)}")
+        return {'message': 'Error previewing payment'}
+    finally:
+        close_db_session(session)
@@ -0,0 +1,202 @@
+import logging
+import sys
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from database import get_db_session, close_db_session
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION_MONTHS = 3
+MAX_COLLECTION_MONTHS = 60
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+def _parse_date(name, value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)")
+
+
+def parse_summary_params(params):
+    """Filters and horizon from query parameters; raises ValueError on malformed input"""
+    params = params or {}
+    try:
+        months = int(params.get('months') or DEFAULT_COLLECTION_MONTHS)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid months: {params.get('months')}")
+    if not 1 <= months <= MAX_COLLECTION_MONTHS:
+        raise ValueError(f"'months' must be between 1 and {MAX_COLLECTION_MONTHS}")
+    categories = params.get('risk_category') or ''
+    if isinstance(categories, str):
+        categories = [c.strip() for c in categories.split(',')]
+    return {
+        'start_date_from': _parse_date('start_date_from', params.get('start_date_from')),
+        'start_date_to': _parse_date('start_date_to', params.get('start_date_to')),
+        'risk_categories': [c for c in categories if c],
+        'as_of': _parse_date('as_of', params.get('as_of')) or date.today(),
+        'months': months,
+    }
+
+
+def _metadata_filters(start_date_from=None, start_date_to=None, risk_categories=None):
+    """Filters on loan_metadata: loan start date range and risk categories"""
+    filters = []
+    if start_date_from:
+        filters.append(LoanMetadata.start_date >= start_date_from)
+    if start_date_to:
+        filters.append(LoanMetadata.start_date <= start_date_to)
+    if risk_categories:
+        filters.append(LoanMetadata.risk_category.in_(risk_categories))
+    return filters
+
+
+def _schedule_rows(*columns, filters):
+    """SELECT over loan_tables, limited to the filtered loans when there are filters"""
+    stmt = select(*columns)
+    if filters:
+        stmt = stmt.join(LoanMetadata, LoanMetadata.loan_id == LoanTables.loan_id).where(*filters)
+    return stmt
+
+
+def _by_risk_category(session, filters):
+    rows = session.execute(
+        select(
+            LoanMetadata.risk_category,
+            func.count().label('loans'),
+            func.sum(LoanMetadata.amount).label('amount'),
+            func.sum(LoanMetadata.balance).label('outstanding_balance'),
+            func.sum(LoanMetadata.payed).label('collected'),
+            func.sum(func.coalesce(LoanMetadata.defaulted_amount, 0)).label('defaulted_amount'),
+        ).where(*filters).group_by(LoanMetadata.risk_category).order_by(LoanMetadata.risk_category)
+    ).all()
+    return {row.risk_category: {
+        'loans': row.loans,
+        'amount': _money(row.amount),
+        'outstanding_balance': _money(row.outstanding_balance),
+        'collected': _money(row.collected),
+        'defaulted_amount': _money(row.defaulted_amount),
+    } for row in rows}
+
+
+def _by_status(session, filters):
+    """
+    Schedule rows per status. outstanding_balance keeps the schedule's sign:
+    negative is owed on those instalments.
+    """
+    rows = session.execute(
+        _schedule_rows(
+            LoanTables.status,
+            func.count(LoanTables.loan_id.distinct()).label('loans'),
+            func.count().label('instalments'),
+            func.sum(LoanTables.installment).label('amount'),
+            func.sum(func.coalesce(LoanTables.outstanding_balance, 0)).label('outstanding_balance'),
+            func.sum(func.coalesce(LoanTables.late_payment_fee, 0)).label('late_fees'),
+            filters=filters,
+        ).group_by(LoanTables.status).order_by(LoanTables.status)
+    ).all()
+    return {row.status or 'unknown': {
+        'loans': row.loans,
+        'instalments': row.instalments,
+        'amount': _money(row.amount),
+        'outstanding_balance': _money(row.outstanding_balance),
+        'late_fees': _money(row.late_fees),
+    } for row in rows}
+
+
+def _expected_collections(session, filters, as_of, months):
+    """
+    Unpaid instalments falling due from `as_of` over the next `months`, per
+    calendar month. Grouped by due date in SQL (a few rows per month) and
+    bucketed here, which works the same on SQLite and PostgreSQL.
+    """
+    until = as_of + relativedelta(months=months)
+    rows = session.execute(
+        _schedule_rows(
+            LoanTables.due_date,
+            func.count().label('instalments'),
+            func.sum(LoanTables.installment + func.coalesce(LoanTables.late_payment_fee, 0)
+                     - func.coalesce(LoanTables.payed_amount, 0)).label('expected'),
+            filters=filters,
+        ).where(
+            LoanTables.due_date >= as_of,
+            LoanTables.due_date < until,
+            or_(LoanTables.status.is_(None), LoanTables.status != 'payed'),
+        ).group_by(LoanTables.due_date)
+    ).all()
+
+    buckets = {}
+    month = as_of.replace(day=1)
+    while month < until:
+        buckets[month.strftime('%Y-%m')] = {'month': month.strftime('%Y-%m'), 'instalments': 0, 'expected': 0.0}
+        month += relativedelta(months=1)
+    for row in rows:
+        bucket = buckets[row.due_date.strftime('%Y-%m')]
+        bucket['instalments'] += row.instalments
+        bucket['expected'] += float(row.expected or 0)
+    for bucket in buckets.values():
+        bucket['expected'] = _money(bucket['expected'])
+    return list(buckets.values())
+
+
+def portfolio_summary(session, start_date_from=None, start_date_to=None, risk_categories=None,
+                      as_of=None, months=DEFAULT_COLLECTION_MONTHS):
+    """
+    Portfolio totals, breakdowns by risk category and schedule status, and
+    expected collections, from three GROUP BY queries. Totals are summed from
+    the per-category rows.
+    """
+    started = time.perf_counter()
+    as_of = as_of or date.today()
+    filters = _metadata_filters(start_date_from, start_date_to, risk_categories)
+
+    by_category = _by_risk_category(session, filters)
+    totals = {field: sum(group[field] for group in by_category.values())
+              for field in ('loans', 'amount', 'outstanding_balance', 'collected', 'defaulted_amount')}
+    summary = {
+        'filters': {
+            'start_date_from': start_date_from.isoformat() if start_date_from else None,
+            'start_date_to': start_date_to.isoformat() if start_date_to else None,
+            'risk_category': risk_categories or None,
+        },
+        'totals': {field: value if field == 'loans' else _money(value) for field, value in totals.items()},
+        'by_risk_category': by_category,
+        'by_status': _by_status(session, filters),
+        'expected_collections': {
+            'as_of': as_of.isoformat(),
+            'months': months,
+            'by_month': _expected_collections(session, filters, as_of, months),
+        },
+    }
+    summary['expected_collections']['total'] = _money(
+        sum(bucket['expected'] for bucket in summary['expected_collections']['by_month']))
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return summary
+
+
+def get_portfolio_summary(params=None):
+    """/portfolio/summary entry point: start_date_from, start_date_to, risk_category (comma-separated), as_of, months"""
+    options = parse_summary_params(params)
+    session = get_db_session()
+    try:
+        return portfolio_summary(session, **options)
+    except SQLAlchemyError as e:
+        logger.error(f"Error summarizing portfolio: {str(e)}")
+        raise
+    finally:
+        close_db_session(session)
@@ -0,0 +1,125 @@
+import logging
+import math
+import sys
+import time
+
+import numpy as np
+from utils.amortization_engine import monthly_payment, annual_percentage_rate
+from utils.functions import map_risk_to_rate
+from utils.table_utils import safe_float
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+MAX_QUOTE_CELLS = 100_000
+
+
+def axis_length(start, stop, step):
+    """Number of values np.arange(start, stop + step / 2, step) produces, without building it"""
+    return math.floor((stop - start) / step + 0.5) + 1
+
+
+def parse_axis(name, value, cast=float, max_values=MAX_QUOTE_CELLS):
+    """
+    Grid axis from a list of values or a {'start', 'stop', 'step'} range
+    (stop inclusive). Raises ValueError on malformed input or when the axis
+    would hold more than `max_values` values, checked before anything is
+    allocated.
+    """
+    try:
+        if isinstance(value, dict):
+            start, stop, step = (safe_float(value[key]) for key in ('start', 'stop', 'step'))
+            if not all(math.isfinite(v) for v in (start, stop, step)) or step <= 0 or stop < start:
+                raise ValueError
+            length = axis_length(start, stop, step)
+        elif isinstance(value, (list, tuple)):
+            length = len(value)
+        elif value is None:
+            raise ValueError
+        else:
+            length = 1
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a list or a {{start, stop, step}} range")
+    if length > max_values:
+        raise ValueError(f"Quote grids are limited to {MAX_QUOTE_CELLS} cells; '{name}' has {length} values")
+
+    try:
+        if isinstance(value, dict):
+            values = np.arange(start, stop + step / 2, step)
+        elif isinstance(value, (list, tuple)):
+            values = [safe_float(v) for v in value]
+        else:
+            values = [safe_float(value)]
+        values = sorted({cast(v) for v in values})
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{name}' must be a list or a {{start, stop, step}} range")
+    if not values:
+        raise ValueError(f"'{name}' is empty")
+    return values
+
+
+def quote_grid(amounts, terms, user_risks, service_fee=0.0, insurance_fee=0.0):
+    """
+    Instalment, total interest and APR for every amount x term x user_risk.
+
+    Computed in closed form over the whole grid instead of generating a
+    schedule per cell. Fees are charged every period on top of the annuity
+    payment and are included in the APR (solved by Newton's method); without
+    fees the APR equals the nominal rate.
+    """
+    if len(amounts) * len(terms) * len(user_risks) > MAX_QUOTE_CELLS:
+        raise ValueError(f"Quote grids are limited to {MAX_QUOTE_CELLS} cells")
+    if min(amounts) <= 0 or min(terms) <= 0:
+        raise ValueError('amounts and terms must be positive')
+
+    rates = np.array([map_risk_to_rate(risk) for risk in user_risks])
+    amount, term, rate = np.meshgrid(
+        np.asarray(amounts, dtype=float), np.asarray(terms, dtype=float), rates, indexing='ij'
+    )
+    payment = monthly_payment(amount, rate / 12, term)
+    fees = service_fee + insurance_fee
+    instalment = payment + fees
+    total_interest = payment * term - amount
+    apr = annual_percentage_rate(amount, instalment, term, guess=rate) if fees else rate
+
+    risk = np.broadcast_to(np.asarray(user_risks, dtype=float), amount.shape)
+    columns = zip(
+        amount.ravel().tolist(), term.ravel().astype(int).tolist(), risk.ravel().tolist(), rate.ravel().tolist(),
+        np.round(instalment, 2).ravel().tolist(), np.round(total_interest, 2).ravel().tolist(),
+        np.round(apr, 6).ravel().tolist()
+    )
+    return [{
+        'amount': a, 'term': n, 'user_risk': r, 'rate': nominal,
+        'instalment': inst, 'total_interest': interest, 'apr': effective,
+    } for a, n, r, nominal, inst, interest, effective in columns]
+
+
+def get_quote_grid(request_data):
+    """/quotes/grid entry point"""
+    started = time.perf_counter()
+    # Each axis is bounded by what the grid limit leaves after the previous ones
+    amounts = parse_axis('amounts', request_data.get('amounts'))
+    terms = parse_axis('terms', request_data.get('terms'), int, MAX_QUOTE_CELLS // len(amounts))
+    user_risks = parse_axis('user_risks', request_data.get('user_risks'), float,
+                            MAX_QUOTE_CELLS // (len(amounts) * len(terms)))
+    try:
+        service_fee = safe_float(request_data.get('service_fee', 0))
+        insurance_fee = safe_float(request_data.get('insurance_fee', 0))
+    except (TypeError, ValueError):
+        raise ValueError('fees must be numbers')
+
+    quotes = quote_grid(amounts, terms, user_risks, service_fee, insurance_fee)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(f"Quoted {len(quotes)} cells in {elapsed_ms} ms")
+    return {
+        'amounts': amounts,
+        'terms': terms,
+        'user_risks': user_risks,
+        'quotes': quotes,
+        'elapsed_ms': elapsed_ms,
+    }
@@ -0,0 +1,41 @@
+import json
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, insert, update
+from models.risk_model_artifact import RiskModelArtifact
+from utils.risk_distance_calculator import model_from_artifact
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'default'
+
+
+def publish_model(session, calculator, name=DEFAULT_MODEL_NAME):
+    """Stage the calculator's artifact as the shared model every Lambda loads; the caller commits"""
+    table = RiskModelArtifact.__table__
+    values = {
+        'artifact': json.dumps(calculator.to_artifact(), separators=(',', ':')),
+        'trained_at': calculator.model_info.get('trained_at'),
+        'online_updates': calculator.model_info.get('online_updates', 0),
+        'updated_at': datetime.utcnow(),
+    }
+    if not session.execute(update(table).where(table.c.name == name).values(**values)).rowcount:
+        session.execute(insert(table).values(name=name, **values))
+
+
+def load_published_model(session, name=DEFAULT_MODEL_NAME):
+    """Calculator from the shared artifact, or None when none is published; raises ValueError if invalid"""
+    artifact = session.execute(
+        select(RiskModelArtifact.artifact).where(RiskModelArtifact.name == name)
+    ).scalar()
+    if artifact is None:
+        return None
+    return model_from_artifact(json.loads(artifact))
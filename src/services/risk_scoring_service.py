@@ -0,0 +1,108 @@
+import logging
+import sys
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_metadata import LoanMetadata
+from database import get_db_session, close_db_session
+from utils.bulk_utils import bulk_update
+from utils.cache import loan_keys, invalidate_on_commit
+from utils.risk_distance_calculator import get_risk_calculator
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+RISK_FIELDS = ('risk_distance', 'risk_score', 'risk_category', 'closest_cluster')
+
+# Per-loan write-back codes
+UPDATED = 'updated'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+
+def write_scores(session, scores, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Store {loan_id: risk fields} into loan_metadata, one bulk UPDATE and
+    commit per chunk. Returns {loan_id: write-back code}.
+    """
+    codes = {}
+    loan_ids = list(scores)
+    for offset in range(0, len(loan_ids), chunk_size):
+        chunk = loan_ids[offset:offset + chunk_size]
+        try:
+            owners = dict(session.execute(
+                select(LoanMetadata.loan_id, LoanMetadata.user_id).where(LoanMetadata.loan_id.in_(chunk))
+            ).all())
+            rows = [{'loan_id': loan_id, **scores[loan_id]} for loan_id in chunk if loan_id in owners]
+            bulk_update(session, LoanMetadata.__table__, 'loan_id', rows)
+            invalidate_on_commit(session, {key for loan_id, user_id in owners.items() for key in loan_keys(loan_id, user_id)})
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Error writing risk scores at {offset}: {str(e)}")
+            codes.update((loan_id, FAILED) for loan_id in chunk)
+            continue
+        codes.update((loan_id, UPDATED if loan_id in owners else NOT_FOUND) for loan_id in chunk)
+    return codes
+
+
+def score_users(session, users, write_back=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Score many users' survey features against the loaded risk model in one
+    distance-matrix computation. With `write_back`, every item must carry a
+    loan_id and the scores are stored on that loan's metadata.
+    """
+    started = time.perf_counter()
+    if write_back and any(not isinstance(user, dict) or not user.get('loan_id') for user in users):
+        raise ValueError("Every user needs a 'loan_id' to write scores back")
+    if any(not isinstance(user, dict) for user in users):
+        raise ValueError('Each user must be an object of feature scores')
+
+    calculator = get_risk_calculator()
+    try:
+        scored = calculator.calculate_risk_distances(users)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid feature scores: {e}")
+
+    results = [{'index': index, 'loan_id': user.get('loan_id'), **score}
+               for index, (user, score) in enumerate(zip(users, scored))]
+    report = {'received': len(users), 'model': calculator.model_info}
+    if write_back:
+        # The last score for a repeated loan_id wins
+        codes = write_scores(session, {result['loan_id']: {field: result[field] for field in RISK_FIELDS}
+                                       for result in results}, chunk_size)
+        for result in results:
+            result['write'] = codes[result['loan_id']]
+        report['updated'] = sum(1 for code in codes.values() if code == UPDATED)
+        report['not_found'] = sum(1 for code in codes.values() if code == NOT_FOUND)
+        report['failed'] = sum(1 for code in codes.values() if code == FAILED)
+
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    report['results'] = results
+    logger.info(f"Scored {len(users)} users in {report['elapsed_ms']} ms"
+                + (f", updated {report['updated']} loans" if write_back else ''))
+    return report
+
+
+def score_risk_batch(request_data):
+    """/risk-scores/batch entry point: {'users': [{'loan_id'?, <feature scores>}, ...], 'write_back'?}"""
+    users = request_data.get('users')
+    if not isinstance(users, list):
+        raise ValueError("'users' must be a list")
+    write_back = bool(request_data.get('write_back'))
+    if not write_back:
+        return score_users(None, users)
+
+    session = get_db_session()
+    try:
+        return score_users(session, users, write_back=True)
+    finally:
+        close_db_session(session)
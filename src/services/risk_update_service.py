@@ -0,0 +1,119 @@
+import logging
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, bindparam
+from models.risk_model_event import RiskModelEvent
+from services.risk_model_store import publish_model, load_published_model
+from utils.risk_distance_calculator import newest_available_model
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Event outcomes
+APPLIED = 'applied'
+NO_FEATURES = 'no_features'
+
+
+def loan_finished(res, window, extension):
+    """True when a settled payment pays off the final period of a loan's schedule"""
+    return res['status'] == 'payed' and res['period'] == window['max_period'] and not extension
+
+
+def queue_finished_loans(session, loans):
+    """
+    Record finished loans ({loan_id: user_id}) for the next risk model update,
+    in the caller's transaction. A loan is queued once however often its last
+    period is paid; callers hold the loan's metadata lock.
+    """
+    if not loans:
+        return 0
+    queued = set(session.execute(
+        select(RiskModelEvent.loan_id).where(RiskModelEvent.loan_id.in_(list(loans)))
+    ).scalars())
+    finished_at = datetime.utcnow()
+    events = [{'loan_id': loan_id, 'user_id': user_id, 'finished_at': finished_at}
+              for loan_id, user_id in loans.items() if loan_id not in queued]
+    if events:
+        session.execute(insert(RiskModelEvent.__table__), events)
+    return len(events)
+
+
+def query_feature_lookup(session_factory, statement):
+    """
+    Feature lookup for apply_model_updates from a SELECT returning user_id and
+    the feature columns, filtered with an expanding :user_ids parameter.
+    """
+    statement = statement.bindparams(bindparam('user_ids', expanding=True))
+
+    def lookup(user_ids):
+        session = session_factory()
+        try:
+            rows = session.execute(statement, {'user_ids': list(user_ids)}).mappings()
+            return {row['user_id']: dict(row) for row in rows}
+        finally:
+            session.close()
+    return lookup
+
+
+def _mark_events(session, events, found_rows):
+    applied_at = datetime.utcnow()
+    session.execute(
+        update(RiskModelEvent.__table__).where(RiskModelEvent.__table__.c.nrow == bindparam('b_nrow'))
+        .values(applied_at=bindparam('b_applied_at'), outcome=bindparam('b_outcome')),
+        [{'b_nrow': event.nrow, 'b_applied_at': applied_at,
+          'b_outcome': APPLIED if event.nrow in found_rows else NO_FEATURES} for event in events]
+    )
+
+
+def apply_model_updates(session, feature_lookup, model_path=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fold pending finished-loan events into the shared risk model.
+
+    Starts from the newer of the model published in the database and the
+    artifact at `model_path`. Works through the queue
+    `batch_size` events at a time: borrowers' features come from
+    `feature_lookup(user_ids)` ({user_id: features}), the model is updated
+    with partial_fit, and the published model and the events' marks commit
+    together, so a failed batch is neither lost nor folded twice. Lambdas
+    pick the result up on /risk-model/refresh or their next cold start.
+    Returns a report with the model's drift from its last full training.
+    """
+    started = time.perf_counter()
+    calculator = newest_available_model(load_published_model(session), model_path)
+    report = {'events': 0, 'applied': 0, 'no_features': 0}
+    while True:
+        events = session.execute(
+            select(RiskModelEvent.nrow, RiskModelEvent.user_id)
+            .where(RiskModelEvent.applied_at.is_(None)).order_by(RiskModelEvent.nrow).limit(batch_size)
+        ).all()
+        if not events:
+            break
+        features = feature_lookup({event.user_id for event in events})
+        found = [event for event in events if event.user_id in features]
+        if found:
+            calculator.partial_fit([features[event.user_id] for event in found])
+            publish_model(session, calculator)
+
+        _mark_events(session, events, {event.nrow for event in found})
+        session.commit()
+        report['events'] += len(events)
+        report['applied'] += len(found)
+        report['no_features'] += len(events) - len(found)
+
+    report['drift'] = calculator.drift()
+    report['model'] = calculator.model_info
+    report['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Folded {report['applied']}/{report['events']} finished loans into the risk model; "
+                f"drift {report['drift']}")
+    if report['drift']['retrain_recommended']:
+        logger.warning('Risk model centroids drifted past the retrain threshold; run train-risk-model')
+    return report
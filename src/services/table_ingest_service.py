@@ -0,0 +1,99 @@
+import logging
+import sys
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from database import get_db_session, close_db_session
+from utils.bulk_utils import copy_rows
+from utils.cache import user_metadata_key, invalidate_on_commit
+from utils.table_utils import prepare_loan_columns, SCHEDULE_COLUMNS, METADATA_COLUMNS
+
+# Configure logging for Lambda
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per-loan result codes
+SAVED = 'saved'
+INVALID = 'invalid'
+FAILED = 'failed'
+
+
+def save_loan_chunk(session, prepared):
+    """Load one chunk of prepared loans with one COPY per table; the caller commits"""
+    schedule = [row for _, _, rows, _ in prepared for row in rows]
+    metadata = [row for _, _, _, row in prepared]
+    copy_rows(session, LoanTables.__table__, SCHEDULE_COLUMNS, schedule)
+    copy_rows(session, LoanMetadata.__table__, METADATA_COLUMNS, metadata)
+    invalidate_on_commit(session, {user_metadata_key(row[0]) for row in metadata})
+    return len(schedule)
+
+
+def save_tables(session, loans, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate and store many loans, `chunk_size` loans per transaction.
+
+    Each item has save_table's {'metadata', 'data'} shape; metadata may carry
+    an existing loan_id (book migrations), otherwise one is generated.
+    Returns a report with one result per input loan, in input order.
+    """
+    started = time.perf_counter()
+    results, prepared = [], []
+    for index, loan in enumerate(loans):
+        try:
+            loan_id, schedule, metadata = prepare_loan_columns(loan)
+        except ValueError as e:
+            results.append({'index': index, 'loan_id': None, 'code': INVALID, 'error': str(e)})
+            continue
+        prepared.append((index, loan_id, schedule, metadata))
+
+    # COPY runs on the raw psycopg2 cursor, so its failures are DBAPI errors, not SQLAlchemyError
+    dbapi_error = session.get_bind().dialect.dbapi.Error
+    saved_rows = 0
+    for offset in range(0, len(prepared), chunk_size):
+        chunk = prepared[offset:offset + chunk_size]
+        try:
+            rows = save_loan_chunk(session, chunk)
+            session.commit()
+            saved_rows += rows
+            code = SAVED
+        except (SQLAlchemyError, dbapi_error) as e:
+            session.rollback()
+            logger.error(f"Error saving loan chunk at {offset}: {str(e)}")
+            code = FAILED
+        results.extend({'index': index, 'loan_id': loan_id, 'code': code} for index, loan_id, _, _ in chunk)
+
+    results.sort(key=lambda result: result['index'])
+    elapsed = time.perf_counter() - started
+    saved = sum(1 for result in results if result['code'] == SAVED)
+    report = {
+        'received': len(loans),
+        'saved': saved,
+        'rejected': len(loans) - saved,
+        'rows': saved_rows,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(saved_rows / elapsed, 1) if elapsed > 0 else 0.0,
+        'results': results,
+    }
+    logger.info(f"Saved {saved}/{len(loans)} loans ({saved_rows} rows) at {report['rows_per_second']} rows/s")
+    return report
+
+
+def save_tables_batch(request_data):
+    """/save-tables/batch entry point: {'loans': [{'metadata', 'data'}, ...]}"""
+    loans = request_data.get('loans')
+    if not isinstance(loans, list):
+        raise ValueError("'loans' must be a list")
+
+    session = get_db_session()
+    try:
+        return save_tables(session, loans)
+    finally:
+        close_db_session(session)
@@ -1,11 +1,16 @@
+import base64
+import json
 import logging
 import sys
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import insert
+from sqlalchemy import insert, select
 from models.loan_tables import LoanTables
 from models.loan_metadata import LoanMetadata
 from database import get_db_session, close_db_session, DatabaseSession
-from utils.table_utils import prepare_data, serialize_dates
+from utils.table_utils import prepare_data, prepare_loan_columns, schedule_from_terms, SCHEDULE_COLUMNS, METADATA_COLUMNS
+from utils.bulk_utils import copy_rows
+from utils.serialization import get_serializer
+from utils.cache import loan_cache, loan_row_key, user_metadata_key, invalidate_on_commit
 
 # Configure logging for Lambda
 logging.basicConfig(
@@ -15,13 +20,100 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_tables():
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+
+def encode_cursor(nrow):
+    """Opaque cursor pointing after the given nrow"""
+    return base64.urlsafe_b64encode(json.dumps({'nrow': nrow}).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))['nrow'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {value}")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _table_filters(params):
+    """Filters on loan_tables: loan_id, status, and user_id through loan_metadata"""
+    filters = []
+    if params.get('loan_id'):
+        filters.append(LoanTables.loan_id == params['loan_id'])
+    if params.get('user_id'):
+        filters.append(LoanTables.loan_id.in_(
+            select(LoanMetadata.loan_id).where(LoanMetadata.user_id == params['user_id'])
+        ))
+    if params.get('status'):
+        filters.append(LoanTables.status == params['status'])
+    return filters
+
+def _metadata_filters(params):
+    """Filters on loan_metadata: loan_id, user_id, and loans with schedule rows in a status"""
+    filters = []
+    if params.get('loan_id'):
+        filters.append(LoanMetadata.loan_id == params['loan_id'])
+    if params.get('user_id'):
+        filters.append(LoanMetadata.user_id == params['user_id'])
+    if params.get('status'):
+        filters.append(LoanMetadata.loan_id.in_(
+            select(LoanTables.loan_id).where(LoanTables.status == params['status'])
+        ))
+    return filters
+
+def _get_page(session, model, filters, params):
+    """Keyset page ordered by nrow: {'items', 'next_cursor'}"""
+    serializer = get_serializer(model)
+    limit = parse_limit(params.get('limit'))
+    stmt = serializer.select(model.nrow).where(*filters).order_by(model.nrow).limit(limit + 1)
+    if params.get('after'):
+        stmt = stmt.where(model.nrow > decode_cursor(params['after']))
+    rows = session.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'items': [serializer.convert(row[1:]) for row in rows],
+        'next_cursor': encode_cursor(rows[-1][0]) if has_more else None
+    }
+
+def _stream(model, filters, batch_size):
     session = get_db_session()
     try:
+        serializer = get_serializer(model)
+        stmt = serializer.select().where(*filters).order_by(model.nrow).execution_options(yield_per=batch_size)
+        for row in session.execute(stmt):
+            yield serializer.convert(row)
+    finally:
+        close_db_session(session)
 
-        user_table = session.query(LoanTables).all()
-        if user_table:
-            return serialize_dates([serialize_dates(row.to_dict()) for row in user_table])
+def wants_full_list(params):
+    """True when the caller explicitly asks for the legacy unpaginated list with all=true"""
+    return str(params.get('all', '')).lower() in ('true', '1')
+
+def get_tables(params=None):
+    """
+    Schedule rows as a keyset page {'items', 'next_cursor'}, filtered by
+    `loan_id`, `user_id` or `status`; the first page when no `after` is given.
+    `all=true` returns the whole table as a plain list (legacy shape).
+    """
+    params = params or {}
+    session = get_db_session()
+    try:
+        if not wants_full_list(params):
+            return _get_page(session, LoanTables, _table_filters(params), params)
+
+        serializer = get_serializer(LoanTables)
+        rows = session.execute(serializer.select().order_by(LoanTables.nrow)).all()
+        if rows:
+            return serializer.convert_all(rows)
         return None
     except SQLAlchemyError as e:
         logger.error(f"Error getting tables: {str(e)}")
@@ -29,6 +121,10 @@ def get_tables():
     finally:
         close_db_session(session)
 
+def iter_tables(params=None, batch_size=STREAM_BATCH_SIZE):
+    """Stream schedule rows for internal callers with flat memory use"""
+    return _stream(LoanTables, _table_filters(params or {}), batch_size)
+
 def get_table_by_id(user_id):
     session = get_db_session()
     try:
@@ -42,46 +138,71 @@ def get_table_by_id(user_id):
     finally:
         close_db_session(session)
 
-def get_metadata():
+def get_metadata(params=None):
+    """Loan metadata, paginated like get_tables; `all=true` returns the legacy full list"""
+    params = params or {}
     session = get_db_session()
     try:
-        metadata = session.query(LoanMetadata).all()
-        if metadata:
-            return [m.to_dict() for m in metadata]
-        return []
+        if not wants_full_list(params):
+            return _get_page(session, LoanMetadata, _metadata_filters(params), params)
+
+        serializer = get_serializer(LoanMetadata)
+        return serializer.convert_all(session.execute(serializer.select().order_by(LoanMetadata.nrow)).all())
     except SQLAlchemyError as e:
         logger.error(f"Error getting metadata: {str(e)}")
         return []
     finally:
         close_db_session(session)
 
+def iter_metadata(params=None, batch_size=STREAM_BATCH_SIZE):
+    """Stream loan metadata for internal callers with flat memory use"""
+    return _stream(LoanMetadata, _metadata_filters(params or {}), batch_size)
+
+def _load_metadata(session, *filters):
+    serializer = get_serializer(LoanMetadata)
+    return serializer.convert_all(
+        session.execute(serializer.select().where(*filters).order_by(LoanMetadata.nrow)).all()
+    )
+
 def get_metadata_by_user_id(user_id):
+    """Metadata for every loan of a user, read through the loan cache"""
     session = get_db_session()
     try:
-        metadata = session.query(LoanMetadata).filter_by(userId=user_id).all()
-        if metadata:
-            return [m.to_dict() for m in metadata]
-        return []
+        metadata = loan_cache.get_or_load(
+            user_metadata_key(user_id),
+            lambda: _load_metadata(session, LoanMetadata.user_id == user_id)
+        )
+        return metadata, 200
     except SQLAlchemyError as e:
         logger.error(f"Error getting metadata: {str(e)}")
-        return []
+        return {'error': 'Error getting metadata'}, 500
     finally:
         close_db_session(session)
 
+def _load_first_schedule_row(session, loan_id):
+    serializer = get_serializer(LoanTables)
+    row = session.execute(
+        serializer.select().where(LoanTables.loan_id == loan_id).order_by(LoanTables.nrow).limit(1)
+    ).first()
+    return serializer.convert(row) if row is not None else None
+
 def get_loan_by_loan_id(loan_id):
+    """The loan's first schedule row (loan_tables), read through the loan cache"""
     session = get_db_session()
     try:
-        loan = session.query(LoanTables).filter_by(loanId=loan_id).first()
-        if loan:
-            return loan.to_dict()
-        return None
+        loan = loan_cache.get_or_load(loan_row_key(loan_id), lambda: _load_first_schedule_row(session, loan_id))
+        if loan is None:
+            return {'error': f'Loan not found: {loan_id}'}, 404
+        return loan, 200
     except SQLAlchemyError as e:
         logger.error(f"Error getting loan by loan_id: {str(e)}")
-        return None
+        return {'error': 'Error getting loan'}, 500
     finally:
         close_db_session(session)
 
-def save_table(data):    
+def save_table(data):
+    if data.get('terms') and not data.get('data'):
+        return save_table_from_terms(data)
     table_data, table_metadata = prepare_data(data)
     logger.info(f"Prepared {len(table_data)} rows and metadata")
     
@@ -89,7 +210,25 @@ def save_table(data):
         with DatabaseSession() as session:
             session.execute(insert(LoanTables), table_data) # Bulk insert        
             session.execute(insert(LoanMetadata), table_metadata) # single insert        
+            invalidate_on_commit(session, [user_metadata_key(table_metadata['user_id'])])
             return {"status": "Table saved successfully"}
     except Exception as e:
         logger.error(f"Error saving table: {str(e)}")
         return {'error': str(e)}
+
+
+def save_table_from_terms(data):
+    """Generate the schedule for {'metadata', 'terms'} server-side and store it; raises ValueError on bad terms"""
+    loan = schedule_from_terms(data.get('metadata') or {}, data['terms'])
+    loan_id, schedule, metadata = prepare_loan_columns(loan)
+    logger.info(f"Generated {len(schedule)} rows for loan {loan_id}")
+
+    try:
+        with DatabaseSession() as session:
+            copy_rows(session, LoanTables.__table__, SCHEDULE_COLUMNS, schedule)
+            copy_rows(session, LoanMetadata.__table__, METADATA_COLUMNS, [metadata])
+            invalidate_on_commit(session, [user_metadata_key(loan['metadata']['user_id'])])
+        return {"status": "Table saved successfully", 'loan_id': loan_id, 'rows': len(schedule)}
+    except Exception as e:
+        logger.error(f"Error saving table: {str(e)}")
+        return {'error': str(e)}
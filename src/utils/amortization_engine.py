@@ -0,0 +1,143 @@
+"""
+Vectorized annuity schedules.
+
+Every column is computed from closed forms instead of the period-by-period
+loop in table_generator: with monthly rate m and payment P, the balance
+before period k is A(1+m)^(k-1) - P((1+m)^(k-1) - 1)/m, so interest,
+principal and balance for all periods of all loans come out of a handful of
+NumPy array operations. Loans of different terms are laid out back to back
+in flat arrays; `offsets[i]:offsets[i + 1]` is loan i's slice.
+
+Every column is linear in the amount, so single-loan schedules are built
+from a per-unit-principal template for (rate, term) scaled by the amount.
+Only six rates come out of map_risk_to_rate and terms are standard, so the
+templates are kept in a small LRU (`schedule_templates`, hit rate on /health).
+"""
+import math
+import os
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from utils.cache import LRUTTLCache, ReadThroughCache
+
+Schedule = namedtuple('Schedule', ['payment', 'interest', 'principal', 'balance', 'period', 'offsets'])
+
+DEFAULT_TEMPLATE_ENTRIES = 256
+
+# Templates never go stale, so they are only ever evicted by size
+schedule_templates = ReadThroughCache(LRUTTLCache(
+    max_entries=int(os.environ.get('SCHEDULE_TEMPLATE_ENTRIES', DEFAULT_TEMPLATE_ENTRIES)),
+    ttl=math.inf
+))
+
+
+def monthly_payment(amount, monthly_rate, periods):
+    """Annuity payment, elementwise; a zero rate spreads the amount evenly"""
+    amount = np.asarray(amount, dtype=float)
+    monthly_rate = np.asarray(monthly_rate, dtype=float)
+    periods = np.asarray(periods, dtype=float)
+    growth = (1 + monthly_rate) ** periods
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = amount * (monthly_rate * growth) / (growth - 1)
+    return np.where(monthly_rate == 0, amount / periods, payment)
+
+
+def amortize(amounts, rates, periods):
+    """
+    Schedules for many loans at once.
+
+    `rates` are yearly rates as fractions (0.23), like map_risk_to_rate
+    returns. Returns a Schedule of flat, unrounded float arrays.
+    """
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=float))
+    monthly = np.atleast_1d(np.asarray(rates, dtype=float)) / 12
+    periods = np.atleast_1d(np.asarray(periods, dtype=np.int64))
+    amounts, monthly, periods = np.broadcast_arrays(amounts, monthly, periods)
+
+    payments = monthly_payment(amounts, monthly, periods)
+    offsets = np.concatenate(([0], np.cumsum(periods)))
+    loan = np.repeat(np.arange(len(periods)), periods)
+    k = np.arange(offsets[-1]) - offsets[loan]  # periods elapsed before this row
+
+    m, a, p = monthly[loan], amounts[loan], payments[loan]
+    growth = (1 + m) ** k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        opening = np.where(m == 0, a - p * k, a * growth - p * (growth - 1) / m)
+    interest = opening * m
+    principal = p - interest
+    return Schedule(p, interest, principal, opening - principal, k + 1, offsets)
+
+
+def annual_percentage_rate(amount, payment, periods, guess=None, tolerance=1e-10, max_iterations=50):
+    """
+    Yearly rate (monthly IRR x 12) at which `periods` payments of `payment`
+    repay `amount`, solved elementwise with Newton's method.
+
+    `guess` is a starting yearly rate, typically the nominal one.
+    """
+    amount, payment, periods = np.broadcast_arrays(
+        np.asarray(amount, dtype=float), np.asarray(payment, dtype=float), np.asarray(periods, dtype=float)
+    )
+    guess = 0.12 if guess is None else np.asarray(guess, dtype=float)
+    charged = payment * periods > amount
+    # Loans that charge nothing solve to 0; iterate the rest from a positive rate
+    i = np.where(charged, np.maximum(np.broadcast_to(guess / 12, amount.shape), 1e-6), 1.0)
+
+    for _ in range(max_iterations):
+        discount = (1 + i) ** -periods
+        annuity = (1 - discount) / i
+        f = payment * annuity - amount
+        # d(annuity)/di
+        slope = payment * (periods * discount / (1 + i) - annuity) / i
+        step = np.where(charged, f / slope, 0.0)
+        i = np.maximum(i - step, 1e-9)
+        if np.all(np.abs(step) < tolerance):
+            break
+    return np.where(charged, i * 12, 0.0)
+
+
+def schedule_template(rate, periods):
+    """Cached schedule of a loan of 1.0 at `rate` over `periods`; arrays are read-only"""
+    def build():
+        template = amortize(1.0, rate, periods)
+        for column in template:
+            column.flags.writeable = False
+        return template
+    return schedule_templates.get_or_load((float(rate), int(periods)), build)
+
+
+def due_dates(start, periods):
+    """
+    Monthly due dates from `start`, one per period, as datetime64[D].
+
+    Days past the end of a shorter month clamp to its last day, as
+    relativedelta(months=...) does.
+    """
+    start = np.datetime64(start, 'D')
+    month = start.astype('datetime64[M]')
+    day = (start - month.astype('datetime64[D]')).astype(np.int64)
+    months = month + np.arange(periods)
+    month_length = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    return months.astype('datetime64[D]') + np.minimum(day, month_length - 1)
+
+
+def schedule_rows(amount, rate, periods, start=None):
+    """One loan's schedule in TableGenerator's row format, rounded to the cent"""
+    if periods <= 0:
+        return []
+    template = schedule_template(rate, periods)
+    amount = float(amount)
+    dates = np.datetime_as_string(due_dates(start or date.today(), int(periods)), unit='D')
+    payment = round(float(template.payment[0]) * amount, 2)
+    return [{
+        'Payment_Date': payment_date,
+        'Payment': payment,
+        'Principal': round(principal, 2),
+        'Interest': round(interest, 2),
+        'Balance': round(balance, 2) + 0.0,  # no -0.0 on the last period
+    } for payment_date, principal, interest, balance in zip(
+        dates.tolist(), (template.principal * amount).tolist(), (template.interest * amount).tolist(),
+        (template.balance * amount).tolist()
+    )]
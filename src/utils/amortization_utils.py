@@ -2,7 +2,7 @@ from models.loan_tables import LoanTables
 from models.loan_metadata import LoanMetadata
 from utils.status_utils import calculate_status
 from utils.date_utils import calculate_days
-from datetime import datetime
+from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
 def safe_float(value):
@@ -28,24 +28,20 @@ def _update_status_and_fees(current, outstanding_from_prev, last_status, consecu
         current['late_payment_fee'] = round((safe_float(current['installment']) + abs(outstanding_from_prev)) * 0.03, 2)
     return current
 
-def create_extension_period(session, loan_id, current, consecutive_defaulted):
-    """Create extension period for loans with outstanding balance at final period"""
-    
-    # Get loan metadata to calculate interest rate
-    metadata = session.query(LoanMetadata).filter_by(loan_id=loan_id).first()
-    
+def build_extension_row(loan_id, current, consecutive_defaulted, rate=None):
+    """Build the extra schedule row for a final period left with an outstanding balance"""
     # Create additional period for remaining balance
     next_period = current['period'] + 1
     next_due_date = current['due_date'] + relativedelta(months=1)
     
     outstanding_amount = abs(current['outstanding_balance'])
     # Calculate interest on outstanding balance (monthly rate)
-    monthly_rate = safe_float(metadata.rate) / 12 / 100 if metadata else 0.02  # Default 2% monthly
+    monthly_rate = safe_float(rate) / 12 / 100 if rate is not None else 0.02  # Default 2% monthly
     interest_amount = round(outstanding_amount * monthly_rate, 2)
     principal_amount = outstanding_amount
     total_installment = round(principal_amount + interest_amount, 2)
     
-    new_row = LoanTables(
+    return dict(
         loan_id=loan_id,
         period=next_period,
         due_date=next_due_date,
@@ -62,7 +58,14 @@ def create_extension_period(session, loan_id, current, consecutive_defaulted):
         payment_date=None,
         consecutive_defaulted=consecutive_defaulted
     )
-    session.add(new_row)
+
+def create_extension_period(session, loan_id, current, consecutive_defaulted):
+    """Create extension period for loans with outstanding balance at final period"""
+    
+    # Get loan metadata to calculate interest rate
+    metadata = session.query(LoanMetadata).filter_by(loan_id=loan_id).first()
+    rate = metadata.rate if metadata else None
+    session.add(LoanTables(**build_extension_row(loan_id, current, consecutive_defaulted, rate)))
 
 
 def calculate_period(**kwargs):
@@ -110,3 +113,45 @@ def calculate_period(**kwargs):
     current['due_date'] = current['due_date'].isoformat()
     current['payment_date'] = payment_date.isoformat()
     return current
+
+
+def period_inputs(rows):
+    """calculate_period arguments for a loan's previous/current schedule rows"""
+    is_first_period = True if len(rows) == 1 else False
+    previous = None if is_first_period else rows[0]
+    return {
+        'current': rows[0] if is_first_period else rows[1],
+        'outstanding_from_prev': 0.0 if is_first_period else safe_float(previous['outstanding_balance']),
+        'last_status': None if is_first_period else previous['status'],
+        'consecutive_defaulted': 0 if is_first_period else previous.get('consecutive_defaulted', 0),
+        'is_first_period': is_first_period,
+    }
+
+
+def settle_period(loan, window, payment_date, payment=0.0):
+    """
+    Apply a payment to a loan's current period in memory.
+
+    `loan` carries loan_id, balance, payed and rate; `window` carries the
+    schedule `rows` and the loan's `max_period`. Returns the calculate_period
+    row, the metadata update and the extension row to insert (or None),
+    without touching the database.
+    """
+    inputs = period_inputs([dict(row) for row in window['rows']])
+    res = calculate_period(payment=payment, payment_date=payment_date, **inputs)
+
+    extension = None
+    if res['outstanding_balance'] < 0 and res['period'] == window['max_period']:
+        extension = build_extension_row(
+            loan['loan_id'],
+            {**res, 'due_date': date.fromisoformat(res['due_date'])},
+            int(inputs['consecutive_defaulted'] or 0),
+            loan['rate']
+        )
+
+    metadata_update = {
+        'loan_id': loan['loan_id'],
+        'balance': round(safe_float(loan['balance']) - safe_float(res.get('principal', 0)), 2),
+        'payed': safe_float(loan['payed']) + safe_float(res.get('payed_amount', 0)),
+    }
+    return res, metadata_update, extension
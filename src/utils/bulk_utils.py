@@ -0,0 +1,63 @@
+import io
+from datetime import date
+
+from sqlalchemy import update, insert, values, column, cast, bindparam
+
+
+def bulk_update(session, table, key, rows):
+    """
+    Update many rows of `table` matched on `key` in as few statements as possible.
+
+    PostgreSQL gets a single UPDATE ... FROM (VALUES ...); other dialects
+    (SQLite, MySQL) fall back to one executemany UPDATE. Every row must carry
+    the same keys.
+    """
+    if not rows:
+        return 0
+    columns = list(rows[0].keys())
+    targets = [c for c in columns if c != key]
+
+    if session.get_bind().dialect.name == 'postgresql':
+        data = values(*[column(c, table.c[c].type) for c in columns], name='v').data(
+            [tuple(row[c] for c in columns) for row in rows]
+        )
+        stmt = update(table).where(table.c[key] == data.c[key]).values(
+            {c: cast(data.c[c], table.c[c].type) for c in targets}
+        )
+        session.execute(stmt)
+    else:
+        stmt = update(table).where(table.c[key] == bindparam(f'b_{key}')).values(
+            {c: bindparam(f'b_{c}') for c in targets}
+        )
+        session.execute(stmt, [{f'b_{c}': row[c] for c in columns} for row in rows])
+    return len(rows)
+
+
+def _copy_value(value):
+    """One field in COPY's text format: \\N for NULL, backslash escapes for separators"""
+    if value is None:
+        return '\\N'
+    text = value.isoformat() if isinstance(value, date) else str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(session, table, columns, rows):
+    """
+    Append `rows` (tuples in `columns` order) to `table` inside the session's transaction.
+
+    PostgreSQL through psycopg2 streams them with COPY ... FROM STDIN (text format);
+    everything else (SQLite, MySQL, other drivers) gets one executemany INSERT.
+    A failed COPY raises the driver's own error (psycopg2.Error), not SQLAlchemyError.
+    """
+    if not rows:
+        return 0
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        buffer = io.StringIO()
+        buffer.writelines('\t'.join(map(_copy_value, row)) + '\n' for row in rows)
+        buffer.seek(0)
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer)
+    else:
+        session.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+    return len(rows)
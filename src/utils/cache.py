@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 1024
+
+_MISSING = object()
+
+
+class LRUTTLCache:
+    """
+    Bounded in-process cache: least recently used entries are evicted first
+    and every entry expires `ttl` seconds after it was stored.
+
+    Shared backends plugged into ReadThroughCache implement the same
+    get/set/delete/clear methods (get returns None on a miss).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ReadThroughCache:
+    """Local LRU+TTL cache with an optional shared backend behind it, plus hit/miss metrics"""
+
+    def __init__(self, local=None, shared=None):
+        self.local = local or LRUTTLCache()
+        self.shared = shared
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def set_shared_backend(self, backend):
+        self.shared = backend
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss; None is never cached"""
+        value = self.local.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache get failed for {key}: {e}")
+                value = None
+            if value is not None:
+                self.stats['shared_hits'] += 1
+                self.local.set(key, value)
+                return value
+
+        self.stats['misses'] += 1
+        value = loader()
+        if value is not None:
+            self.local.set(key, value)
+            if self.shared is not None:
+                try:
+                    self.shared.set(key, value, self.local.ttl)
+                except Exception as e:
+                    logger.warning(f"Shared cache set failed for {key}: {e}")
+        return value
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+            if self.shared is not None:
+                try:
+                    self.shared.delete(key)
+                except Exception as e:
+                    logger.warning(f"Shared cache delete failed for {key}: {e}")
+        self.stats['invalidations'] += len(keys)
+
+    def clear(self):
+        self.local.clear()
+
+    def snapshot(self):
+        lookups = self.stats['hits'] + self.stats['shared_hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] + self.stats['shared_hits']) / lookups if lookups else 0.0
+        return {
+            **self.stats,
+            'evictions': self.local.evictions,
+            'entries': len(self.local),
+            'hit_rate': round(hit_rate, 4)
+        }
+
+
+loan_cache = ReadThroughCache(LRUTTLCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+    ttl=float(os.environ.get('CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+))
+
+
+def loan_row_key(loan_id):
+    """First schedule row of a loan, as served by /get-loan-by-loan-id"""
+    return f"loan-row:{loan_id}"
+
+
+def user_metadata_key(user_id):
+    return f"metadata-by-user:{user_id}"
+
+
+def window_key(loan_id):
+    return f"window:{loan_id}"
+
+
+def loan_keys(loan_id, user_id=None):
+    """Every cache key that depends on a loan's schedule or metadata"""
+    keys = [loan_row_key(loan_id), window_key(loan_id)]
+    if user_id:
+        keys.append(user_metadata_key(user_id))
+    return keys
+
+
+def invalidate_on_commit(session, keys):
+    """Drop `keys` from the cache once the session's transaction commits"""
+    session.info.setdefault('cache_invalidations', set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    keys = session.info.pop('cache_invalidations', None)
+    if keys:
+        loan_cache.invalidate(*keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop('cache_invalidations', None)
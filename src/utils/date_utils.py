@@ -1,5 +1,6 @@
 from datetime import date
 import calendar
+from dateutil.relativedelta import relativedelta
 
 
 def calculate_days(initial_date, final_date):
@@ -24,4 +25,16 @@ def get_last_date_of_month(current_date=None):
 
     # Create a date object for the last day of the month
     return date(year, month, num_days)
-    
\ No newline at end of file
+    
+
+def get_payment_date(month_offset=0, today=None):
+    """Effective payment date used to pick the schedule row being paid"""
+    today = today or date.today()
+    return today + relativedelta(months=month_offset or 0, days=20)
+
+
+def get_schedule_window(payment_date):
+    """Due-date range holding the previous and current schedule rows for a payment date"""
+    end_date = get_last_date_of_month(payment_date)
+    start_date = end_date - relativedelta(months=2)
+    return start_date, end_date
@@ -1,5 +1,4 @@
 from math import ceil
-from models.defaults.defaults_dict import document_defaults
 
 
 def calculate_coords(values, key, presets):
@@ -25,6 +24,8 @@ def calculate_coords(values, key, presets):
       
      
 def get_default(document, index, version):
+    # Imported here so the rate/cast helpers don't need the document defaults module
+    from models.defaults.defaults_dict import document_defaults
     try:
       default = document_defaults[document][version][index]
       return default
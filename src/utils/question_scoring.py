@@ -1,14 +1,9 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-import locale
 import math
 from typing import List
-from models.defaults.defaults_dict import document_defaults
-from utils.functions import get_default
-import re
 
-loc = locale.getlocale()
-locale.setlocale(locale.LC_MONETARY, loc)
+import numpy as np
 
 class QuestionScoring():
   def __init__(self, strategy = None) -> None:
@@ -26,12 +21,21 @@ class QuestionScoring():
   def use_scoring(self, *args):
     return self._strategy.score_question(*args)
 
+  def score_batch(self, sections):
+    """Scores for many submissions of the same section, in order"""
+    return self._strategy.score_batch(sections)
+
 
 class Strategy(ABC):
+  """Stateless: one instance can score any number of sections, one at a time or in batches"""
+
   @abstractmethod
-  def score_question(self, *args: List):
+  def score_question(self, section_data, *args) -> float:
     pass
 
+  def score_batch(self, sections: List) -> List[float]:
+    return [self.score_question(section) for section in sections]
+
   def apply_bias_correction(self, raw_score: float) -> float:
     """Apply statistical transformation to reduce central tendency bias"""
     # Normalize to 0-1 range
@@ -42,91 +46,111 @@ class Strategy(ABC):
     return 1 + (corrected * 8)  # Expanded to 1-9 range for better differentiation
 
 
-class Default(Strategy):
-  def __init__(self):
-        self.count = 0
-        self.data = {}
-
-  def score_question(self, *args, i = 0):
-    section_data = args[0]
-    
-    # Handle different input structures
-    if isinstance(section_data, dict) and 'data' in section_data:
-        # Questionnaire structure with metadata and data
-        likert_data = section_data['data']
-    else:
-        # Direct data structure
-        likert_data = section_data
-    
-    if len(self.data) == 0:
-        self.data = {**self.data, **dict(likert_data)}
-    
-    if i == len(self.data):
-        if len(self.data) == 0:
-            return 5.0  # Default neutral score
-        raw_avg = self.count / len(self.data)
-        corrected_score = self.apply_bias_correction(raw_avg)
-
-        return corrected_score
-    
-    key = list(self.data)[i]
-    value = self.data[key]
-
-    
-    # Convert to int, default to 3 if not valid
+def bias_correction(raw_scores):
+  """
+  Strategy.apply_bias_correction over an array. exp comes from math.exp, once
+  per distinct exponent: NumPy's exp can differ from it in the last bit,
+  which would change scores.
+  """
+  normalized = (raw_scores - 1) / 4
+  exponent = -6 * (normalized - 0.5)
+  distinct, inverse = np.unique(exponent, return_inverse=True)
+  growth = np.array([math.exp(x) for x in distinct.tolist()])[inverse]
+  corrected = 1 / (1 + growth)
+  return 1 + (corrected * 8)
+
+
+def likert_values(section_data):
+  """Answers of a section given as {'data': answers} or directly as answers"""
+  if isinstance(section_data, dict) and 'data' in section_data:
+    section_data = section_data['data']
+  return list(dict(section_data).values())
+
+
+def likert_point(answer):
+  """Points for one answer: a non-negative integer or decimal-digit string counts as its value, anything else as 3"""
+  text = str(answer) if isinstance(answer, (int, str)) else ''
+  return int(text) if text.isdecimal() else 3
+
+
+def likert_points(answers):
+  """
+  likert_point over many answers, parsing each distinct answer once (keyed by
+  type too, so True is not taken for 1). Int64 array, or object array of
+  Python ints when a value does not fit.
+  """
+  parsed = {}
+  points = []
+  for answer in answers:
     try:
-        partial = int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
-    except (ValueError, TypeError):
-        partial = 3
-    
-    self.count = self.count + partial
+      key = (answer.__class__, answer)
+      point = parsed.get(key)
+      if point is None:
+        point = parsed[key] = likert_point(answer)
+    except TypeError:  # unhashable answer
+      point = 3
+    points.append(point)
+  try:
+    return np.array(points, dtype=np.int64)
+  except OverflowError:
+    return np.array(points, dtype=object)
+
 
-    return self.score_question(self, args, i = i+1)
+class Default(Strategy):
+  def score_question(self, section_data, *args):
+    """Bias-corrected mean Likert answer; 5.0 for an empty section"""
+    answers = likert_values(section_data)
+    if not answers:
+      return 5.0  # Default neutral score
+    return self.apply_bias_correction(sum(likert_point(answer) for answer in answers) / len(answers))
+
+  def score_batch(self, sections):
+    answers = [likert_values(section) for section in sections]
+    lengths = np.array([len(a) for a in answers], dtype=np.int64)
+    points = likert_points([answer for section in answers for answer in section])
+
+    totals = np.concatenate(([0], np.cumsum(points)))
+    ends = np.cumsum(lengths)
+    counts = totals[ends] - totals[ends - lengths]
+    answered = lengths > 0
+    raw = np.zeros(len(sections))
+    raw[answered] = (counts[answered] / lengths[answered]).astype(float)
+
+    scores = np.full(len(sections), 5.0)  # Default neutral score
+    if answered.any():
+      scores[answered] = bias_correction(raw[answered])
+    return scores.tolist()
+
+
+OCCUPATION_SCORES = {'Empleado': 8.0, 'Desempleado': 2.0}  # Independiente or other: 5.0
 
 
 class DemographicsScoring(Strategy):
-  def __init__(self):
-        self.count = 0
-        self.data = {}
-        self.gender_multiplier = 1.0
-
-  def field_score(self, key) -> float:
-    data = self.data[key]
-
-    
-    if key == 'gender':
-      if data == 'F':
-        self.gender_multiplier = 1.4  # 40% advantage for females
-        return 8.0
-      else:
-        self.gender_multiplier = 1.0
-        return 3.0
-    elif key == 'occupation':
-      if data == 'Empleado':
-        return 8.0  # Boost for employed
-      elif data == 'Desempleado':
-        return 2.0  # Lower score for unemployed
-      else:  # Independiente or other
-        return 5.0
-    else:
-      return 0.0  # Ignore other demographic fields
-
-  def score_question(self, *args, i = 0):
-    if len(self.data) == 0:
-        # Handle direct demographics data (no nested structure)
-        self.data = {**self.data, **dict(args[0])}
-    
-    # Only process gender and occupation fields
-    relevant_fields = ['gender', 'occupation']
-    relevant_data = {k: v for k, v in self.data.items() if k in relevant_fields}
-    
-    if i == len(relevant_data):
-        base_score = self.count / len(relevant_data) if len(relevant_data) > 0 else 4.0
-        final_score = base_score * self.gender_multiplier
-
-        return final_score
-    
-    key = list(relevant_data)[i]
-    self.count = self.count + self.field_score(key)
-    return self.score_question(self, args, i = i+1)
-       
\ No newline at end of file
+  def score_question(self, section_data, *args):
+    """
+    Mean of the gender (F: 8, else 3) and occupation scores present, 4.0 when
+    neither is; females get a 1.4 multiplier. Other fields are ignored.
+    """
+    section = dict(section_data)
+    scores = []
+    if 'gender' in section:
+      scores.append(8.0 if section['gender'] == 'F' else 3.0)
+    if 'occupation' in section:
+      scores.append(OCCUPATION_SCORES.get(section['occupation'], 5.0))
+    base_score = sum(scores) / len(scores) if scores else 4.0
+    gender_multiplier = 1.4 if section.get('gender') == 'F' else 1.0  # 40% advantage for females
+    return base_score * gender_multiplier
+
+  def score_batch(self, sections):
+    sections = [dict(section) for section in sections]
+    has_gender = np.array(['gender' in s for s in sections], dtype=bool)
+    female = np.array([s.get('gender') == 'F' for s in sections], dtype=bool) & has_gender
+    has_occupation = np.array(['occupation' in s for s in sections], dtype=bool)
+    occupation = np.array([OCCUPATION_SCORES.get(s.get('occupation'), 5.0) if 'occupation' in s else 0.0
+                           for s in sections])
+
+    count = np.where(has_gender, np.where(female, 8.0, 3.0), 0.0) + occupation
+    fields = has_gender.astype(np.int64) + has_occupation
+    base_score = np.where(fields > 0, count / np.maximum(fields, 1), 4.0)
+    gender_multiplier = np.where(female, 1.4, 1.0)  # 40% advantage for females
+    return (base_score * gender_multiplier).tolist()
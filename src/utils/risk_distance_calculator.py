@@ -1,66 +1,389 @@
-import math
-from services.non_defaulter_service import get_all_non_defaulters
+import json
 import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SEED = 42
+DEFAULT_TOLERANCE = 1e-4
+DEFAULT_MAX_ITERATIONS = 100
+
+# Empirical max distance for normalized features; anything further scores 100
+MAX_EXPECTED_DISTANCE = 5.0
+# Upper risk_score bound (inclusive) of each category but the last
+RISK_CATEGORY_BOUNDS = [20, 40, 60, 80]
+RISK_CATEGORIES = ['Very Low', 'Low', 'Medium', 'High', 'Very High']
+
+# Streaming training: rows per chunk read from the source, rows kept to seed k-means++
+DEFAULT_TRAINING_CHUNK = 10_000
+DEFAULT_SEED_SAMPLE = 10_000
+DEFAULT_MAX_EPOCHS = 20
+
+# Online updates: centroid drift (in training standard deviations) past which a full retrain is due
+DRIFT_RETRAIN_THRESHOLD = 0.5
+
+# Artifact format; bump when its fields change. Version 1 had no online-update state
+MODEL_VERSION = 2
+REQUIRED_ARTIFACT_KEYS = ('version', 'feature_cols', 'feature_means', 'feature_stds', 'centroids')
+ARTIFACT_ARRAYS = ('feature_cols', 'feature_means', 'feature_stds', 'feature_m2', 'centroids', 'cluster_counts',
+                   'baseline_means', 'baseline_stds', 'baseline_centroids')
+# Shipped inside src/ so deploy.sh bundles it; RISK_MODEL_PATH overrides
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifacts', 'risk_model.json')
+
+
+def squared_distances(points, centroids):
+    """(n, k) squared Euclidean distances without materializing n x k x d differences"""
+    distances = (
+        (points ** 2).sum(axis=1)[:, None]
+        - 2 * points @ centroids.T
+        + (centroids ** 2).sum(axis=1)[None, :]
+    )
+    return np.maximum(distances, 0.0)
+
+
+def kmeans_plus_plus(points, k, rng):
+    """k-means++ seeding: each next centroid is drawn with probability proportional to D^2"""
+    centroids = [points[rng.integers(len(points))]]
+    closest = squared_distances(points, centroids[0][None, :])[:, 0]
+    for _ in range(1, k):
+        total = closest.sum()
+        if total == 0:  # fewer distinct points than clusters
+            index = rng.integers(len(points))
+        else:
+            index = rng.choice(len(points), p=closest / total)
+        centroids.append(points[index])
+        closest = np.minimum(closest, squared_distances(points, points[index][None, :])[:, 0])
+    return np.array(centroids)
+
+
+def kmeans(points, k, seed=DEFAULT_SEED, tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS):
+    """
+    Lloyd's k-means from k-means++ seeds, stopping once no centroid moves more
+    than `tolerance`. Returns (centroids, labels, iterations).
+    """
+    centroids = kmeans_plus_plus(points, k, np.random.default_rng(seed))
+    for iteration in range(1, max_iterations + 1):
+        labels = squared_distances(points, centroids).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        # An empty cluster keeps its previous centroid
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+        shift = np.sqrt(((updated - centroids) ** 2).sum(axis=1)).max()
+        centroids = updated
+        if shift <= tolerance:
+            break
+    return centroids, labels, iteration
+
+
+class RunningStats:
+    """
+    Column means and population standard deviations in one pass over chunks
+    (Welford's update, merged a chunk at a time as in Chan et al.).
+    """
+
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    @classmethod
+    def restore(cls, count, mean, m2):
+        stats = cls(len(mean))
+        stats.count, stats.mean, stats.m2 = count, np.asarray(mean, dtype=float), np.asarray(m2, dtype=float)
+        return stats
+
+    def update(self, matrix):
+        n = len(matrix)
+        if n == 0:
+            return
+        chunk_mean = matrix.mean(axis=0)
+        chunk_m2 = ((matrix - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def std(self):
+        """Population standard deviation; 1 for constant columns so they scale to 0"""
+        std = np.sqrt(self.m2 / self.count) if self.count else np.ones_like(self.m2)
+        std[std == 0] = 1.0
+        return std
+
+
+class Reservoir:
+    """Uniform sample of at most `size` rows from a stream of chunks (algorithm R)"""
+
+    def __init__(self, size, n_features, rng):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.sample = np.empty((0, n_features))
+
+    def add(self, matrix):
+        free = self.size - len(self.sample)
+        if free > 0:
+            self.sample = np.vstack([self.sample, matrix[:free]])
+            self.seen += len(matrix[:free])
+            matrix = matrix[free:]
+        if len(matrix) == 0:
+            return
+        # Row t (0-based over the stream) replaces a random slot with probability size / (t + 1)
+        slots = self.rng.integers(0, self.seen + np.arange(1, len(matrix) + 1))
+        keep = slots < self.size
+        self.sample[slots[keep]] = matrix[keep]
+        self.seen += len(matrix)
+
+
+def fold_batch(centroids, counts, points):
+    """
+    Mini-batch k-means step: move each centroid towards the mean of the points
+    assigned to it, weighted by how many points it has absorbed so far
+    (`counts`, updated in place). Returns the new centroids.
+    """
+    labels = squared_distances(points, centroids).argmin(axis=1)
+    batch_counts = np.bincount(labels, minlength=len(centroids))
+    sums = np.zeros_like(centroids)
+    np.add.at(sums, labels, points)
+    counts += batch_counts
+    rate = (batch_counts / np.maximum(counts, 1))[:, None]
+    batch_means = sums / np.maximum(batch_counts, 1)[:, None]
+    return centroids + rate * (batch_means - centroids)
+
+
+def minibatch_kmeans(batches, centroids, tolerance=DEFAULT_TOLERANCE, max_epochs=DEFAULT_MAX_EPOCHS):
+    """
+    Mini-batch k-means over `batches()`, a callable returning a fresh iterable
+    of standardized chunks on every epoch. Counts restart every epoch; stops
+    when an epoch moves no centroid more than `tolerance`. Returns
+    (centroids, counts of the last epoch, epochs).
+    """
+    centroids = centroids.copy()
+    for epoch in range(1, max_epochs + 1):
+        previous = centroids.copy()
+        counts = np.zeros(len(centroids))
+        for points in batches():
+            if len(points):
+                centroids = fold_batch(centroids, counts, points)
+        if np.sqrt(((centroids - previous) ** 2).sum(axis=1)).max() <= tolerance:
+            break
+    return centroids, counts, epoch
+
+
+def query_chunk_source(session_factory, statement, chunk_size=DEFAULT_TRAINING_CHUNK):
+    """
+    Chunk source for fit_stream over a SELECT whose columns are named like
+    feature_cols. Every pass opens its own session and streams the rows with
+    yield_per (a server-side cursor on PostgreSQL).
+    """
+    def chunks():
+        session = session_factory()
+        try:
+            result = session.execute(statement.execution_options(yield_per=chunk_size))
+            for partition in result.mappings().partitions():
+                yield partition
+        finally:
+            session.close()
+    return chunks
+
+
 class RiskDistanceCalculator:
-    def __init__(self):
+    def __init__(self, non_defaulters=None, seed=DEFAULT_SEED, artifact=None):
         self.non_defaulter_centroids = None
         self.feature_means = None
         self.feature_stds = None
+        self.model_info = None
+        self.stats = None
+        self.cluster_counts = None
+        self.baseline = None
+        self.seed = seed
         self.feature_cols = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity', 
                             'futureOrientation', 'financialKnowledge', 'locusOfControl', 'socialInfluence', 
                             'resilience', 'familismo', 'respect', 'risk_level']
-        self._initialize_model()
+        if artifact is not None:
+            self.load_artifact(artifact)
+        elif non_defaulters is None:
+            self._initialize_model()
+        else:
+            self.fit(non_defaulters)
     
-    def _calculate_mean_std(self, values):
-        """Calculate mean and standard deviation"""
-        n = len(values)
-        if n == 0:
-            return 0, 1
-        mean = sum(values) / n
-        variance = sum((x - mean) ** 2 for x in values) / n
-        std = math.sqrt(variance) if variance > 0 else 1
-        return mean, std
+    def feature_matrix(self, records):
+        """(n, features) float matrix; missing or null scores count as 0"""
+        return np.array(
+            [[float(record.get(col, 0) or 0) for col in self.feature_cols] for record in records],
+            dtype=float
+        ).reshape(-1, len(self.feature_cols))
     
-    def _euclidean_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        return math.sqrt(sum((a - b) ** 2 for a, b in zip(point1, point2)))
+    def fit(self, non_defaulters):
+        """Standardize the non-defaulters' scores and cluster them; needs at least two"""
+        if len(non_defaulters) < 2:
+            return False
+        matrix = self.feature_matrix(non_defaulters)
+        stats = RunningStats(len(self.feature_cols))
+        stats.update(matrix)
+        k = min(3, max(2, len(non_defaulters) // 2))
+        centroids, labels, iterations = kmeans((matrix - stats.mean) / stats.std, k, seed=self.seed)
+        self._set_trained(stats, centroids, np.bincount(labels, minlength=k), iterations)
+        return True
     
-    def _simple_clustering(self, features, k=3):
-        """Simple k-means clustering without sklearn"""
-        if len(features) < k:
-            return [features[i % len(features)] for i in range(k)]
+    def fit_stream(self, chunks, seed_sample=DEFAULT_SEED_SAMPLE, max_epochs=DEFAULT_MAX_EPOCHS):
+        """
+        Train without holding the population in memory. `chunks()` returns a
+        fresh iterable of record lists on every call (see query_chunk_source):
+        one pass gathers the normalization statistics and a bounded sample to
+        seed k-means++, further passes run mini-batch k-means.
+        """
+        rng = np.random.default_rng(self.seed)
+        stats = RunningStats(len(self.feature_cols))
+        reservoir = Reservoir(seed_sample, len(self.feature_cols), rng)
+        for chunk in chunks():
+            matrix = self.feature_matrix(chunk)
+            stats.update(matrix)
+            reservoir.add(matrix)
+        if stats.count < 2:
+            return False
         
-        # Initialize centroids randomly
-        centroids = features[:k]
+        means, stds = stats.mean, stats.std
+        k = min(3, max(2, stats.count // 2))
+        seeds = kmeans_plus_plus((reservoir.sample - means) / stds, k, rng)
+        centroids, counts, epochs = minibatch_kmeans(
+            lambda: ((self.feature_matrix(chunk) - means) / stds for chunk in chunks()), seeds, max_epochs=max_epochs
+        )
+        self._set_trained(stats, centroids, counts, epochs, training='streaming')
+        return True
+    
+    def _set_trained(self, stats, centroids, cluster_counts, iterations, **extra):
+        self.stats = stats
+        self.feature_means, self.feature_stds = stats.mean, stats.std
+        self.non_defaulter_centroids = centroids
+        self.cluster_counts = np.asarray(cluster_counts, dtype=float)
+        # Online updates measure their drift against the model as trained
+        self.baseline = {'means': self.feature_means, 'stds': self.feature_stds, 'centroids': centroids}
+        self.model_info = {
+            'version': MODEL_VERSION,
+            'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': stats.count,
+            'clusters': len(centroids),
+            'iterations': iterations,
+            'seed': self.seed,
+            **extra,
+        }
+        logger.info(f"Initialized risk distance calculator with {len(centroids)} centroids ({iterations} iterations)")
+    
+    def partial_fit(self, records):
+        """
+        Fold newly finished non-defaulters into the model without retraining,
+        at O(clusters x features) per record: the running means/stds absorb
+        them, centroids are carried over to the new scaling, and each record
+        moves its nearest centroid by 1 / (points that centroid has absorbed).
+        Returns the number of records folded.
+        """
+        if self.non_defaulter_centroids is None:
+            raise RuntimeError('Risk distance calculator not initialized')
+        matrix = self.feature_matrix(records)
+        if len(matrix) == 0:
+            return 0
         
-        for _ in range(10):  # Max 10 iterations
-            clusters = [[] for _ in range(k)]
-            
-            # Assign points to nearest centroid
-            for point in features:
-                distances = [self._euclidean_distance(point, centroid) for centroid in centroids]
-                closest = distances.index(min(distances))
-                clusters[closest].append(point)
-            
-            # Update centroids
-            new_centroids = []
-            for cluster in clusters:
-                if cluster:
-                    centroid = [sum(dim) / len(cluster) for dim in zip(*cluster)]
-                    new_centroids.append(centroid)
-                else:
-                    new_centroids.append(centroids[len(new_centroids)])
-            
-            centroids = new_centroids
+        raw_centroids = self.non_defaulter_centroids * self.feature_stds + self.feature_means
+        self.stats.update(matrix)
+        self.feature_means, self.feature_stds = self.stats.mean, self.stats.std
+        centroids = (raw_centroids - self.feature_means) / self.feature_stds
+        for point in (matrix - self.feature_means) / self.feature_stds:
+            centroids = fold_batch(centroids, self.cluster_counts, point[None, :])
+        self.non_defaulter_centroids = centroids
         
-        return centroids
+        self.model_info.update(
+            rows=self.stats.count,
+            online_updates=self.model_info.get('online_updates', 0) + len(matrix),
+            updated_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        )
+        return len(matrix)
+    
+    def drift(self):
+        """How far online updates have moved the model since it was trained, in trained standard deviations"""
+        base_stds = self.baseline['stds']
+        raw = self.non_defaulter_centroids * self.feature_stds + self.feature_means
+        base_raw = self.baseline['centroids'] * base_stds + self.baseline['means']
+        centroid_shift = np.sqrt((((raw - base_raw) / base_stds) ** 2).sum(axis=1))
+        return {
+            'online_updates': self.model_info.get('online_updates', 0),
+            'centroid_shift': [round(shift, 4) for shift in centroid_shift.tolist()],
+            'mean_shift': round(float((np.abs(self.feature_means - self.baseline['means']) / base_stds).max()), 4),
+            'std_change': round(float(np.abs(self.feature_stds / base_stds - 1).max()), 4),
+            'retrain_recommended': bool(centroid_shift.max() > DRIFT_RETRAIN_THRESHOLD),
+        }
+    
+    def to_artifact(self):
+        """Everything scoring needs, as a JSON-serializable dict"""
+        if self.non_defaulter_centroids is None:
+            raise ValueError('Risk distance calculator not initialized')
+        return {
+            **self.model_info,
+            'version': MODEL_VERSION,
+            'feature_cols': self.feature_cols,
+            'feature_means': self.feature_means.tolist(),
+            'feature_stds': self.feature_stds.tolist(),
+            'feature_m2': self.stats.m2.tolist(),
+            'centroids': self.non_defaulter_centroids.tolist(),
+            'cluster_counts': self.cluster_counts.tolist(),
+            'baseline_means': self.baseline['means'].tolist(),
+            'baseline_stds': self.baseline['stds'].tolist(),
+            'baseline_centroids': self.baseline['centroids'].tolist(),
+        }
+    
+    def load_artifact(self, artifact):
+        """Restore a trained model; raises ValueError if it is malformed or does not match this calculator"""
+        if not isinstance(artifact, dict):
+            raise ValueError(f"Risk model artifact must be a JSON object, got {type(artifact).__name__}")
+        missing = [key for key in REQUIRED_ARTIFACT_KEYS if key not in artifact]
+        if missing:
+            raise ValueError(f"Risk model artifact is missing {', '.join(missing)}")
+        version = artifact.get('version')
+        if version not in (1, MODEL_VERSION):
+            raise ValueError(f"Unsupported risk model version {version!r}, expected {MODEL_VERSION}")
+        if artifact.get('feature_cols') != self.feature_cols:
+            raise ValueError('Risk model was trained on different features')
+        try:
+            means = np.array(artifact['feature_means'], dtype=float)
+            stds = np.array(artifact['feature_stds'], dtype=float)
+            centroids = np.array(artifact['centroids'], dtype=float)
+            rows = int(artifact.get('rows') or 0)
+            if version == 1:
+                # No online state yet: start it from the trained model
+                m2 = stds ** 2 * rows
+                cluster_counts = np.full(len(centroids), rows / max(len(centroids), 1))
+                baseline = {'means': means, 'stds': stds, 'centroids': centroids}
+            else:
+                m2 = np.array(artifact['feature_m2'], dtype=float)
+                cluster_counts = np.array(artifact['cluster_counts'], dtype=float)
+                baseline = {name: np.array(artifact[f"baseline_{name}"], dtype=float)
+                            for name in ('means', 'stds', 'centroids')}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Risk model artifact is incomplete')
+        n_features = len(self.feature_cols)
+        if means.shape != (n_features,) or stds.shape != (n_features,) or centroids.ndim != 2 \
+                or centroids.shape[1] != n_features or len(centroids) == 0 \
+                or m2.shape != means.shape or cluster_counts.shape != (len(centroids),) \
+                or baseline['centroids'].shape != centroids.shape \
+                or baseline['means'].shape != means.shape or baseline['stds'].shape != stds.shape:
+            raise ValueError('Risk model artifact has the wrong shape')
+        self.feature_means, self.feature_stds, self.non_defaulter_centroids = means, stds, centroids
+        self.stats = RunningStats.restore(rows, means, m2)
+        self.cluster_counts, self.baseline = cluster_counts, baseline
+        self.model_info = {key: value for key, value in artifact.items() if key not in ARTIFACT_ARRAYS}
+        self.model_info['version'] = MODEL_VERSION
     
     def _initialize_model(self):
         """Initialize clustering model with non-defaulter data"""
         try:
+            # Imported here so the clustering itself does not need the survey service
+            from services.non_defaulter_service import get_all_non_defaulters
             non_defaulters = get_all_non_defaulters()
 
             
@@ -72,104 +395,142 @@ class RiskDistanceCalculator:
 
                 return False
             
-            # Extract and normalize features
-            features = []
-            feature_values = {col: [] for col in self.feature_cols}
-            
-            for nd in non_defaulters:
-                feature_row = []
-                for col in self.feature_cols:
-                    value = nd.get(col, 0) or 0
-                    feature_row.append(float(value))
-                    feature_values[col].append(float(value))
-                features.append(feature_row)
-            
-            # Calculate normalization parameters
-            self.feature_means = []
-            self.feature_stds = []
-            for col in self.feature_cols:
-                mean, std = self._calculate_mean_std(feature_values[col])
-                self.feature_means.append(mean)
-                self.feature_stds.append(std)
-            
-            # Normalize features
-            normalized_features = []
-            for feature_row in features:
-                normalized_row = []
-                for i, value in enumerate(feature_row):
-                    normalized_value = (value - self.feature_means[i]) / self.feature_stds[i]
-                    normalized_row.append(normalized_value)
-                normalized_features.append(normalized_row)
-            
-            # Simple clustering
-            k = min(3, max(2, len(non_defaulters) // 2))
-            self.non_defaulter_centroids = self._simple_clustering(normalized_features, k)
-            
-
-            logger.info(f"Initialized risk distance calculator with {k} centroids")
-            return True
+            return self.fit(non_defaulters)
             
         except Exception as e:
 
             logger.error(f"Error initializing risk distance calculator: {str(e)}")
             return False
     
+    def calculate_risk_distances(self, users):
+        """
+        calculate_risk_distance for many users at once: one normalization and
+        one users x centroids distance matrix. Raises RuntimeError if the
+        model is not initialized.
+        """
+        if self.non_defaulter_centroids is None:
+            raise RuntimeError('Risk distance calculator not initialized')
+        
+        normalized = (self.feature_matrix(users) - self.feature_means) / self.feature_stds
+        differences = normalized[:, None, :] - self.non_defaulter_centroids[None, :, :]
+        distances = np.sqrt((differences ** 2).sum(axis=2))
+        closest = distances.argmin(axis=1)
+        min_distance = distances[np.arange(len(closest)), closest]
+        
+        # Normalize distance to risk score (0-100)
+        risk_score = np.minimum(100, (min_distance / MAX_EXPECTED_DISTANCE) * 100)
+        categories = np.searchsorted(RISK_CATEGORY_BOUNDS, risk_score, side='left')
+        
+        return [{
+            'risk_distance': round(distance, 4),
+            'risk_score': round(score, 2),
+            'risk_category': RISK_CATEGORIES[category],
+            'closest_cluster': cluster
+        } for distance, score, category, cluster in zip(
+            min_distance.tolist(), risk_score.tolist(), categories.tolist(), closest.tolist()
+        )]
+    
     def calculate_risk_distance(self, user_scores):
         """Calculate risk distance for a single user"""
         try:
             if self.non_defaulter_centroids is None:
                 return {'error': 'Risk distance calculator not initialized'}
-            
-            # Extract and normalize user features
-            user_features = []
-            for i, col in enumerate(self.feature_cols):
-                value = float(user_scores.get(col, 0) or 0)
-                normalized_value = (value - self.feature_means[i]) / self.feature_stds[i]
-                user_features.append(normalized_value)
-            
-            # Calculate distances to all centroids
-            distances = [self._euclidean_distance(user_features, centroid) 
-                        for centroid in self.non_defaulter_centroids]
-            
-            # Get minimum distance and closest cluster
-            min_distance = min(distances)
-            closest_cluster = distances.index(min_distance)
-            
-            # Normalize distance to risk score (0-100)
-            max_expected_distance = 5.0  # Empirical max for normalized features
-            risk_score = min(100, (min_distance / max_expected_distance) * 100)
-            
-            # Risk categories
-            if risk_score <= 20:
-                risk_category = 'Very Low'
-            elif risk_score <= 40:
-                risk_category = 'Low'
-            elif risk_score <= 60:
-                risk_category = 'Medium'
-            elif risk_score <= 80:
-                risk_category = 'High'
-            else:
-                risk_category = 'Very High'
-            
-            return {
-                'risk_distance': round(min_distance, 4),
-                'risk_score': round(risk_score, 2),
-                'risk_category': risk_category,
-                'closest_cluster': closest_cluster
-            }
+            return self.calculate_risk_distances([user_scores])[0]
             
         except Exception as e:
             logger.error(f"Error calculating risk distance: {str(e)}")
             return {'error': f'Risk calculation error: {str(e)}'}
 
+def model_path():
+    return os.environ.get('RISK_MODEL_PATH', DEFAULT_MODEL_PATH)
+
+
+def save_model(calculator, path=None):
+    """Write the calculator's artifact atomically; returns the path"""
+    path = path or model_path()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False, encoding='utf-8') as f:
+        json.dump(calculator.to_artifact(), f, separators=(',', ':'))
+    os.replace(f.name, path)
+    return path
+
+
+def model_from_artifact(artifact):
+    """Calculator from a decoded artifact; raises ValueError if invalid"""
+    if not isinstance(artifact, dict):  # artifact=None would train from the database instead
+        raise ValueError(f"Risk model artifact must be a JSON object, got {type(artifact).__name__}")
+    return RiskDistanceCalculator(artifact=artifact)
+
+
+def load_model(path=None):
+    """Calculator from a saved artifact; raises OSError if missing, ValueError if invalid"""
+    with open(path or model_path(), encoding='utf-8') as f:
+        artifact = json.load(f)
+    return model_from_artifact(artifact)
+
+
+def newest_model(*calculators):
+    """The most recent model: latest training, then most online updates; None if there is none"""
+    candidates = [calculator for calculator in calculators if calculator is not None]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c.model_info.get('trained_at') or '', c.model_info.get('online_updates', 0)))
+
+
+def newest_available_model(published, path=None):
+    """Newer of the `published` model and the artifact at `path`; the file's error is raised only when there is neither"""
+    try:
+        bundled = load_model(path)
+    except (OSError, ValueError) as e:
+        if published is None:
+            raise
+        logger.warning(f"Using the published risk model; no usable artifact file ({e})")
+        bundled = None
+    return newest_model(published, bundled)
+
+
+def _load_published_model():
+    """The model published in the database, or None when there is none or it cannot be read"""
+    # Imported here so scoring and training do not need a database
+    from database import get_db_session, close_db_session
+    from services.risk_model_store import load_published_model
+    session = None
+    try:
+        session = get_db_session()
+        return load_published_model(session)
+    except Exception as e:
+        logger.warning(f"Could not load the published risk model: {e}")
+        return None
+    finally:
+        close_db_session(session)
+
+
 # Global instance
 risk_calculator = None
 
+def refresh_risk_calculator(path=None):
+    """
+    Swap in the newest of the model published in the database and the one
+    bundled at RISK_MODEL_PATH; an explicit `path` loads only that file. The
+    current model stays in place if loading fails.
+    """
+    global risk_calculator
+    calculator = load_model(path) if path else newest_available_model(_load_published_model())
+    risk_calculator = calculator
+    logger.info(f"Loaded risk model trained at {calculator.model_info.get('trained_at')} "
+                f"with {calculator.model_info.get('online_updates', 0)} online updates")
+    return calculator.model_info
+
 def get_risk_calculator():
-    """Lazy initialization of risk calculator"""
+    """Saved model if there is one, otherwise train from the non-defaulters"""
     global risk_calculator
     if risk_calculator is None:
-        risk_calculator = RiskDistanceCalculator()
+        try:
+            refresh_risk_calculator()
+        except (OSError, ValueError) as e:
+            logger.warning(f"No usable risk model artifact ({e}); training from non-defaulters")
+            risk_calculator = RiskDistanceCalculator()
     elif risk_calculator.non_defaulter_centroids is None:
         # Try to re-initialize if it failed before
         risk_calculator._initialize_model()
@@ -0,0 +1,89 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Numeric, Date, DateTime, select
+
+
+def json_default(obj):
+    """json.dumps hook for the types SQLAlchemy hands back"""
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    return json.dumps(obj, default=json_default)
+
+
+def _converter_for(column):
+    """Per-column conversion to JSON-ready values; None means pass through"""
+    if isinstance(column.type, Numeric):
+        return float
+    if isinstance(column.type, DateTime):
+        return datetime.isoformat
+    if isinstance(column.type, Date):
+        return date.isoformat
+    return None
+
+
+class RowSerializer:
+    """
+    Precompiled column-tuple -> dict conversion for one model.
+
+    Selects only the listed columns through SQLAlchemy Core and converts
+    Numeric/Date values in a single pass, skipping ORM hydration and the
+    recursive serialize_dates walk.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = [model.__table__.c[field] for field in self.fields]
+        self._conversions = [
+            (i, converter) for i, converter in enumerate(_converter_for(c) for c in self.columns) if converter
+        ]
+
+    def select(self, *leading):
+        """Core select of `leading` columns followed by the serialized fields"""
+        return select(*leading, *self.columns)
+
+    def convert(self, row):
+        values = list(row)
+        for i, converter in self._conversions:
+            value = values[i]
+            if value is not None:
+                values[i] = converter(value)
+        return dict(zip(self.fields, values))
+
+    def convert_all(self, rows):
+        return [self.convert(row) for row in rows]
+
+
+# Same fields, in the same order, as LoanTables.to_dict / LoanMetadata.to_dict
+LOAN_TABLES_FIELDS = [
+    'loan_id', 'late_payment_fee', 'service_fee', 'insurance_fee', 'interest', 'principal', 'installment',
+    'calc_installment', 'period', 'due_date', 'payment_date', 'late_days', 'payed_amount',
+    'outstanding_balance', 'consecutive_defaulted', 'status'
+]
+LOAN_METADATA_FIELDS = [
+    'user_id', 'loan_id', 'amount', 'term', 'rate', 'installment', 'payed', 'balance', 'defaulted_payments',
+    'defaulted_amount', 'start_date', 'end_date', 'risk_distance', 'risk_score', 'risk_category',
+    'closest_cluster', 'user_risk'
+]
+
+SERIALIZED_FIELDS = {
+    'loan_tables': LOAN_TABLES_FIELDS,
+    'loan_metadata': LOAN_METADATA_FIELDS,
+}
+
+_serializers = {}
+
+
+def get_serializer(model):
+    """Cached serializer for a model listed in SERIALIZED_FIELDS"""
+    if model not in _serializers:
+        _serializers[model] = RowSerializer(model, SERIALIZED_FIELDS[model.__tablename__])
+    return _serializers[model]
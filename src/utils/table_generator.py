@@ -1,20 +1,29 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+import math
 from math import ceil
 from operator import itemgetter
 from typing import List
 import logging
 from datetime import date
-# Removed numpy_financial to avoid numpy dependency
-# Using basic financial formulas instead
 from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
 
 from utils.functions import cast_value, map_risk_to_rate
+from utils.amortization_engine import schedule_rows
 
 logger = logging.getLogger(__name__)   
 
 
+def periods_for_instalment(r, instalment, amount):
+  """Number of monthly periods, rounded, that repay `amount` with `instalment` at yearly rate r"""
+  monthly_rate = float(r/12)
+  payment = float(instalment)
+  principal = float(amount)
+  if monthly_rate == 0:
+    return round(principal / payment)
+  return round(math.log(1 + (principal * monthly_rate) / payment) / math.log(1 + monthly_rate))
+
+
 class TableGenerator():
   def __init__(self, strategy = None) -> None:
     self._strategy = self.select_method(strategy)
@@ -45,31 +54,9 @@ class Strategy(ABC):
       (k, v) for k, v in kwargs.items()
     }
   
-  def calculate_values(self, r, period, amount):
-    results = []
-    balance = amount
-    
-    for i in range(1, int(period) + 1):
-      # Basic financial calculations without numpy
-      monthly_rate = r/12
-      payment = amount * (monthly_rate * (1 + monthly_rate)**period) / ((1 + monthly_rate)**period - 1)
-      
-      # Calculate interest and principal for this period
-      interest = balance * monthly_rate
-      principal = payment - interest
-      balance = balance - principal
-      
-      payment_date = date.today() + relativedelta(months=i-1)
-      
-      results.append({
-        'Payment_Date': payment_date.isoformat(),
-        'Payment': round(payment, 2),
-        'Principal': round(principal, 2),
-        'Interest': round(interest, 2),
-        'Balance': round(balance, 2)
-      })
-    
-    return results
+  def calculate_values(self, r, period, amount, start_date=None):
+    # Closed-form, vectorized columns; same rows as the old per-period loop
+    return schedule_rows(amount, r, int(period), start_date)
 
 
 class GenerateByPeriod(Strategy):
@@ -85,18 +72,7 @@ class GenerateByInstalment(Strategy):
   def generate_table(self, **kwargs):
     user_risk, instalment, amount = itemgetter('user_risk', 'instalment', 'amount')(self.parse_args(**kwargs))
     r = map_risk_to_rate(user_risk)
-    # Calculate number of periods using basic formula
-    monthly_rate = float(r/12)
-    payment = float(instalment)
-    principal = float(amount)
-    
-    if monthly_rate == 0:
-      period = principal / payment
-    else:
-      import math
-      period = math.log(1 + (principal * monthly_rate) / payment) / math.log(1 + monthly_rate)
-    
-    period = round(period)
+    period = periods_for_instalment(r, instalment, amount)
     res = self.calculate_values(r=r, period=period, amount=amount)
     data = {'data': res, 'rate': r}
     return data
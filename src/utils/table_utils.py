@@ -1,5 +1,10 @@
 import uuid
 from datetime import datetime, date
+from itertools import repeat
+
+from utils.table_generator import periods_for_instalment
+from utils.functions import map_risk_to_rate
+from utils.amortization_engine import schedule_rows
 
 def safe_float(value):
     """Convert string to float, handling European decimal format"""
@@ -50,6 +55,135 @@ def prepare_data(data):
 
     return data, metadata
 
+# Column order of the tuples built by prepare_loan_columns
+SCHEDULE_COLUMNS = [
+    'loan_id', 'late_payment_fee', 'service_fee', 'insurance_fee', 'interest', 'principal', 'installment',
+    'calc_installment', 'period', 'due_date', 'payment_date', 'late_days', 'payed_amount', 'outstanding_balance',
+    'consecutive_defaulted', 'status'
+]
+METADATA_COLUMNS = [
+    'user_id', 'loan_id', 'amount', 'term', 'rate', 'installment', 'payed', 'balance', 'defaulted_payments',
+    'defaulted_amount', 'start_date', 'end_date', 'risk_distance', 'risk_score', 'risk_category',
+    'closest_cluster', 'user_risk'
+]
+SCHEDULE_NUMERIC_FIELDS = ['service_fee', 'insurance_fee', 'interest', 'principal', 'installment', 'period']
+METADATA_REQUIRED_FIELDS = [
+    'user_id', 'amount', 'term', 'rate', 'risk_distance', 'risk_score', 'risk_category', 'closest_cluster', 'user_risk'
+]
+
+
+def _to_date(value):
+    return value if isinstance(value, date) else datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def prepare_loan_columns(loan):
+    """
+    Validate one {'metadata', 'data'} loan and convert it column by column.
+
+    Same defaults as prepare_data, without mutating the request: returns the
+    loan_id, the schedule as tuples in SCHEDULE_COLUMNS order and the
+    metadata tuple in METADATA_COLUMNS order. Raises ValueError on bad input.
+    """
+    try:
+        metadata, data = loan['metadata'], loan['data']
+    except (KeyError, TypeError):
+        raise ValueError("loan needs 'metadata' and 'data'")
+    if not data:
+        raise ValueError('schedule is empty')
+    missing = [field for field in METADATA_REQUIRED_FIELDS if metadata.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"metadata is missing {', '.join(missing)}")
+
+    try:
+        columns = {field: [safe_float(row[field]) for row in data] for field in SCHEDULE_NUMERIC_FIELDS}
+        due_dates = [_to_date(row['due_date']) for row in data]
+    except KeyError as e:
+        raise ValueError(f"schedule rows need {e.args[0]}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid schedule value: {e}")
+
+    loan_id = metadata.get('loan_id') or uuid.uuid4().hex
+    n = len(data)
+    schedule = list(zip(
+        repeat(loan_id, n), repeat(0.0, n), columns['service_fee'], columns['insurance_fee'], columns['interest'],
+        columns['principal'], columns['installment'], repeat(None, n), columns['period'], due_dates,
+        repeat(None, n), repeat(0, n), repeat(0.0, n), repeat(0.0, n), repeat(None, n), repeat('pending', n)
+    ))
+
+    try:
+        amount = safe_float(metadata['amount'])
+        row = (
+            metadata['user_id'], loan_id, amount, safe_float(metadata['term']), safe_float(metadata['rate']),
+            columns['installment'][0], 0.0, amount, 0, 0, due_dates[0], due_dates[-1],
+            safe_float(metadata['risk_distance']), safe_float(metadata['risk_score']), metadata['risk_category'],
+            int(metadata['closest_cluster']), safe_float(metadata['user_risk'])
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid metadata value: {e}")
+    return loan_id, schedule, row
+
+
+def schedule_from_terms(metadata, terms):
+    """
+    Build a save_table {'metadata', 'data'} loan from loan terms.
+
+    `terms` holds amount, user_risk and either term (periods) or instalment,
+    plus optional per-period service_fee / insurance_fee that are added to
+    each generated instalment. Rate, term and amount in the metadata come
+    from the generated schedule. Raises ValueError on incomplete or malformed
+    terms.
+    """
+    try:
+        amount, user_risk = safe_float(terms['amount']), safe_float(terms['user_risk'])
+        service_fee = safe_float(terms.get('service_fee', 0))
+        insurance_fee = safe_float(terms.get('insurance_fee', 0))
+    except KeyError as e:
+        raise ValueError(f"terms need {e.args[0]}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid terms value: {e}")
+    if amount <= 0:
+        raise ValueError('amount must be positive')
+
+    rate = map_risk_to_rate(user_risk)
+    try:
+        if terms.get('term'):
+            periods = safe_float(terms['term'])
+            if not periods.is_integer():
+                raise ValueError('term must be a whole number of periods')
+            periods = int(periods)
+        elif terms.get('instalment'):
+            instalment = safe_float(terms['instalment'])
+            if instalment <= 0:
+                raise ValueError('instalment must be positive')
+            periods = periods_for_instalment(rate, instalment, amount)
+        else:
+            raise ValueError('terms need term or instalment')
+    except TypeError as e:
+        raise ValueError(f"invalid terms value: {e}")
+    # schedule_rows keeps a fractional amount; TableGenerator casts it to int
+    generated = schedule_rows(amount, rate, periods)
+    if not generated:
+        raise ValueError('terms produce an empty schedule')
+
+    data = [{
+        'due_date': row['Payment_Date'],
+        'service_fee': service_fee,
+        'insurance_fee': insurance_fee,
+        'interest': row['Interest'],
+        'principal': row['Principal'],
+        'installment': round(row['Payment'] + service_fee + insurance_fee, 2),
+        'period': period,
+    } for period, row in enumerate(generated, start=1)]
+    metadata = {
+        **metadata,
+        'amount': amount,
+        'term': len(data),
+        'rate': round(rate * 100, 4),  # stored as a yearly percentage
+        'user_risk': user_risk,
+    }
+    return {'metadata': metadata, 'data': data}
+
+
 def serialize_dates(obj):
     """Convert date objects to ISO format strings for JSON serialization"""
     if isinstance(obj, dict):
@@ -0,0 +1,61 @@
+"""Shared helpers for tests that run against an in-memory SQLite database"""
+import sys
+import os
+import warnings
+from datetime import date
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, insert, exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from migrations import upgrade
+from utils.cache import loan_cache
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+
+# SQLite stores Numeric as float; the precision warning is expected here
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning, message='.*Decimal objects natively.*')
+
+
+def make_sqlite_sessionmaker(url=None):
+    """Migrated SQLite database; in-memory and shared by every session unless `url` is given"""
+    if url:
+        engine = create_engine(url)
+    else:
+        engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    upgrade(engine)
+    # The loan cache is process-wide; never let one test's rows leak into another
+    loan_cache.clear()
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_loan(session, loan_id, first_due_date, periods=3, installment=1000.0, principal=800.0,
+              user_id='user-1', balance=None, rate=24.0, rows=None):
+    """Insert a loan's metadata and a plain pending schedule; `rows` overrides per period"""
+    rows = rows or {}
+    schedule = []
+    for period in range(1, periods + 1):
+        row = {
+            'loan_id': loan_id, 'late_payment_fee': 0.0, 'service_fee': 0.0, 'insurance_fee': 0.0,
+            'interest': installment - principal, 'principal': principal, 'installment': installment,
+            'calc_installment': None, 'period': period,
+            'due_date': first_due_date + relativedelta(months=period - 1),
+            'payment_date': None, 'late_days': 0, 'payed_amount': 0.0, 'outstanding_balance': 0.0,
+            'consecutive_defaulted': 0, 'status': 'pending',
+        }
+        row.update(rows.get(period, {}))
+        schedule.append(row)
+    session.execute(insert(LoanTables), schedule)
+    amount = principal * periods
+    session.execute(insert(LoanMetadata), [{
+        'user_id': user_id, 'loan_id': loan_id, 'amount': amount, 'term': periods, 'rate': rate,
+        'installment': installment, 'payed': 0.0, 'balance': amount if balance is None else balance,
+        'defaulted_payments': 0, 'defaulted_amount': 0, 'start_date': schedule[0]['due_date'],
+        'end_date': schedule[-1]['due_date'], 'risk_distance': 1.0, 'risk_score': 20.0,
+        'risk_category': 'Low', 'closest_cluster': 0, 'user_risk': 75.0,
+    }])
+    session.commit()
@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+import random
+from datetime import date
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dateutil.relativedelta import relativedelta
+from utils.amortization_engine import amortize, due_dates, schedule_rows, schedule_template, schedule_templates
+from utils.cache import LRUTTLCache
+from utils.table_generator import TableGenerator
+
+
+def loop_schedule(r, period, amount, start):
+    """The per-period loop TableGenerator used before the vectorized engine"""
+    results = []
+    balance = amount
+    for i in range(1, int(period) + 1):
+        monthly_rate = r/12
+        payment = amount * (monthly_rate * (1 + monthly_rate)**period) / ((1 + monthly_rate)**period - 1)
+        interest = balance * monthly_rate
+        principal = payment - interest
+        balance = balance - principal
+        results.append({
+            'Payment_Date': (start + relativedelta(months=i-1)).isoformat(),
+            'Payment': round(payment, 2),
+            'Principal': round(principal, 2),
+            'Interest': round(interest, 2),
+            'Balance': round(balance, 2)
+        })
+    return results
+
+
+class TestAmortizationEngine(unittest.TestCase):
+
+    def test_matches_loop_to_the_cent(self):
+        """Random rate/term/amount combinations produce the loop's rows"""
+        rng = random.Random(7)
+        start = date(2024, 1, 31)
+        for _ in range(500):
+            r = rng.choice([0.21, 0.22, 0.23, 0.24, 0.37, 0.40])
+            period, amount = rng.randint(1, 72), rng.randint(100, 200000)
+            self.assertEqual(schedule_rows(amount, r, period, start), loop_schedule(r, period, amount, start))
+
+    def test_many_loans_in_flat_arrays(self):
+        """Loans of different terms are laid out back to back"""
+        schedule = amortize([1000, 5000], [0.24, 0.37], [3, 5])
+        self.assertEqual(schedule.offsets.tolist(), [0, 3, 8])
+        self.assertEqual(schedule.period.tolist(), [1, 2, 3, 1, 2, 3, 4, 5])
+        self.assertAlmostEqual(schedule.principal[:3].sum(), 1000, places=6)
+        self.assertAlmostEqual(schedule.principal[3:].sum(), 5000, places=6)
+        self.assertAlmostEqual(schedule.balance[7], 0, places=6)
+
+    def test_zero_rate(self):
+        schedule = amortize(1200, 0.0, 12)
+        self.assertTrue((schedule.payment == 100).all())
+        self.assertTrue((schedule.interest == 0).all())
+
+    def test_due_dates_clamp_like_relativedelta(self):
+        for start in (date(2024, 1, 31), date(2023, 8, 30), date(2024, 2, 29), date(2024, 5, 1)):
+            expected = [(start + relativedelta(months=i)).isoformat() for i in range(30)]
+            self.assertEqual([str(d) for d in due_dates(start, 30)], expected)
+
+    def test_generator_output_format(self):
+        """TableGenerator keeps its response shape"""
+        result = TableGenerator('repayment_plan_period').use_method(user_risk=75, period=3, amount=1000)
+        self.assertEqual(result['rate'], 0.23)
+        self.assertEqual(list(result['data'][0]), ['Payment_Date', 'Payment', 'Principal', 'Interest', 'Balance'])
+        self.assertEqual(result['data'][-1]['Balance'], 0.0)
+        self.assertEqual(schedule_rows(1000, 0.23, 0), [])
+
+
+class TestScheduleTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self._local = schedule_templates.local
+        schedule_templates.local = LRUTTLCache(max_entries=2, ttl=float('inf'))
+        self._stats = dict(schedule_templates.stats)
+        schedule_templates.stats.update(hits=0, misses=0)
+
+    def tearDown(self):
+        schedule_templates.local = self._local
+        schedule_templates.stats.update(self._stats)
+
+    def test_repeat_terms_reuse_one_template(self):
+        """Different amounts and start dates at the same (rate, term) share a template"""
+        first = schedule_rows(1000, 0.23, 12, date(2024, 1, 31))
+        second = schedule_rows(25000, 0.23, 12, date(2025, 3, 15))
+        self.assertEqual(second, loop_schedule(0.23, 12, 25000, date(2025, 3, 15)))
+        self.assertEqual(first, loop_schedule(0.23, 12, 1000, date(2024, 1, 31)))
+        snapshot = schedule_templates.snapshot()
+        self.assertEqual((snapshot['misses'], snapshot['hits']), (1, 1))
+        self.assertEqual(snapshot['hit_rate'], 0.5)
+
+    def test_template_is_per_unit_and_read_only(self):
+        template = schedule_template(0.37, 6)
+        self.assertIs(schedule_template(0.37, 6), template)
+        self.assertAlmostEqual(template.principal.sum(), 1.0, places=12)
+        with self.assertRaises(ValueError):
+            template.balance[0] = 0
+
+    def test_bounded(self):
+        for term in (6, 12, 18):
+            schedule_template(0.24, term)
+        snapshot = schedule_templates.snapshot()
+        self.assertEqual((snapshot['entries'], snapshot['evictions']), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from utils.cache import LRUTTLCache, ReadThroughCache, loan_cache, loan_row_key, user_metadata_key, window_key, invalidate_on_commit
+from services.table_service import get_loan_by_loan_id, get_metadata_by_user_id
+from services.payment_service import load_schedule_window
+from services.metadata_service import update_loan_metadata
+from services.month_end_service import process_loan_chunk
+from utils.date_utils import get_payment_date, get_schedule_window
+
+
+class TestLRUTTLCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        cache = LRUTTLCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl_expiry(self):
+        """Entries expire after their TTL"""
+        cache = LRUTTLCache(ttl=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_backend_fills_local(self):
+        """A shared hit is copied into the local cache and counted separately"""
+        shared = LRUTTLCache()
+        shared.set('k', 'v')
+        cache = ReadThroughCache(LRUTTLCache(), shared)
+        self.assertEqual(cache.get_or_load('k', lambda: 'db'), 'v')
+        self.assertEqual(cache.get_or_load('k', lambda: 'db'), 'v')
+        self.assertEqual(cache.snapshot()['shared_hits'], 1)
+        self.assertEqual(cache.snapshot()['hits'], 1)
+
+        cache.invalidate('k')
+        self.assertIsNone(shared.get('k'))
+
+
+class TestLoanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        session = self.Session()
+        seed_loan(session, 'loan-a', date.today(), user_id='user-1')
+        session.close()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def test_repeat_reads_hit_cache(self):
+        """Repeat loan reads are served without another query"""
+        first, status = get_loan_by_loan_id('loan-a')
+        self.assertEqual(status, 200)
+        self.assertEqual((first['loan_id'], first['period']), ('loan-a', 1))
+        misses = loan_cache.stats['misses']
+
+        with patch('services.table_service._load_first_schedule_row', side_effect=AssertionError('hit the database')):
+            self.assertEqual(get_loan_by_loan_id('loan-a'), (first, 200))
+        self.assertEqual(loan_cache.stats['misses'], misses)
+
+        self.assertEqual(get_metadata_by_user_id('user-1')[0][0]['loan_id'], 'loan-a')
+        self.assertEqual(get_loan_by_loan_id('missing')[1], 404)
+
+    def test_invalidation_waits_for_commit(self):
+        """Keys are only dropped once the write commits"""
+        get_loan_by_loan_id('loan-a')
+        session = self.Session()
+        invalidate_on_commit(session, [loan_row_key('loan-a')])
+        session.rollback()
+        self.assertIsNotNone(loan_cache.local.get(loan_row_key('loan-a')))
+
+        invalidate_on_commit(session, [loan_row_key('loan-a')])
+        session.commit()
+        session.close()
+        self.assertIsNone(loan_cache.local.get(loan_row_key('loan-a')))
+
+    def test_writes_invalidate_window_and_metadata(self):
+        """Metadata and month-end writes refresh the cached window, loan row and metadata"""
+        payment_date = get_payment_date()
+        start_date, end_date = get_schedule_window(payment_date)
+        session = self.Session()
+        before = load_schedule_window(session, 'loan-a', start_date, end_date)
+        self.assertEqual(before[0]['status'], 'pending')
+        get_loan_by_loan_id('loan-a')
+        get_metadata_by_user_id('user-1')
+
+        update_loan_metadata('loan-a', {'principal': 800.0, 'payed_amount': 1000.0}, session)
+        self.assertEqual(get_metadata_by_user_id('user-1')[0][0]['payed'], 1000.0)
+
+        load_schedule_window(session, 'loan-a', start_date, end_date)
+        get_loan_by_loan_id('loan-a')
+        get_metadata_by_user_id('user-1')
+        process_loan_chunk(session, ['loan-a'], payment_date)
+        self.assertIsNotNone(loan_cache.local.get(window_key('loan-a')))
+        session.commit()
+        session.close()
+        self.assertIsNone(loan_cache.local.get(window_key('loan-a')))
+        self.assertIsNone(loan_cache.local.get(loan_row_key('loan-a')))
+        self.assertIsNone(loan_cache.local.get(user_metadata_key('user-1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
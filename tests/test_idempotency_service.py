@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.user_payments import UserPayments
+from models.payment_request import PaymentRequest
+from services.idempotency_service import request_key, save_responses
+from services.payment_service import record_payment
+from services.payment_ingest_service import ingest_payments
+
+
+class TestRequestKey(unittest.TestCase):
+
+    def test_header_key_wins(self):
+        data = {'loan_id': 'loan-a', 'document_id': 'doc-1'}
+        self.assertEqual(request_key(data, 'abc'), 'key:abc')
+        self.assertEqual(request_key(data), 'doc:loan-a:doc-1')
+        self.assertIsNone(request_key({'loan_id': 'loan-a'}))
+
+
+class TestIdempotentPayments(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.date_patcher = patch('services.payment_service.get_payment_date', return_value=date(2024, 3, 20))
+        self.date_patcher.start()
+        self.session = self.Session()
+        seed_loan(self.session, 'loan-a', date(2024, 2, 25), rows={
+            1: {'status': 'payed', 'outstanding_balance': 0.0},
+        })
+
+    def tearDown(self):
+        self.session.close()
+        self.date_patcher.stop()
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def payed_amount(self):
+        self.session.expire_all()
+        return float(self.session.query(LoanTables).filter_by(loan_id='loan-a', period=2).one().payed_amount)
+
+    def test_retry_replays_stored_response(self):
+        """A retried document is answered from the stored response with a single read"""
+        data = {'loan_id': 'loan-a', 'installment': 400, 'document_id': 'doc-1'}
+        first = record_payment(data)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(self.engine, 'before_cursor_execute', listener)
+        try:
+            retry = record_payment(data)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(retry, first)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.payed_amount(), 400.0)
+        self.assertEqual(self.session.query(UserPayments).count(), 1)
+
+    def test_header_key(self):
+        """An explicit key dedupes requests without a document_id"""
+        record_payment({'loan_id': 'loan-a', 'installment': 400}, idempotency_key='k-1')
+        record_payment({'loan_id': 'loan-a', 'installment': 400}, idempotency_key='k-1')
+        record_payment({'loan_id': 'loan-a', 'installment': 100}, idempotency_key='k-2')
+        self.assertEqual(self.payed_amount(), 500.0)
+
+    def test_concurrent_duplicate_replays_winner(self):
+        """If another request stores the key after our lookup, its response is returned"""
+        winner = {'status': 'payed', 'payed_amount': 400.0}
+        save_responses(self.session, [('doc:loan-a:doc-1', {'loan_id': 'loan-a', 'document_id': 'doc-1'}, winner)])
+        self.session.commit()
+
+        # The racing request commits between our lookup and our insert
+        with patch('services.payment_service.find_response', side_effect=[None, winner]):
+            result = record_payment({'loan_id': 'loan-a', 'installment': 400, 'document_id': 'doc-1'})
+
+        self.assertEqual(result, winner)
+        self.assertEqual(self.payed_amount(), 0.0)
+        self.assertEqual(self.session.query(PaymentRequest).count(), 1)
+
+    def test_batch_skips_posted_documents(self):
+        """Remittance lines already posted, or repeated in the file, are not applied twice"""
+        record_payment({'loan_id': 'loan-a', 'installment': 400, 'document_id': 'doc-1'})
+        report = ingest_payments(self.session, [
+            {'loan_id': 'loan-a', 'installment': 400, 'document_id': 'doc-1'},
+            {'loan_id': 'loan-a', 'installment': 100, 'document_id': 'doc-2'},
+            {'loan_id': 'loan-a', 'installment': 100, 'document_id': 'doc-2'},
+        ], date(2024, 3, 20))
+
+        self.assertEqual([r['code'] for r in report['results']], ['duplicate', 'applied', 'duplicate'])
+        self.assertEqual(self.payed_amount(), 500.0)
+        # The batch's records replay through the single-payment endpoint too
+        self.assertEqual(record_payment({'loan_id': 'loan-a', 'installment': 100, 'document_id': 'doc-2'})['payed_amount'], 500.0)
+        self.assertEqual(self.payed_amount(), 500.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
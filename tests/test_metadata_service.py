@@ -7,11 +7,15 @@ from datetime import date
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-# Mock SQLAlchemy dependencies before importing
-sys.modules['sqlalchemy'] = Mock()
-sys.modules['sqlalchemy.exc'] = Mock()
-sys.modules['database'] = Mock()
-sys.modules['models.loan_metadata'] = Mock()
+# Mock SQLAlchemy dependencies before importing, only when they are not
+# installed so other test modules keep the real packages
+try:
+    import sqlalchemy  # noqa: F401
+except ImportError:
+    sys.modules['sqlalchemy'] = Mock()
+    sys.modules['sqlalchemy.exc'] = Mock()
+    sys.modules['database'] = Mock()
+    sys.modules['models.loan_metadata'] = Mock()
 
 # Mock the safe_float function
 def mock_safe_float(value):
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import create_engine, inspect, select
+from migrations import upgrade, check_schema, schema_fingerprint, head_revision, schema_version, MIGRATIONS
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        """Use an in-memory SQLite stand-in for the production database"""
+        self.engine = create_engine('sqlite://')
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_upgrade_creates_tables_and_version_rows(self):
+        """Upgrading an empty database creates every table and records each revision"""
+        applied = upgrade(self.engine)
+
+        self.assertEqual(applied, [m.revision for m in MIGRATIONS])
+        tables = set(inspect(self.engine).get_table_names())
+        self.assertTrue({'loan_metadata', 'loan_tables', 'user_payments', 'schema_version'} <= tables)
+
+    def test_hot_path_indexes_created(self):
+        """The hot-path lookups are backed by the declared indexes"""
+        upgrade(self.engine)
+        inspector = inspect(self.engine)
+        indexes = {
+            index['name']: (tuple(index['column_names']), bool(index['unique']))
+            for table in ('loan_tables', 'loan_metadata', 'user_payments')
+            for index in inspector.get_indexes(table)
+        }
+        self.assertEqual(indexes['ix_loan_tables_loan_id_due_date'], (('loan_id', 'due_date'), False))
+        self.assertEqual(indexes['ix_loan_tables_loan_id_period'], (('loan_id', 'period'), False))
+        self.assertEqual(indexes['ux_loan_metadata_loan_id'], (('loan_id',), True))
+        self.assertEqual(indexes['ix_loan_metadata_user_id'], (('user_id',), False))
+        self.assertEqual(indexes['ix_user_payments_loan_id_payment_date'], (('loan_id', 'payment_date'), False))
+
+    def test_upgrade_is_idempotent(self):
+        """A second upgrade has nothing to apply"""
+        upgrade(self.engine)
+        self.assertEqual(upgrade(self.engine), [])
+
+    def test_check_schema_before_and_after_upgrade(self):
+        """The startup check fails on an unmigrated database and passes after upgrade"""
+        self.assertFalse(check_schema(self.engine))
+        upgrade(self.engine)
+        self.assertTrue(check_schema(self.engine))
+
+    def test_check_schema_detects_stale_fingerprint(self):
+        """A head row with a different fingerprint is reported as outdated"""
+        upgrade(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(
+                schema_version.update().where(schema_version.c.revision == head_revision()).values(fingerprint='stale')
+            )
+        self.assertFalse(check_schema(self.engine))
+
+    def test_fingerprint_is_cumulative(self):
+        """Each revision's fingerprint covers the chain up to it"""
+        upgrade(self.engine)
+        with self.engine.connect() as connection:
+            rows = dict(connection.execute(select(schema_version.c.revision, schema_version.c.fingerprint)).all())
+        for migration in MIGRATIONS:
+            self.assertEqual(rows[migration.revision], schema_fingerprint(migration.revision))
+        self.assertEqual(rows[head_revision()], schema_fingerprint())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import sys
+import os
+import itertools
+import tempfile
+from datetime import date
+from unittest.mock import Mock, patch
+
+from sqlalchemy.exc import OperationalError
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from services.month_end_service import process_loan_chunk, shard_for
+from services.month_end_job_service import (
+    start_or_resume_job, run_job_slice, get_job, get_shards, run_job_shard, run_parallel_job, COMPLETED, RUNNING
+)
+
+
+class TestMonthEndJobService(unittest.TestCase):
+
+    def setUp(self):
+        """Three loans whose first period falls due before month-end"""
+        self.engine, Session = make_sqlite_sessionmaker()
+        self.session = Session()
+        for loan_id in ('loan-a', 'loan-b', 'loan-c'):
+            seed_loan(self.session, loan_id, date(2024, 4, 15))
+        self.last_day = date(2024, 3, 31)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def balances(self):
+        return {m.loan_id: float(m.balance) for m in self.session.query(LoanMetadata).all()}
+
+    def test_job_only_started_on_last_day(self):
+        """A new job is only created on the last day of the month"""
+        self.assertIsNone(start_or_resume_job(self.session, today=date(2024, 3, 30)))
+        job = start_or_resume_job(self.session, today=self.last_day)
+        self.assertEqual(job.job_key, '2024-03')
+        self.assertEqual(job.total_loans, 3)
+        self.assertEqual(job.payment_date, date(2024, 4, 20))
+
+    def test_slice_stops_on_budget_and_resumes_from_checkpoint(self):
+        """A slice that runs out of time leaves a cursor the next slice continues from"""
+        job = start_or_resume_job(self.session, today=self.last_day)
+
+        # Every perf_counter call advances one second: one chunk fits in a 2.5s budget
+        clock = Mock(perf_counter=itertools.count().__next__)
+        with patch('services.month_end_job_service.time', clock):
+            first = run_job_slice(self.session, job.job_key, time_budget=2.5, chunk_size=1)
+
+        self.assertTrue(first['continue'])
+        self.assertEqual(first['cursor_loan_id'], 'loan-a')
+        self.assertEqual(first['processed_loans'], 1)
+        self.assertEqual(self.balances(), {'loan-a': 1600.0, 'loan-b': 2400.0, 'loan-c': 2400.0})
+
+        second = run_job_slice(self.session, job.job_key, chunk_size=1)
+        self.assertFalse(second['continue'])
+        self.assertEqual(second['status'], COMPLETED)
+        self.assertEqual(second['updated_loans'], 3)
+        self.assertEqual(second['progress'], 100.0)
+        self.assertEqual(second['invocations'], 2)
+
+    def test_each_loan_rolled_exactly_once(self):
+        """Re-triggering a completed job does not roll any loan again"""
+        job = start_or_resume_job(self.session, today=self.last_day)
+        run_job_slice(self.session, job.job_key, chunk_size=2)
+        after_first = self.balances()
+
+        resumed = start_or_resume_job(self.session, job_key='2024-03')
+        result = run_job_slice(self.session, resumed.job_key, chunk_size=2)
+
+        self.assertEqual(self.balances(), after_first)
+        self.assertEqual(set(after_first.values()), {1600.0})
+        self.assertEqual(result['updated_loans'], 3)
+        self.assertEqual(get_job(self.session).job_key, '2024-03')
+
+
+
+class TestParallelMonthEndJob(unittest.TestCase):
+    """Worker processes need their own connections, so the database is a file"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.tmp.name, 'month_end.db')}"
+        self.engine, self.Session = make_sqlite_sessionmaker(self.url)
+        self.session = self.Session()
+        for n in range(12):
+            seed_loan(self.session, f'loan-{n:02d}', date(2024, 4, 15))
+        self.last_day = date(2024, 3, 31)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def balances(self):
+        self.session.expire_all()
+        return {m.loan_id: float(m.balance) for m in self.session.query(LoanMetadata).all()}
+
+    def test_workers_roll_every_loan_once(self):
+        """Sharded workers roll every loan and complete the month's job"""
+        report = run_parallel_job(3, database_url=self.url, chunk_size=2, today=self.last_day)
+
+        self.assertEqual((report['job_key'], report['status']), ('2024-03', COMPLETED))
+        self.assertEqual(report['updated_loans'], 12)
+        self.assertEqual(sum(shard['updated_loans'] for shard in report['shards']), 12)
+        self.assertEqual(set(self.balances().values()), {1600.0})
+        statuses = {r.status for r in self.session.query(LoanTables).filter_by(period=1).all()}
+        self.assertEqual(statuses, {'late'})
+
+    def test_rerun_rolls_nothing(self):
+        """A second run, even with another worker count, finds the job completed"""
+        run_parallel_job(3, database_url=self.url, chunk_size=5, today=self.last_day)
+        after_first = self.balances()
+        report = run_parallel_job(2, database_url=self.url, today=self.last_day)
+        self.assertEqual(self.balances(), after_first)
+        self.assertEqual((report['status'], report['updated_loans'], report['invocations']), (COMPLETED, 12, 2))
+
+    def test_last_day_guard(self):
+        self.assertIsNone(run_parallel_job(2, database_url=self.url, today=date(2024, 3, 30)))
+        self.assertIsNone(get_job(self.session))
+
+    def test_lambda_and_workers_never_share_a_job(self):
+        """A job the Lambda started is refused here, and the Lambda leaves a parallel job alone"""
+        start_or_resume_job(self.session, today=self.last_day)
+        with self.assertRaises(RuntimeError):
+            run_parallel_job(2, database_url=self.url, today=self.last_day)
+
+        start_or_resume_job(self.session, today=date(2024, 4, 30), shards=2)
+        result = run_job_slice(self.session, '2024-04')
+        self.assertEqual((result['status'], result['updated_loans'], result['continue']), (RUNNING, 0, False))
+        self.assertEqual(set(self.balances().values()), {2400.0})
+
+    def test_interrupted_shard_resumes_after_its_checkpoint(self):
+        """A worker that fails mid-shard leaves a cursor; the next run rolls only what is left"""
+        job = start_or_resume_job(self.session, today=self.last_day, shards=2)
+        shard_ids = sorted(loan_id for loan_id in self.balances() if shard_for(loan_id, 2) == 0)
+        calls = itertools.count()
+
+        def fail_second_chunk(session, loan_ids, payment_date):
+            if next(calls) == 1:
+                raise OperationalError('UPDATE', {}, Exception('connection lost'))
+            return process_loan_chunk(session, loan_ids, payment_date)
+
+        with patch('services.month_end_job_service.process_loan_chunk', side_effect=fail_second_chunk):
+            shard = run_job_shard(self.url, job.job_key, 0, shard_ids, job.payment_date, chunk_size=2)
+        self.assertEqual((shard['status'], shard['cursor_loan_id'], shard['updated_loans']), (RUNNING, shard_ids[1], 2))
+        self.assertIn('connection lost', shard['last_error'])
+
+        report = run_parallel_job(2, database_url=self.url, chunk_size=2, today=self.last_day)
+        self.assertEqual((report['status'], report['updated_loans']), (COMPLETED, 12))
+        self.assertEqual(set(self.balances().values()), {1600.0})
+        self.assertEqual([shard['status'] for shard in report['shards']], [COMPLETED, COMPLETED])
+        self.assertEqual(len(get_shards(self.session, '2024-03')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from services.month_end_service import run_month_end, fetch_schedule_windows, fetch_loans, shard_for
+from services.payment_service import calculate_current_row, record_payment
+
+
+class TestMonthEndService(unittest.TestCase):
+
+    def setUp(self):
+        """Seed loans whose current period is due before the payment date"""
+        self.engine, Session = make_sqlite_sessionmaker()
+        self.session = Session()
+        self.payment_date = date(2024, 3, 20)
+        # First period due this month, nothing paid yet
+        seed_loan(self.session, 'loan-a', date(2024, 3, 15))
+        # Second period, previous one left late with an unpaid amount
+        seed_loan(self.session, 'loan-b', date(2024, 2, 15), rows={
+            1: {'status': 'late', 'outstanding_balance': -200.0, 'consecutive_defaulted': 1},
+        })
+        # Last period still unpaid -> extension row
+        seed_loan(self.session, 'loan-c', date(2024, 2, 15), periods=2, rows={
+            1: {'status': 'payed', 'outstanding_balance': 0.0},
+        })
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def row(self, loan_id, period):
+        return self.session.query(LoanTables).filter_by(loan_id=loan_id, period=period).one()
+
+    def metadata(self, loan_id):
+        return self.session.query(LoanMetadata).filter_by(loan_id=loan_id).one()
+
+    def test_windows_fetched_for_all_loans_in_one_query(self):
+        """The window query returns up to two rows and the max period per loan"""
+        windows = fetch_schedule_windows(
+            self.session, ['loan-a', 'loan-b', 'loan-c'], date(2024, 1, 31), date(2024, 3, 31))
+        self.assertEqual([r['period'] for r in windows['loan-a']['rows']], [1.0])
+        self.assertEqual([r['period'] for r in windows['loan-b']['rows']], [1.0, 2.0])
+        self.assertEqual(windows['loan-b']['max_period'], 3.0)
+        self.assertEqual(windows['loan-c']['max_period'], 2.0)
+
+    def test_first_period_rolled_late(self):
+        """An unpaid first period past due becomes late with a 3% fee"""
+        report = run_month_end(self.session, chunk_size=2, payment_date=self.payment_date)
+
+        self.assertEqual(report['updated_loans'], 3)
+        self.assertEqual(report['chunks'], 2)
+        row = self.row('loan-a', 1)
+        self.assertEqual(row.status, 'late')
+        self.assertEqual(float(row.late_payment_fee), 30.0)
+        self.assertEqual(float(row.calc_installment), 1030.0)
+        self.assertEqual(int(row.late_days), 5)
+        self.assertEqual(float(self.metadata('loan-a').balance), 1600.0)
+
+    def test_previous_late_period_rolled_to_default(self):
+        """A late previous period with arrears escalates to default"""
+        run_month_end(self.session, payment_date=self.payment_date)
+
+        row = self.row('loan-b', 2)
+        self.assertEqual(row.status, 'default')
+        self.assertEqual(int(row.consecutive_defaulted), 2)
+        self.assertEqual(float(row.late_payment_fee), 60.0)
+
+    def test_last_period_creates_extension(self):
+        """A final period left unpaid gets an extension period"""
+        run_month_end(self.session, payment_date=self.payment_date)
+
+        extension = self.row('loan-c', 3)
+        self.assertEqual(extension.status, 'pending')
+        self.assertEqual(extension.due_date, date(2024, 4, 15))
+        self.assertEqual(float(extension.principal), 1030.0)
+
+    def test_matches_per_loan_calculate_current_row(self):
+        """The batch roll gives the same rows and metadata as the per-loan path"""
+        engine, Session = make_sqlite_sessionmaker()
+        legacy = Session()
+        seed_loan(legacy, 'loan-b', date(2024, 2, 15), rows={
+            1: {'status': 'late', 'outstanding_balance': -200.0, 'consecutive_defaulted': 1},
+        })
+        with patch('services.payment_service.get_payment_date', return_value=self.payment_date):
+            expected = calculate_current_row(legacy, {'loan_id': 'loan-b', 'installment': 0, 'month_offset': 0})
+        expected_metadata = legacy.query(LoanMetadata).filter_by(loan_id='loan-b').one()
+
+        run_month_end(self.session, payment_date=self.payment_date)
+        row = self.row('loan-b', 2)
+        for column in ('status', 'late_payment_fee', 'calc_installment', 'outstanding_balance', 'late_days'):
+            self.assertEqual(getattr(row, column) if column == 'status' else float(getattr(row, column)),
+                             expected['row'][column])
+        self.assertEqual(float(self.metadata('loan-b').balance), float(expected_metadata.balance))
+        self.assertEqual(float(self.metadata('loan-b').payed), float(expected_metadata.payed))
+        legacy.close()
+        engine.dispose()
+
+    def test_shard_for_is_stable(self):
+        """A loan always maps to the same shard"""
+        self.assertEqual(shard_for('loan-a', 4), shard_for('loan-a', 4))
+        self.assertTrue(0 <= shard_for('loan-b', 4) < 4)
+
+    def test_loans_without_window_are_skipped(self):
+        """Loans with no schedule row in the window are reported as skipped"""
+        report = run_month_end(self.session, payment_date=date(2026, 1, 20))
+        self.assertEqual(report['updated_loans'], 0)
+        self.assertEqual(report['skipped_loans'], 3)
+        self.assertIn('loans_per_second', report)
+
+
+
+class TestMonthEndConcurrency(unittest.TestCase):
+    """Month-end and a payment on separate connections to a file database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.payment_date = date(2024, 3, 20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_scenario(self, name, interleave):
+        """Roll loan-a with a payment committed before month-end or while it runs; returns the stored state"""
+        engine, Session = make_sqlite_sessionmaker(f"sqlite:///{os.path.join(self.tmp.name, name)}")
+        session = Session()
+        seed_loan(session, 'loan-a', date(2024, 3, 15))
+        session.close()
+        pay = lambda: record_payment({'loan_id': 'loan-a', 'installment': 400})
+
+        def payment_then_lock(session, loan_ids, lock=False):
+            pay()
+            return fetch_loans(session, loan_ids, lock=lock)
+
+        with patch('database.SessionLocal', Session), \
+                patch('services.payment_service.get_payment_date', return_value=self.payment_date):
+            session = Session()
+            if interleave:
+                # The chunk is listed, then the payment commits before the chunk is locked
+                with patch('services.month_end_service.fetch_loans', side_effect=payment_then_lock):
+                    run_month_end(session, payment_date=self.payment_date)
+            else:
+                pay()
+                run_month_end(session, payment_date=self.payment_date)
+            row = session.query(LoanTables).filter_by(loan_id='loan-a', period=1).one().to_dict()
+            metadata = session.query(LoanMetadata).filter_by(loan_id='loan-a').one().to_dict()
+            session.close()
+        engine.dispose()
+        return row, metadata
+
+    def test_payment_during_month_end_is_kept(self):
+        """A payment committing while month-end runs is not overwritten by the roll"""
+        expected = self.run_scenario('sequential.db', interleave=False)
+        row, metadata = self.run_scenario('interleaved.db', interleave=True)
+        self.assertEqual(metadata['payed'], expected[1]['payed'])
+        self.assertGreater(metadata['payed'], 0)
+        self.assertEqual((row, metadata), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from models.user_payments import UserPayments
+from services.payment_ingest_service import parse_payments, ingest_payments, record_payments_batch
+from services.payment_service import record_payment
+
+
+class TestParsePayments(unittest.TestCase):
+
+    def test_csv_and_jsonl(self):
+        """Both file formats yield the same items"""
+        csv_items = parse_payments("loan_id,installment,document_id\nloan-a,100,doc-1\n")
+        jsonl_items = parse_payments('{"loan_id": "loan-a", "installment": "100", "document_id": "doc-1"}\n\n')
+        self.assertEqual(csv_items, jsonl_items)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            parse_payments('loan_id\n', 'xml')
+
+
+class TestIngestPayments(unittest.TestCase):
+
+    def setUp(self):
+        """Twin loans so a batch can be compared with per-request posting"""
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.payment_date = date(2024, 3, 20)
+        self.session = self.Session()
+        for loan_id in ('loan-a', 'loan-b'):
+            seed_loan(self.session, loan_id, date(2024, 2, 15), periods=2, rows={
+                1: {'status': 'late', 'outstanding_balance': -200.0},
+            })
+
+    def tearDown(self):
+        self.session.close()
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def state(self, loan_id):
+        self.session.expire_all()
+        rows = [
+            {k: v for k, v in row.to_dict().items() if k != 'loan_id'}
+            for row in self.session.query(LoanTables).filter_by(loan_id=loan_id).order_by(LoanTables.period)
+        ]
+        metadata = self.session.query(LoanMetadata).filter_by(loan_id=loan_id).one()
+        return rows, float(metadata.balance), float(metadata.payed)
+
+    def test_batch_matches_sequential_posting(self):
+        """Chained payments in a batch end where one-by-one posting ends"""
+        with patch('services.payment_service.get_payment_date', return_value=self.payment_date):
+            for amount in (300, 500):
+                record_payment({'loan_id': 'loan-a', 'installment': amount})
+
+        report = ingest_payments(self.session, [
+            {'loan_id': 'loan-b', 'installment': 500, 'payment_date': '2024-03-12'},
+            {'loan_id': 'loan-b', 'installment': 300, 'payment_date': '2024-03-02'},
+        ], self.payment_date)
+
+        self.assertEqual(report['applied'], 2)
+        self.assertEqual(self.state('loan-b'), self.state('loan-a'))
+        self.assertEqual(self.session.query(UserPayments).filter_by(loan_id='loan-b').count(), 2)
+        # Value dates put the 300 payment first
+        self.assertEqual(report['results'][1]['outstanding_balance'], -960.0)
+
+    def test_result_codes(self):
+        """Bad items are reported per index without blocking the rest"""
+        report = ingest_payments(self.session, [
+            {'loan_id': 'loan-a', 'installment': 100},
+            {'loan_id': '', 'installment': 100},
+            {'loan_id': 'loan-a', 'installment': 'abc'},
+            {'loan_id': 'missing', 'installment': 100},
+            {'loan_id': 'loan-a', 'installment': 100, 'payment_date': 20240115},
+            {'loan_id': 'loan-a', 'installment': 100, 'payment_date': '15/01/2024'},
+        ], self.payment_date)
+
+        self.assertEqual([r['code'] for r in report['results']],
+                         ['applied', 'invalid', 'invalid', 'not_found', 'invalid', 'invalid'])
+        self.assertEqual((report['received'], report['applied'], report['rejected']), (6, 1, 5))
+
+    def test_chunks_commit_independently(self):
+        """Every chunk of loans is applied in its own transaction"""
+        report = ingest_payments(self.session, [
+            {'loan_id': 'loan-a', 'installment': 100},
+            {'loan_id': 'loan-b', 'installment': 100},
+        ], self.payment_date, chunk_size=1)
+        self.assertEqual(report['applied'], 2)
+        self.assertEqual(self.state('loan-a'), self.state('loan-b'))
+
+    def test_endpoint_accepts_csv(self):
+        """The batch endpoint parses a raw CSV body"""
+        body = "loan_id,amount,document_id\nloan-a,100,doc-1\nloan-b,100,doc-2\n"
+        report = record_payments_batch({'body': body, 'format': 'csv', 'payment_date': '2024-03-20'})
+        self.assertEqual(report['applied'], 2)
+        with self.assertRaises(ValueError):
+            record_payments_batch({})
+
+
+if __name__ == '__main__':
+    unittest.main()
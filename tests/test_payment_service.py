@@ -0,0 +1,223 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from models.user_payments import UserPayments
+from services.payment_service import (
+    get_payment, preview_current_row, calculate_current_row, record_payment
+)
+from services.month_end_service import fetch_loans
+
+
+class TestPaymentPreview(unittest.TestCase):
+
+    def setUp(self):
+        """A loan on its last period with the previous one left unpaid"""
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.payment_date = date(2024, 3, 20)
+        session = self.Session()
+        seed_loan(session, 'loan-a', date(2024, 2, 15), periods=2, rows={
+            1: {'status': 'late', 'outstanding_balance': -200.0},
+        })
+        session.close()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def snapshot(self):
+        session = self.Session()
+        rows = [row.to_dict() for row in session.query(LoanTables).order_by(LoanTables.period)]
+        metadata = session.query(LoanMetadata).one().to_dict()
+        session.close()
+        return rows, metadata
+
+    def test_get_payment_writes_nothing(self):
+        """A preview leaves the schedule and metadata untouched and adds no extension"""
+        before = self.snapshot()
+        with patch('services.payment_service.get_payment_date', return_value=self.payment_date):
+            result = get_payment('loan-a', 0)
+        self.assertEqual(result['period'], 2.0)
+        self.assertEqual(result['row']['status'], 'default')
+        self.assertEqual(result['row']['outstanding_balance'], -1260.0)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_preview_matches_write_path(self):
+        """The preview row equals the row calculate_current_row persists"""
+        data = {'loan_id': 'loan-a', 'installment': 500, 'month_offset': 0}
+        with patch('services.payment_service.get_payment_date', return_value=self.payment_date):
+            session = self.Session()
+            preview = preview_current_row(session, data)
+            session.close()
+            session = self.Session()
+            expected = calculate_current_row(session, data)
+            session.close()
+        self.assertEqual(preview, expected)
+
+    def test_missing_loan(self):
+        """A loan without a schedule window has nothing to preview"""
+        self.assertEqual(get_payment('missing', 0), {'message': 'No current row found'})
+
+
+
+class TestRecordPayment(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.date_patcher = patch('services.payment_service.get_payment_date', return_value=date(2024, 3, 20))
+        self.date_patcher.start()
+        session = self.Session()
+        seed_loan(session, 'loan-a', date(2024, 2, 25), rows={
+            1: {'status': 'payed', 'outstanding_balance': 0.0},
+        })
+        seed_loan(session, 'loan-b', date(2024, 2, 15), periods=2, rows={
+            1: {'status': 'payed', 'outstanding_balance': 0.0},
+        })
+        session.close()
+        self.commits = 0
+        event.listen(Session, 'after_commit', self.count_commit)
+
+    def tearDown(self):
+        event.remove(Session, 'after_commit', self.count_commit)
+        self.date_patcher.stop()
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def count_commit(self, session):
+        self.commits += 1
+
+    def test_payment_applied_in_one_commit(self):
+        """Schedule row, metadata and payment record are written together"""
+        row = record_payment({'loan_id': 'loan-a', 'user_id': 'user-1', 'installment': 1000, 'document_id': 'doc-1'})
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(row['status'], 'payed')
+
+        session = self.Session()
+        current = session.query(LoanTables).filter_by(loan_id='loan-a', period=2).one()
+        self.assertEqual(float(current.payed_amount), 1000.0)
+        self.assertEqual(current.payment_date, date(2024, 3, 20))
+        metadata = session.query(LoanMetadata).filter_by(loan_id='loan-a').one()
+        self.assertEqual((float(metadata.balance), float(metadata.payed)), (1600.0, 1000.0))
+        payment = session.query(UserPayments).one()
+        self.assertEqual((payment.document_id, payment.payment_date), ('doc-1', date(2024, 3, 20)))
+        session.close()
+
+    def test_payments_accumulate(self):
+        """A second payment builds on the first one's committed state"""
+        record_payment({'loan_id': 'loan-a', 'installment': 400})
+        row = record_payment({'loan_id': 'loan-a', 'installment': 600})
+        self.assertEqual(row['payed_amount'], 1000.0)
+        self.assertEqual(row['outstanding_balance'], 0.0)
+
+    def test_matches_legacy_path(self):
+        """The locked path produces the same row as calculate_current_row"""
+        data = {'loan_id': 'loan-b', 'installment': 300}
+        session = self.Session()
+        expected = calculate_current_row(session, dict(data))['row']
+        session.rollback()
+        session.close()
+        row = record_payment(data)
+        self.assertEqual({k: v for k, v in row.items() if k != 'nrow'},
+                         {k: v for k, v in expected.items() if k != 'nrow'})
+
+    def test_final_period_extension(self):
+        """A short payment on the last period adds an extension row"""
+        record_payment({'loan_id': 'loan-b', 'installment': 300})
+        session = self.Session()
+        periods = [row.period for row in session.query(LoanTables).filter_by(loan_id='loan-b')]
+        session.close()
+        self.assertEqual(sorted(periods), [1, 2, 3])
+
+    def test_no_current_row(self):
+        """Nothing is written for a loan without a current row"""
+        self.assertEqual(record_payment({'loan_id': 'missing', 'installment': 100}), {'message': 'No current row found'})
+        session = self.Session()
+        self.assertEqual(session.query(UserPayments).count(), 0)
+        session.close()
+
+    def test_loan_locked_before_window_read(self):
+        """The metadata row is locked on its own, before the schedule window is read"""
+        statements = []
+        listener = lambda state: statements.append(str(state.statement.compile(dialect=postgresql.dialect())))
+        event.listen(Session, 'do_orm_execute', listener)
+        try:
+            record_payment({'loan_id': 'loan-a', 'installment': 400})
+        finally:
+            event.remove(Session, 'do_orm_execute', listener)
+        lock = next(i for i, sql in enumerate(statements) if 'FOR UPDATE' in sql)
+        window = next(i for i, sql in enumerate(statements) if 'FROM loan_tables' in sql)
+        self.assertIn('FROM loan_metadata', statements[lock])
+        self.assertNotIn('loan_tables', statements[lock])
+        self.assertLess(lock, window)
+
+
+class TestConcurrentPayments(unittest.TestCase):
+    """Two payers on one loan, each with its own connection to a file database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine, self.Session = make_sqlite_sessionmaker(f"sqlite:///{self.tmp.name}/loans.db")
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.date_patcher = patch('services.payment_service.get_payment_date', return_value=date(2024, 3, 20))
+        self.date_patcher.start()
+        session = self.Session()
+        seed_loan(session, 'loan-a', date(2024, 2, 25), rows={
+            1: {'status': 'payed', 'outstanding_balance': 0.0},
+        })
+        session.close()
+
+    def tearDown(self):
+        self.date_patcher.stop()
+        self.patcher.stop()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_waiting_payer_reads_committed_schedule(self):
+        """
+        The second payer reaches the lock while the first is still applying;
+        the first commits while the second waits. The second payment then
+        builds on the first instead of overwriting it.
+        """
+        waited = []
+
+        def lock_after_first_payer_commits(session, loan_ids, lock=False):
+            if not waited:
+                waited.append(True)
+                self.assertEqual(record_payment({'loan_id': 'loan-a', 'installment': 400})['payed_amount'], 400.0)
+            return fetch_loans(session, loan_ids, lock=lock)
+
+        with patch('services.payment_service.fetch_loans', side_effect=lock_after_first_payer_commits):
+            row = record_payment({'loan_id': 'loan-a', 'installment': 600})
+        self.assertEqual(row['payed_amount'], 1000.0)
+        self.assertEqual(row['outstanding_balance'], 0.0)
+
+        session = self.Session()
+        current = session.query(LoanTables).filter_by(loan_id='loan-a', period=2).one()
+        metadata = session.query(LoanMetadata).filter_by(loan_id='loan-a').one()
+        self.assertEqual(float(current.payed_amount), 1000.0)
+        # Same as applying them in turn (the legacy metadata rules subtract principal per payment
+        # and add the row's cumulative payed_amount)
+        self.assertEqual((float(metadata.balance), float(metadata.payed)), (800.0, 1400.0))
+        self.assertEqual(session.query(UserPayments).count(), 2)
+        session.close()
+
+if __name__ == '__main__':
+    unittest.main()
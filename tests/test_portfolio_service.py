@@ -0,0 +1,131 @@
+import unittest
+import sys
+import os
+import random
+from collections import defaultdict
+from datetime import date
+from unittest import mock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import event, select, update
+from models.loan_metadata import LoanMetadata
+from models.loan_tables import LoanTables
+from services.portfolio_service import portfolio_summary, get_portfolio_summary, parse_summary_params
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+
+CATEGORIES = ['Low', 'Medium', 'High']
+STATUSES = ['pending', 'payed', 'late', 'default', 'blocked']
+
+
+class TestPortfolioSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        rng = random.Random(5)
+        session = self.Session()
+        for n in range(40):
+            periods = rng.randint(3, 12)
+            seed_loan(session, f"loan-{n}", date(2024, rng.randint(1, 12), rng.randint(1, 28)), periods=periods,
+                      user_id=f"user-{n}", balance=rng.randint(0, 9000),
+                      rows={p: {'status': rng.choice(STATUSES), 'payed_amount': rng.choice([0.0, 400.0, 1000.0]),
+                                'outstanding_balance': rng.choice([0.0, -600.0]), 'late_payment_fee': rng.choice([0.0, 30.0])}
+                            for p in range(1, periods + 1)})
+            session.execute(update(LoanMetadata).where(LoanMetadata.loan_id == f"loan-{n}").values(
+                risk_category=rng.choice(CATEGORIES), payed=rng.randint(0, 5000), defaulted_amount=rng.choice([0, 250])))
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def client_side(self, risk_categories=None, start_date_from=None, as_of=date(2024, 6, 10), months=3):
+        """The dashboards' aggregation over every metadata and schedule row"""
+        session = self.Session()
+        loans = {m.loan_id: m for m in session.scalars(select(LoanMetadata))
+                 if (not risk_categories or m.risk_category in risk_categories)
+                 and (not start_date_from or m.start_date >= start_date_from)}
+        rows = [r for r in session.scalars(select(LoanTables)) if r.loan_id in loans]
+        session.close()
+
+        by_category = defaultdict(lambda: defaultdict(float))
+        for m in loans.values():
+            group = by_category[m.risk_category]
+            group['loans'] += 1
+            group['outstanding_balance'] += float(m.balance)
+            group['collected'] += float(m.payed)
+        by_status = defaultdict(lambda: defaultdict(float))
+        expected = defaultdict(float)
+        for r in rows:
+            group = by_status[r.status]
+            group['instalments'] += 1
+            group['outstanding_balance'] += float(r.outstanding_balance)
+            if r.status != 'payed' and as_of <= r.due_date < date(as_of.year, as_of.month + months, as_of.day):
+                expected[r.due_date.strftime('%Y-%m')] += float(r.installment + r.late_payment_fee - r.payed_amount)
+        return by_category, by_status, expected
+
+    def assert_matches_client_side(self, summary, **filters):
+        by_category, by_status, expected = self.client_side(**filters)
+        self.assertEqual(set(summary['by_risk_category']), set(by_category))
+        for category, group in by_category.items():
+            self.assertEqual(summary['by_risk_category'][category]['loans'], group['loans'])
+            self.assertAlmostEqual(summary['by_risk_category'][category]['collected'], group['collected'], places=2)
+        self.assertEqual(summary['totals']['loans'], sum(g['loans'] for g in by_category.values()))
+        self.assertAlmostEqual(summary['totals']['outstanding_balance'],
+                               sum(g['outstanding_balance'] for g in by_category.values()), places=2)
+        self.assertEqual(set(summary['by_status']), set(by_status))
+        for status, group in by_status.items():
+            self.assertEqual(summary['by_status'][status]['instalments'], group['instalments'])
+            self.assertAlmostEqual(summary['by_status'][status]['outstanding_balance'], group['outstanding_balance'], places=2)
+        for bucket in summary['expected_collections']['by_month']:
+            self.assertAlmostEqual(bucket['expected'], expected.get(bucket['month'], 0.0), places=2)
+
+    def test_matches_client_side_aggregation(self):
+        session = self.Session()
+        summary = portfolio_summary(session, as_of=date(2024, 6, 10), months=3)
+        session.close()
+        self.assert_matches_client_side(summary)
+        self.assertEqual([b['month'] for b in summary['expected_collections']['by_month']],
+                         ['2024-06', '2024-07', '2024-08', '2024-09'])
+        self.assertEqual(summary['totals']['loans'], 40)
+
+    def test_filters(self):
+        session = self.Session()
+        summary = portfolio_summary(session, risk_categories=['High', 'Low'], start_date_from=date(2024, 4, 1),
+                                    as_of=date(2024, 6, 10), months=3)
+        session.close()
+        self.assertLessEqual(set(summary['by_risk_category']), {'High', 'Low'})
+        self.assert_matches_client_side(summary, risk_categories=['High', 'Low'], start_date_from=date(2024, 4, 1))
+
+    def test_few_aggregate_queries(self):
+        """The summary costs three queries however many loans there are"""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine, 'before_cursor_execute', listener)
+        try:
+            session = self.Session()
+            portfolio_summary(session, risk_categories=['Low'])
+            session.close()
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(all('GROUP BY' in statement for statement in statements))
+
+    def test_parameters(self):
+        options = parse_summary_params({'risk_category': 'Low, High', 'start_date_from': '2024-01-01', 'months': '6'})
+        self.assertEqual(options['risk_categories'], ['Low', 'High'])
+        self.assertEqual((options['start_date_from'], options['months']), (date(2024, 1, 1), 6))
+        for bad in ({'months': '0'}, {'months': 'x'}, {'as_of': '2024-13-01'}, {'start_date_to': 'soon'}):
+            with self.assertRaises(ValueError):
+                parse_summary_params(bad)
+
+    def test_entry_point(self):
+        with mock.patch('services.portfolio_service.get_db_session', self.Session):
+            summary = get_portfolio_summary({'as_of': '2024-06-10', 'months': '1'})
+        self.assertEqual(summary['expected_collections']['months'], 1)
+        self.assertEqual(len(summary['expected_collections']['by_month']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
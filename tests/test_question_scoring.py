@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import math
+import random
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.question_scoring import QuestionScoring, Default, DemographicsScoring, likert_points
+
+
+def recursive_default(section_data):
+    """Default.score_question before the iterative engine, unrolled from its recursion"""
+    likert_data = section_data['data'] if isinstance(section_data, dict) and 'data' in section_data else section_data
+    data = dict(likert_data)
+    if len(data) == 0:
+        return 5.0
+    count = 0
+    for i in range(len(data)):
+        value = data[list(data)[i]]
+        try:
+            partial = int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
+        except (ValueError, TypeError):
+            partial = 3
+        count = count + partial
+    normalized = (count / len(data) - 1) / 4
+    return 1 + (1 / (1 + math.exp(-6 * (normalized - 0.5)))) * 8
+
+
+def recursive_demographics(section_data):
+    """DemographicsScoring.score_question before the iterative engine"""
+    data = dict(section_data)
+    relevant = {k: v for k, v in data.items() if k in ['gender', 'occupation']}
+    count, multiplier = 0, 1.0
+    for key, value in relevant.items():
+        if key == 'gender':
+            multiplier = 1.4 if value == 'F' else 1.0
+            count += 8.0 if value == 'F' else 3.0
+        else:
+            count += {'Empleado': 8.0, 'Desempleado': 2.0}.get(value, 5.0)
+    return (count / len(relevant) if relevant else 4.0) * multiplier
+
+
+ANSWERS = [1, 2, 3, 4, 5, '1', '5', '05', '', ' 4', '-2', -2, '²', '٣', 3.0, True, False, None, 'abc', [1]]
+
+
+def random_section(rng):
+    answers = {f"q{q}": rng.choice(ANSWERS) for q in range(rng.randint(0, 25))}
+    shape = rng.randint(0, 2)
+    if shape == 0:
+        return {'data': answers, 'title': 'Section'}
+    return answers if shape == 1 else list(answers.items())
+
+
+def random_demographics(rng):
+    fields = {'gender': rng.choice(['F', 'M', 'X', None]), 'age': 30,
+              'occupation': rng.choice(['Empleado', 'Desempleado', 'Independiente', ''])}
+    return {k: v for k, v in fields.items() if rng.random() < 0.7}
+
+
+class TestQuestionScoring(unittest.TestCase):
+
+    def test_default_matches_recursion(self):
+        rng = random.Random(11)
+        sections = [random_section(rng) for _ in range(2000)]
+        expected = [recursive_default(section) for section in sections]
+        scoring = QuestionScoring()
+        self.assertEqual([scoring.use_scoring(section) for section in sections], expected)
+        self.assertEqual(scoring.score_batch(sections), expected)
+
+    def test_demographics_matches_recursion(self):
+        rng = random.Random(12)
+        sections = [random_demographics(rng) for _ in range(1000)]
+        expected = [recursive_demographics(section) for section in sections]
+        scoring = QuestionScoring('demographics')
+        self.assertEqual([scoring.use_scoring(section) for section in sections], expected)
+        self.assertEqual(scoring.score_batch(sections), expected)
+
+    def test_instances_are_reusable(self):
+        """Scoring one section no longer leaks its answers into the next"""
+        strategy = Default()
+        self.assertEqual(strategy.score_question({'data': {'q1': 5, 'q2': 5}}), recursive_default({'q1': 5, 'q2': 5}))
+        self.assertEqual(strategy.score_question({'q1': 1}), recursive_default({'q1': 1}))
+        demographics = DemographicsScoring()
+        self.assertAlmostEqual(demographics.score_question({'gender': 'F', 'occupation': 'Empleado'}), 11.2)
+        self.assertEqual(demographics.score_question({'gender': 'M'}), 3.0)
+
+    def test_large_questionnaire(self):
+        """Past the old recursion limit"""
+        answers = {f"q{q}": (q % 5) + 1 for q in range(5000)}
+        self.assertEqual(QuestionScoring().use_scoring({'data': answers}), recursive_default(answers))
+
+    def test_empty_batch_and_sections(self):
+        scoring = QuestionScoring()
+        self.assertEqual(scoring.score_batch([]), [])
+        self.assertEqual(scoring.score_batch([{}, {'data': {}}, {'q': '5'}]), [5.0, 5.0, recursive_default({'q': '5'})])
+        self.assertEqual(QuestionScoring('demographics').score_batch([{}, {'age': 40}]), [4.0, 4.0])
+
+    def test_points_beyond_int64(self):
+        huge = '9' * 30
+        self.assertEqual(likert_points([huge, 1]).tolist(), [int(huge), 1])
+        self.assertEqual(QuestionScoring().score_batch([{'q1': huge, 'q2': 1}, {'q1': 2}]),
+                         [recursive_default({'q1': huge, 'q2': 1}), recursive_default({'q1': 2})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.quote_service import quote_grid, get_quote_grid, parse_axis, axis_length
+from utils.table_generator import TableGenerator
+
+
+class TestQuoteGrid(unittest.TestCase):
+
+    def test_cells_match_generated_schedules(self):
+        """Each cell's instalment and interest match a full TableGenerator schedule"""
+        quotes = quote_grid([1000, 25000], [6, 36], [15, 65, 95])
+        self.assertEqual(len(quotes), 12)
+        for quote in quotes:
+            schedule = TableGenerator('repayment_plan_period').use_method(
+                user_risk=quote['user_risk'], period=quote['term'], amount=quote['amount'])
+            self.assertEqual(quote['rate'], schedule['rate'])
+            self.assertEqual(quote['instalment'], schedule['data'][0]['Payment'])
+            self.assertAlmostEqual(quote['total_interest'], sum(r['Interest'] for r in schedule['data']), delta=0.05)
+            self.assertEqual(quote['apr'], quote['rate'])
+
+    def test_fees_raise_apr(self):
+        """Per-period fees are added to the instalment and priced into the APR"""
+        plain, = quote_grid([10000], [24], [75])
+        with_fees, = quote_grid([10000], [24], [75], service_fee=20, insurance_fee=5)
+        self.assertEqual(with_fees['instalment'], round(plain['instalment'] + 25, 2))
+        self.assertEqual(with_fees['total_interest'], plain['total_interest'])
+        self.assertGreater(with_fees['apr'], plain['apr'])
+        # Discounting the instalments at the APR gives back the amount
+        monthly = with_fees['apr'] / 12
+        present_value = with_fees['instalment'] * (1 - (1 + monthly) ** -24) / monthly
+        self.assertAlmostEqual(present_value, 10000, delta=1)
+
+    def test_axis_parsing(self):
+        self.assertEqual(parse_axis('terms', {'start': 6, 'stop': 24, 'step': 6}, int), [6, 12, 18, 24])
+        self.assertEqual(parse_axis('amounts', ['1000', 500, 500]), [500.0, 1000.0])
+        for bad in (None, {'start': 10, 'stop': 1, 'step': 1}, ['x'], []):
+            with self.assertRaises(ValueError):
+                parse_axis('amounts', bad)
+
+    def test_oversized_axis_rejected_before_allocation(self):
+        """Ranges are measured before np.arange builds them"""
+        with patch('services.quote_service.np.arange', side_effect=AssertionError('arange called')):
+            for axis in ({'start': 0, 'stop': 1e9, 'step': 1}, {'start': 1000, 'stop': 2000, 'step': 1e-9},
+                         {'start': 0, 'stop': float('inf'), 'step': 1}):
+                with self.assertRaises(ValueError):
+                    get_quote_grid({'amounts': axis, 'terms': [12], 'user_risks': [50]})
+        with self.assertRaises(ValueError):
+            get_quote_grid({'amounts': [1000, 2000], 'terms': {'start': 1, 'stop': 72, 'step': 1},
+                            'user_risks': {'start': 0, 'stop': 100, 'step': 1e-4}})
+        self.assertEqual(axis_length(1000, 50000, 1000), 50)
+        self.assertEqual(axis_length(3, 72, 3), len(parse_axis('terms', {'start': 3, 'stop': 72, 'step': 3}, int)))
+
+    def test_grid_size_limit(self):
+        with self.assertRaises(ValueError):
+            get_quote_grid({'amounts': {'start': 1, 'stop': 100000, 'step': 1}, 'terms': [12], 'user_risks': [50, 60]})
+
+
+if __name__ == '__main__':
+    unittest.main()
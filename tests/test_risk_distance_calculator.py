@@ -0,0 +1,255 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker
+import utils.risk_distance_calculator as risk_module
+from utils.risk_distance_calculator import (
+    RiskDistanceCalculator, RunningStats, Reservoir, kmeans, save_model, load_model,
+    get_risk_calculator, refresh_risk_calculator, query_chunk_source
+)
+
+FEATURES = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity',
+            'futureOrientation', 'financialKnowledge', 'locusOfControl', 'socialInfluence',
+            'resilience', 'familismo', 'respect', 'risk_level']
+
+
+def make_non_defaulters(n, seed=0):
+    """Three well separated groups of survey scores"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(10, 90, size=(3, len(FEATURES)))
+    group = rng.integers(3, size=n)
+    scores = centers[group] + rng.normal(0, 2, size=(n, len(FEATURES)))
+    return [dict(zip(FEATURES, row)) for row in scores.tolist()], group
+
+
+class TestKMeans(unittest.TestCase):
+
+    def test_recovers_separated_groups(self):
+        records, group = make_non_defaulters(3000)
+        calculator = RiskDistanceCalculator(records)
+        points = (calculator.feature_matrix(records) - calculator.feature_means) / calculator.feature_stds
+        _, labels, iterations = kmeans(points, 3)
+        # Every true group maps onto exactly one cluster
+        for g in range(3):
+            self.assertEqual(len(set(labels[group == g].tolist())), 1)
+        self.assertEqual(len(set(labels.tolist())), 3)
+        self.assertLess(iterations, 10)
+
+    def test_deterministic_seed(self):
+        records, _ = make_non_defaulters(500)
+        first = RiskDistanceCalculator(records, seed=7).non_defaulter_centroids
+        second = RiskDistanceCalculator(records, seed=7).non_defaulter_centroids
+        np.testing.assert_array_equal(first, second)
+
+    def test_standardize_constant_column(self):
+        stats = RunningStats(2)
+        stats.update(np.array([[1.0, 5.0], [3.0, 5.0]]))
+        self.assertEqual(stats.mean.tolist(), [2.0, 5.0])
+        self.assertEqual(stats.std.tolist(), [1.0, 1.0])
+
+
+class TestCalculateRiskDistance(unittest.TestCase):
+
+    def test_contract(self):
+        records, _ = make_non_defaulters(300)
+        calculator = RiskDistanceCalculator(records)
+        result = calculator.calculate_risk_distance(records[0])
+        self.assertEqual(set(result), {'risk_distance', 'risk_score', 'risk_category', 'closest_cluster'})
+        self.assertIsInstance(result['risk_distance'], float)
+        self.assertIsInstance(result['closest_cluster'], int)
+        self.assertIn(result['risk_category'], ['Very Low', 'Low'])
+
+        outlier = calculator.calculate_risk_distance({col: 1000 for col in FEATURES})
+        self.assertEqual((outlier['risk_score'], outlier['risk_category']), (100, 'Very High'))
+        # Missing and null scores count as 0
+        self.assertEqual(calculator.calculate_risk_distance({'risk_level': None}),
+                         calculator.calculate_risk_distance({}))
+
+    def test_not_initialized(self):
+        calculator = RiskDistanceCalculator([{'risk_level': 1}])
+        self.assertIsNone(calculator.non_defaulter_centroids)
+        self.assertIn('error', calculator.calculate_risk_distance({}))
+
+
+class TestStreamingTraining(unittest.TestCase):
+
+    def test_running_stats_match_full_pass(self):
+        matrix = np.random.default_rng(1).normal(50, 10, size=(1003, len(FEATURES)))
+        matrix[:, 3] = 7.0
+        stats = RunningStats(len(FEATURES))
+        for start in range(0, len(matrix), 97):
+            stats.update(matrix[start:start + 97])
+        stds = matrix.std(axis=0)
+        stds[3] = 1.0
+        np.testing.assert_allclose(stats.mean, matrix.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(stats.std, stds, rtol=1e-10)
+        self.assertEqual(stats.count, 1003)
+
+    def test_reservoir_is_bounded(self):
+        reservoir = Reservoir(50, 2, np.random.default_rng(0))
+        for start in range(0, 10000, 300):
+            reservoir.add(np.arange(start, min(start + 300, 10000), dtype=float)[:, None].repeat(2, axis=1))
+        self.assertEqual(reservoir.sample.shape, (50, 2))
+        self.assertEqual(reservoir.seen, 10000)
+        # Drawn from the whole stream, not just its head
+        self.assertGreater(reservoir.sample[:, 0].max(), 5000)
+
+    def test_matches_in_memory_training(self):
+        records, group = make_non_defaulters(6000)
+        full = RiskDistanceCalculator(records)
+        streamed = RiskDistanceCalculator([])
+        self.assertTrue(streamed.fit_stream(lambda: (records[i:i + 500] for i in range(0, len(records), 500)),
+                                            seed_sample=300))
+        self.assertEqual(streamed.model_info['rows'], 6000)
+        self.assertEqual(streamed.model_info['training'], 'streaming')
+        np.testing.assert_allclose(streamed.feature_means, full.feature_means, rtol=1e-10)
+        matched = [np.abs(full.non_defaulter_centroids - centroid).sum(axis=1).min()
+                   for centroid in streamed.non_defaulter_centroids]
+        self.assertLess(max(matched), 0.01)
+
+    def test_streams_from_a_query(self):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import sessionmaker
+        records, _ = make_non_defaulters(1200)
+        engine = create_engine('sqlite://')
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE TABLE non_defaulters ({', '.join(f'{col} FLOAT' for col in FEATURES)})"))
+            connection.execute(text(f"INSERT INTO non_defaulters VALUES ({', '.join(f':{col}' for col in FEATURES)})"),
+                               records)
+        calculator = RiskDistanceCalculator([])
+        source = query_chunk_source(sessionmaker(bind=engine), text('SELECT * FROM non_defaulters'), chunk_size=250)
+        self.assertTrue(calculator.fit_stream(source))
+        self.assertEqual(calculator.model_info['rows'], 1200)
+        self.assertIn('risk_category', calculator.calculate_risk_distance(records[0]))
+        engine.dispose()
+
+
+class TestOnlineUpdates(unittest.TestCase):
+
+    def test_running_statistics_absorb_new_records(self):
+        records, _ = make_non_defaulters(800)
+        new, _ = make_non_defaulters(200, seed=1)
+        calculator = RiskDistanceCalculator(records)
+        self.assertEqual(calculator.partial_fit(new), 200)
+        reference = RiskDistanceCalculator(records + new)
+        np.testing.assert_allclose(calculator.feature_means, reference.feature_means, rtol=1e-10)
+        np.testing.assert_allclose(calculator.feature_stds, reference.feature_stds, rtol=1e-10)
+        self.assertEqual(calculator.model_info['rows'], 1000)
+        self.assertEqual(calculator.model_info['online_updates'], 200)
+
+    def test_same_population_barely_drifts(self):
+        records, _ = make_non_defaulters(3000)
+        calculator = RiskDistanceCalculator(records[:2000])
+        calculator.partial_fit(records[2000:])
+        drift = calculator.drift()
+        self.assertLess(max(drift['centroid_shift']), 0.05)
+        self.assertFalse(drift['retrain_recommended'])
+
+    def test_shifted_population_recommends_retrain(self):
+        records, _ = make_non_defaulters(1000)
+        calculator = RiskDistanceCalculator(records)
+        shifted = [{col: value + 40 for col, value in record.items()} for record in make_non_defaulters(1000, seed=2)[0]]
+        calculator.partial_fit(shifted)
+        drift = calculator.drift()
+        self.assertGreater(drift['mean_shift'], 0.5)
+        self.assertTrue(drift['retrain_recommended'])
+
+    def test_requires_trained_model(self):
+        with self.assertRaises(RuntimeError):
+            RiskDistanceCalculator([]).partial_fit([{}])
+
+
+class TestModelArtifact(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'risk_model.json')
+        self.records, _ = make_non_defaulters(1000)
+        self.trained = RiskDistanceCalculator(self.records)
+        risk_module.risk_calculator = None
+
+    def tearDown(self):
+        risk_module.risk_calculator = None
+        self.tmpdir.cleanup()
+
+    def test_round_trip_scores_identically(self):
+        save_model(self.trained, self.path)
+        started = time.perf_counter()
+        loaded = load_model(self.path)
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(loaded.model_info, self.trained.model_info)
+        self.assertEqual(loaded.model_info['rows'], 1000)
+        for record in self.records[:20]:
+            self.assertEqual(loaded.calculate_risk_distance(record), self.trained.calculate_risk_distance(record))
+
+    def test_rejects_incompatible_artifacts(self):
+        artifact = self.trained.to_artifact()
+        for change in ({'version': 99}, {'feature_cols': ['risk_level']}, {'centroids': [[1, 2]]},
+                       {'baseline_means': [1.0]}, {'rows': [1]}):
+            with self.assertRaises(ValueError):
+                RiskDistanceCalculator(artifact={**artifact, **change})
+        without_centroids = {key: value for key, value in artifact.items() if key != 'centroids'}
+        with self.assertRaisesRegex(ValueError, 'missing centroids'):
+            RiskDistanceCalculator(artifact=without_centroids)
+
+    def test_rejects_json_that_is_not_an_object(self):
+        """A list or null artifact fails with ValueError, which startup and check-risk-model handle"""
+        for payload in ([], [1, 2], None, 'model', 3):
+            with open(self.path, 'w') as f:
+                json.dump(payload, f)
+            with self.assertRaisesRegex(ValueError, 'JSON object'):
+                load_model(self.path)
+
+    def test_startup_prefers_artifact(self):
+        """get_risk_calculator loads the artifact instead of querying non-defaulters"""
+        save_model(self.trained, self.path)
+        engine, Session = make_sqlite_sessionmaker()  # nothing published yet
+        with mock.patch.dict(os.environ, {'RISK_MODEL_PATH': self.path}), \
+                mock.patch('database.SessionLocal', Session), \
+                mock.patch.object(RiskDistanceCalculator, '_initialize_model') as train:
+            calculator = get_risk_calculator()
+        engine.dispose()
+        train.assert_not_called()
+        self.assertEqual(calculator.model_info['trained_at'], self.trained.model_info['trained_at'])
+
+    def test_online_state_survives_a_round_trip(self):
+        save_model(self.trained, self.path)
+        loaded = load_model(self.path)
+        new, _ = make_non_defaulters(50, seed=5)
+        self.trained.partial_fit(new)
+        loaded.partial_fit(new)
+        np.testing.assert_allclose(loaded.non_defaulter_centroids, self.trained.non_defaulter_centroids, rtol=1e-12)
+        self.assertEqual(loaded.drift(), self.trained.drift())
+
+    def test_version_1_artifacts_still_load(self):
+        artifact = {key: value for key, value in self.trained.to_artifact().items()
+                    if key in ('trained_at', 'rows', 'clusters', 'iterations', 'seed', 'feature_cols',
+                               'feature_means', 'feature_stds', 'centroids')}
+        calculator = RiskDistanceCalculator(artifact={**artifact, 'version': 1})
+        self.assertEqual(calculator.model_info['version'], 2)
+        self.assertEqual(calculator.drift()['centroid_shift'], [0.0] * len(calculator.non_defaulter_centroids))
+        self.assertEqual(calculator.partial_fit(self.records[:10]), 10)
+
+    def test_refresh_keeps_current_model_on_failure(self):
+        save_model(self.trained, self.path)
+        refresh_risk_calculator(self.path)
+        current = risk_module.risk_calculator
+        with open(self.path, 'w') as f:
+            json.dump({'version': 0}, f)
+        with self.assertRaises(ValueError):
+            refresh_risk_calculator(self.path)
+        self.assertIs(risk_module.risk_calculator, current)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import sys
+import os
+from datetime import date
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import select
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_metadata import LoanMetadata
+import utils.risk_distance_calculator as risk_module
+from utils.risk_distance_calculator import RiskDistanceCalculator
+from services.risk_scoring_service import score_users
+
+FEATURES = RiskDistanceCalculator([]).feature_cols
+
+
+def make_users(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return [dict(zip(FEATURES, row)) for row in rng.uniform(0, 100, size=(n, len(FEATURES))).tolist()]
+
+
+class TestBatchScoring(unittest.TestCase):
+
+    def setUp(self):
+        risk_module.risk_calculator = RiskDistanceCalculator(make_users(500))
+
+    def tearDown(self):
+        risk_module.risk_calculator = None
+
+    def test_matches_single_user_scoring(self):
+        users = make_users(200, seed=4) + [{col: 1000 for col in FEATURES}, {}]
+        report = score_users(None, users)
+        self.assertEqual(report['received'], len(users))
+        for user, result in zip(users, report['results']):
+            expected = risk_module.risk_calculator.calculate_risk_distance(user)
+            self.assertEqual({field: result[field] for field in expected}, expected)
+        self.assertEqual(report['results'][200]['risk_category'], 'Very High')
+        self.assertNotIn('updated', report)
+
+    def test_requires_initialized_model(self):
+        risk_module.risk_calculator.non_defaulter_centroids = None
+        with self.assertRaises(RuntimeError):
+            risk_module.risk_calculator.calculate_risk_distances(make_users(2))
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            score_users(None, [{'risk_level': 'high'}])
+        with self.assertRaises(ValueError):
+            score_users(None, make_users(2), write_back=True)
+
+
+class TestWriteBack(unittest.TestCase):
+
+    def setUp(self):
+        risk_module.risk_calculator = RiskDistanceCalculator(make_users(500))
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        session = self.Session()
+        for n in range(3):
+            seed_loan(session, f"loan-{n}", date(2024, 1, 15), user_id=f"user-{n}")
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        risk_module.risk_calculator = None
+        self.engine.dispose()
+
+    def test_updates_metadata_in_bulk(self):
+        users = [{'loan_id': f"loan-{n}", **user} for n, user in enumerate(make_users(3))]
+        users.append({'loan_id': 'loan-missing', **make_users(1)[0]})
+        session = self.Session()
+        report = score_users(session, users, write_back=True, chunk_size=2)
+        session.close()
+
+        self.assertEqual((report['updated'], report['not_found'], report['failed']), (3, 1, 0))
+        self.assertEqual([r['write'] for r in report['results']], ['updated'] * 3 + ['not_found'])
+
+        session = self.Session()
+        stored = {row.loan_id: row for row in session.execute(select(LoanMetadata)).scalars()}
+        session.close()
+        for result in report['results'][:3]:
+            row = stored[result['loan_id']]
+            self.assertAlmostEqual(float(row.risk_distance), result['risk_distance'])
+            self.assertAlmostEqual(float(row.risk_score), result['risk_score'])
+            self.assertEqual((row.risk_category, row.closest_cluster), (result['risk_category'], result['closest_cluster']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.risk_model_event import RiskModelEvent
+from services.payment_service import record_payment
+from services.payment_ingest_service import ingest_payments
+from services.risk_update_service import queue_finished_loans, apply_model_updates, query_feature_lookup
+from services.risk_model_store import load_published_model
+from utils import risk_distance_calculator as risk_module
+from utils.risk_distance_calculator import RiskDistanceCalculator, save_model, load_model, refresh_risk_calculator
+
+FEATURES = RiskDistanceCalculator([]).feature_cols
+
+
+def make_users(n, seed=0, center=50.0):
+    rng = np.random.default_rng(seed)
+    return [dict(zip(FEATURES, row)) for row in rng.normal(center, 10, size=(n, len(FEATURES))).tolist()]
+
+
+class TestFinishedLoanEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        session = self.Session()
+        # loan-a pays its second of three periods, loan-b its last of two
+        seed_loan(session, 'loan-a', date(2024, 2, 25), rows={1: {'status': 'payed', 'outstanding_balance': 0.0}})
+        seed_loan(session, 'loan-b', date(2024, 2, 25), periods=2, user_id='user-b',
+                  rows={1: {'status': 'payed', 'outstanding_balance': 0.0}})
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def events(self):
+        session = self.Session()
+        try:
+            return [(e.loan_id, e.user_id) for e in session.execute(select(RiskModelEvent)).scalars()]
+        finally:
+            session.close()
+
+    def test_record_payment_queues_paid_off_loans_once(self):
+        with patch('services.payment_service.get_payment_date', return_value=date(2024, 3, 20)):
+            for loan_id, document_id in (('loan-a', 'doc-1'), ('loan-b', 'doc-2'), ('loan-b', 'doc-3')):
+                record_payment({'loan_id': loan_id, 'installment': 1000, 'document_id': document_id})
+        self.assertEqual(self.events(), [('loan-b', 'user-b')])
+
+    def test_partial_payment_does_not_finish(self):
+        with patch('services.payment_service.get_payment_date', return_value=date(2024, 3, 20)):
+            record_payment({'loan_id': 'loan-b', 'installment': 400, 'document_id': 'doc-1'})
+        self.assertEqual(self.events(), [])
+
+    def test_batch_ingestion_queues_paid_off_loans(self):
+        session = self.Session()
+        ingest_payments(session, [{'loan_id': 'loan-a', 'installment': 1000}, {'loan_id': 'loan-b', 'installment': 1000}],
+                        payment_date=date(2024, 3, 20))
+        session.close()
+        self.assertEqual(self.events(), [('loan-b', 'user-b')])
+
+
+class TestApplyModelUpdates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'risk_model.json')
+        save_model(RiskDistanceCalculator(make_users(1000)), self.path)
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        session = self.Session()
+        queue_finished_loans(session, {'loan-1': 'user-1', 'loan-2': 'user-2'})
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def lookup(self, user_ids):
+        features = {'user-1': make_users(1, seed=9)[0]}
+        return {u: features[u] for u in user_ids if u in features}
+
+    def test_folds_events_and_publishes_state(self):
+        session = self.Session()
+        report = apply_model_updates(session, self.lookup, model_path=self.path, batch_size=1)
+        self.assertEqual((report['events'], report['applied'], report['no_features']), (2, 1, 1))
+        self.assertEqual(report['drift']['online_updates'], 1)
+        self.assertFalse(report['drift']['retrain_recommended'])
+
+        outcomes = dict(session.execute(select(RiskModelEvent.loan_id, RiskModelEvent.outcome)).all())
+        self.assertEqual(outcomes, {'loan-1': 'applied', 'loan-2': 'no_features'})
+        self.assertEqual(apply_model_updates(session, lambda user_ids: {}, model_path=self.path)['events'], 0)
+
+        published = load_published_model(session)
+        session.close()
+        self.assertEqual((published.model_info['rows'], published.model_info['online_updates']), (1001, 1))
+        self.assertEqual(load_model(self.path).model_info.get('online_updates', 0), 0)
+
+    def test_failed_batch_is_neither_published_nor_marked(self):
+        """The published model and the events' marks commit together, so a retry folds each event once"""
+        session = self.Session()
+        with patch('services.risk_update_service._mark_events', side_effect=SQLAlchemyError('connection lost')):
+            with self.assertRaises(SQLAlchemyError):
+                apply_model_updates(session, self.lookup, model_path=self.path)
+        session.rollback()
+        self.assertIsNone(load_published_model(session))
+
+        report = apply_model_updates(session, self.lookup, model_path=self.path)
+        self.assertEqual((report['events'], report['applied']), (2, 1))
+        self.assertEqual(load_published_model(session).model_info['online_updates'], 1)
+        session.close()
+
+    def test_refresh_picks_up_published_updates(self):
+        """Lambdas load the updated model on refresh even though the bundled file is unchanged"""
+        with patch('database.SessionLocal', self.Session), patch.dict(os.environ, {'RISK_MODEL_PATH': self.path}):
+            self.assertEqual(refresh_risk_calculator().get('online_updates', 0), 0)
+            before = risk_module.risk_calculator.non_defaulter_centroids
+
+            session = self.Session()
+            apply_model_updates(session, self.lookup)
+            session.close()
+
+            self.assertEqual(refresh_risk_calculator()['online_updates'], 1)
+            self.assertFalse(np.array_equal(risk_module.risk_calculator.non_defaulter_centroids, before))
+
+            # A newer full training shipped in the bundle wins over the published updates
+            retrained = RiskDistanceCalculator(make_users(500, seed=3))
+            retrained.model_info['trained_at'] = '2999-01-01T00:00:00+00:00'
+            save_model(retrained, self.path)
+            self.assertEqual(refresh_risk_calculator()['trained_at'], '2999-01-01T00:00:00+00:00')
+        risk_module.risk_calculator = None
+
+    def test_feature_lookup_query(self):
+        with self.engine.begin() as connection:
+            connection.execute(text(f"CREATE TABLE survey (user_id TEXT, {', '.join(f'{c} FLOAT' for c in FEATURES)})"))
+            connection.execute(text(f"INSERT INTO survey VALUES (:user_id, {', '.join(f':{c}' for c in FEATURES)})"),
+                               [{'user_id': 'user-1', **make_users(1)[0]}])
+        lookup = query_feature_lookup(self.Session, text('SELECT * FROM survey WHERE user_id IN :user_ids'))
+        self.assertEqual(list(lookup(['user-1', 'user-2'])), ['user-1'])
+        session = self.Session()
+        report = apply_model_updates(session, lookup, model_path=self.path)
+        session.close()
+        self.assertEqual(report['applied'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from secrets_provider import SecretsProvider, encrypt_snapshot, decrypt_snapshot
+
+
+def mock_response(bundle):
+    response = Mock()
+    response.json.return_value = bundle
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestSecretsProvider(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a provider writing its snapshot to a temp dir"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.tmpdir.name, 'secrets.bin')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_provider(self, ttl=300):
+        return SecretsProvider('token-123', ttl=ttl, timeout=1, snapshot_path=self.snapshot_path)
+
+    @patch('secrets_provider.requests.get')
+    def test_bundle_fetched_once_for_many_keys(self, mock_get):
+        """Reading several secrets should only download the bundle once"""
+        mock_get.return_value = mock_response({'DATABASE_URL': 'postgresql://db', 'API_KEY': 'k'})
+        provider = self.make_provider()
+
+        self.assertEqual(provider.get('DATABASE_URL'), 'postgresql://db')
+        self.assertEqual(provider.get('API_KEY'), 'k')
+        self.assertEqual(provider.get('MISSING', 'fallback'), 'fallback')
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], 1)
+        self.assertIsNotNone(provider.stats['last_fetch_ms'])
+
+    @patch('secrets_provider.requests.get')
+    def test_snapshot_used_on_cold_start(self, mock_get):
+        """A new provider should load the /tmp snapshot instead of the network"""
+        mock_get.return_value = mock_response({'API_KEY': 'from-network'})
+        self.make_provider().get('API_KEY')
+        mock_get.reset_mock()
+
+        provider = self.make_provider()
+        self.assertEqual(provider.get('API_KEY'), 'from-network')
+        mock_get.assert_not_called()
+        self.assertEqual(provider.stats['snapshot_loads'], 1)
+
+    @patch('secrets_provider.requests.get')
+    def test_stale_bundle_served_while_refreshing(self, mock_get):
+        """Stale bundles are returned immediately and refreshed in the background"""
+        mock_get.return_value = mock_response({'API_KEY': 'old'})
+        provider = self.make_provider(ttl=0)
+        self.assertEqual(provider.get('API_KEY'), 'old')
+
+        mock_get.return_value = mock_response({'API_KEY': 'new'})
+        self.assertEqual(provider.get('API_KEY'), 'old')
+        provider._refresh_thread.join(timeout=5)
+        self.assertEqual(provider.stats['background_refreshes'], 1)
+        self.assertEqual(provider._bundle['API_KEY'], 'new')
+
+    @patch('secrets_provider.requests.get')
+    def test_failed_refresh_keeps_previous_bundle(self, mock_get):
+        """A Doppler outage should not drop secrets that were already loaded"""
+        mock_get.return_value = mock_response({'API_KEY': 'cached'})
+        provider = self.make_provider()
+        provider.get('API_KEY')
+
+        mock_get.side_effect = Exception('timeout')
+        self.assertFalse(provider._refresh())
+        self.assertEqual(provider.get('API_KEY'), 'cached')
+        self.assertEqual(provider.stats['fetch_failures'], 1)
+
+    @patch('secrets_provider.requests.get')
+    def test_snapshot_owner_only_and_tied_to_token(self, mock_get):
+        """Snapshots are encrypted, written 0600 and ignored for another token or looser permissions"""
+        mock_get.return_value = mock_response({'API_KEY': 'secret'})
+        self.make_provider().get('API_KEY')
+        self.assertEqual(os.stat(self.snapshot_path).st_mode & 0o777, 0o600)
+        with open(self.snapshot_path, 'rb') as f:
+            self.assertNotIn(b'secret', f.read())
+
+        other = SecretsProvider('other-token', snapshot_path=self.snapshot_path)
+        self.assertIsNone(other._load_snapshot())
+
+        os.chmod(self.snapshot_path, 0o644)
+        self.assertIsNone(self.make_provider()._load_snapshot())
+
+    @patch('secrets_provider.requests.get')
+    def test_failed_bootstrap_backs_off(self, mock_get):
+        """After a failed first load, reads return at once until the backoff expires"""
+        mock_get.side_effect = Exception('timeout')
+        provider = self.make_provider()
+        self.assertIsNone(provider.get('API_KEY'))
+        self.assertIsNone(provider.get('API_KEY'))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(provider.stats['backoff_skips'], 1)
+
+        provider._retry_at = time.monotonic()
+        self.assertIsNone(provider.get('API_KEY'))
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(provider._backoff, 2.0)
+
+        mock_get.side_effect = None
+        mock_get.return_value = mock_response({'API_KEY': 'recovered'})
+        provider._retry_at = time.monotonic()
+        self.assertEqual(provider.get('API_KEY'), 'recovered')
+        self.assertEqual(provider._backoff, 0.0)
+
+    def test_snapshot_encryption_round_trip(self):
+        """Snapshots decrypt with the same token and reject tampering or other tokens"""
+        blob = encrypt_snapshot('token-123', b'{"API_KEY": "secret"}')
+        self.assertNotIn(b'secret', blob)
+        self.assertEqual(decrypt_snapshot('token-123', blob), b'{"API_KEY": "secret"}')
+        self.assertIsNone(decrypt_snapshot('other-token', blob))
+
+        tampered = blob[:-1] + bytes([blob[-1] ^ 1])
+        self.assertIsNone(decrypt_snapshot('token-123', tampered))
+        self.assertIsNone(decrypt_snapshot('token-123', b'short'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from utils.serialization import get_serializer, dumps
+from utils.table_utils import serialize_dates
+
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, Session = make_sqlite_sessionmaker()
+        self.session = Session()
+        seed_loan(self.session, 'loan-a', date(2024, 1, 15), rows={1: {'payment_date': date(2024, 1, 10)}})
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_matches_to_dict_for_both_models(self):
+        """Column-tuple output equals to_dict with dates as ISO strings"""
+        for model in (LoanTables, LoanMetadata):
+            serializer = get_serializer(model)
+            fast = serializer.convert_all(self.session.execute(serializer.select().order_by(model.nrow)).all())
+            legacy = [serialize_dates(row.to_dict()) for row in self.session.query(model).order_by(model.nrow)]
+            self.assertEqual(fast, legacy)
+
+    def test_dates_and_nulls_converted(self):
+        """Dates become ISO strings, NULLs stay None"""
+        serializer = get_serializer(LoanTables)
+        row = serializer.convert(self.session.execute(serializer.select().order_by(LoanTables.nrow)).first())
+        self.assertEqual(row['due_date'], '2024-01-15')
+        self.assertEqual(row['payment_date'], '2024-01-10')
+        self.assertIsNone(row['calc_installment'])
+        self.assertIsInstance(row['installment'], float)
+
+    def test_dumps_handles_dates_and_decimals(self):
+        """The response encoder accepts raw dates and decimals"""
+        body = dumps({'d': date(2024, 1, 15), 't': datetime(2024, 1, 15, 8, 30), 'n': Decimal('10.50')})
+        self.assertEqual(json.loads(body), {'d': '2024-01-15', 't': '2024-01-15T08:30:00', 'n': 10.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
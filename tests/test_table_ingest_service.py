@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import copy
+from datetime import date
+from unittest.mock import MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from services.table_ingest_service import save_tables
+from utils.bulk_utils import copy_rows
+from utils.table_utils import prepare_data, prepare_loan_columns, SCHEDULE_COLUMNS, METADATA_COLUMNS
+
+
+def make_loan(user_id='user-1', periods=3, loan_id=None):
+    metadata = {
+        'user_id': user_id, 'amount': '3000', 'term': periods, 'rate': 24, 'risk_distance': 1.5,
+        'risk_score': 20, 'risk_category': 'Low', 'closest_cluster': 1, 'user_risk': 75,
+    }
+    if loan_id:
+        metadata['loan_id'] = loan_id
+    data = [{
+        'due_date': f"2024-0{period}-15", 'service_fee': '1,5', 'insurance_fee': 2, 'interest': 60,
+        'principal': 1000, 'installment': 1063.5, 'period': period, 'balance': 3000 - 1000 * period,
+    } for period in range(1, periods + 1)]
+    return {'metadata': metadata, 'data': data}
+
+
+class TestPrepareLoanColumns(unittest.TestCase):
+
+    def test_matches_prepare_data(self):
+        """The columnar conversion stores what save_table's prepare_data stores"""
+        loan = make_loan(loan_id='loan-a')
+        loan_id, schedule, metadata = prepare_loan_columns(copy.deepcopy(loan))
+        rows, expected_metadata = prepare_data(loan)
+
+        for row, expected in zip(schedule, rows):
+            values = dict(zip(SCHEDULE_COLUMNS, row))
+            expected['loan_id'] = loan_id
+            self.assertEqual(values, {c: expected.get(c) for c in SCHEDULE_COLUMNS})
+        expected_metadata['loan_id'] = loan_id
+        self.assertEqual(dict(zip(METADATA_COLUMNS, metadata)), {c: expected_metadata[c] for c in METADATA_COLUMNS})
+
+    def test_rejects_bad_loans(self):
+        loan = make_loan()
+        del loan['data'][1]['principal']
+        with self.assertRaisesRegex(ValueError, 'principal'):
+            prepare_loan_columns(loan)
+        with self.assertRaisesRegex(ValueError, 'empty'):
+            prepare_loan_columns({'metadata': make_loan()['metadata'], 'data': []})
+        with self.assertRaisesRegex(ValueError, 'user_risk'):
+            prepare_loan_columns({**make_loan(), 'metadata': {**make_loan()['metadata'], 'user_risk': None}})
+
+
+class TestSaveTables(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.session = self.Session()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_saves_loans_with_results(self):
+        """Valid loans are stored and invalid ones reported by index"""
+        report = save_tables(self.session, [make_loan('user-1'), {'metadata': {}}, make_loan('user-2', periods=2)])
+
+        self.assertEqual([r['code'] for r in report['results']], ['saved', 'invalid', 'saved'])
+        self.assertEqual((report['saved'], report['rejected'], report['rows']), (2, 1, 5))
+        self.assertEqual(self.session.query(LoanTables).count(), 5)
+        metadata = self.session.query(LoanMetadata).filter_by(user_id='user-2').one()
+        self.assertEqual((metadata.loan_id, metadata.end_date), (report['results'][2]['loan_id'], date(2024, 2, 15)))
+
+    def test_failed_chunk_rolls_back_alone(self):
+        """A chunk that violates the unique loan_id is rejected without losing earlier chunks"""
+        report = save_tables(self.session, [
+            make_loan(loan_id='loan-a'), make_loan(loan_id='loan-b'), make_loan(loan_id='loan-b'),
+        ], chunk_size=2)
+
+        self.assertEqual([r['code'] for r in report['results']], ['saved', 'saved', 'failed'])
+        self.assertEqual(self.session.query(LoanMetadata).count(), 2)
+
+
+class FakeDbapiError(Exception):
+    pass
+
+
+class TestSaveTablesCopyFailure(unittest.TestCase):
+
+    def test_copy_error_rejects_chunk_and_continues(self):
+        """A DBAPI error raised by COPY rolls back that chunk only and the report is kept"""
+        session = MagicMock()
+        session.get_bind.return_value.dialect.dbapi.Error = FakeDbapiError
+        connection = session.connection.return_value
+        connection.dialect.name, connection.dialect.driver = 'postgresql', 'psycopg2'
+        cursor = connection.connection.dbapi_connection.cursor.return_value.__enter__.return_value
+        cursor.copy_expert.side_effect = [
+            FakeDbapiError('duplicate key value violates unique constraint "ux_loan_metadata_loan_id"'),
+            None, None,
+        ]
+
+        report = save_tables(session, [make_loan(loan_id='loan-a'), make_loan(loan_id='loan-b')], chunk_size=1)
+
+        self.assertEqual([r['code'] for r in report['results']], ['failed', 'saved'])
+        self.assertEqual((report['saved'], report['rejected'], report['rows']), (1, 1, 3))
+        session.rollback.assert_called_once()
+        session.commit.assert_called_once()
+
+
+class TestCopyRows(unittest.TestCase):
+
+    def test_postgres_uses_copy(self):
+        """psycopg2 connections stream rows through COPY in text format"""
+        session = MagicMock()
+        connection = session.connection.return_value
+        connection.dialect.name, connection.dialect.driver = 'postgresql', 'psycopg2'
+        cursor = connection.connection.dbapi_connection.cursor.return_value.__enter__.return_value
+        captured = {}
+        cursor.copy_expert.side_effect = lambda sql, buffer: captured.update(sql=sql, body=buffer.read())
+
+        copy_rows(session, LoanTables.__table__, ['loan_id', 'calc_installment', 'due_date', 'status'], [
+            ('loan-a', None, date(2024, 1, 15), ''),
+            ('loan\tb', 1.5, date(2024, 2, 15), 'pending'),
+        ])
+
+        self.assertEqual(captured['sql'], 'COPY loan_tables (loan_id, calc_installment, due_date, status) FROM STDIN')
+        self.assertEqual(captured['body'], 'loan-a\t\\N\t2024-01-15\t\nloan\\tb\t1.5\t2024-02-15\tpending\n')
+        session.execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
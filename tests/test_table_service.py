@@ -0,0 +1,150 @@
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tests.db_fixtures import make_sqlite_sessionmaker, seed_loan
+from models.loan_tables import LoanTables
+from models.loan_metadata import LoanMetadata
+from services.table_service import (
+    get_tables, get_metadata, iter_tables, iter_metadata, encode_cursor, decode_cursor, MAX_PAGE_SIZE, parse_limit,
+    save_table
+)
+
+
+class TestTablePagination(unittest.TestCase):
+
+    def setUp(self):
+        """Two users with three-period loans on an in-memory database"""
+        self.engine, Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', Session)
+        self.patcher.start()
+        session = Session()
+        seed_loan(session, 'loan-a', date(2024, 1, 15), user_id='user-1')
+        seed_loan(session, 'loan-b', date(2024, 1, 15), user_id='user-2', rows={2: {'status': 'late'}})
+        seed_loan(session, 'loan-c', date(2024, 1, 15), user_id='user-1')
+        session.close()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def test_first_page_without_parameters(self):
+        """Callers that send no parameters get a bounded first page"""
+        with patch('services.table_service.DEFAULT_PAGE_SIZE', 4):
+            page = get_tables()
+            self.assertEqual(len(page['items']), 4)
+            self.assertIsNotNone(page['next_cursor'])
+            self.assertEqual(len(get_metadata()['items']), 3)
+
+    def test_legacy_shape_on_request(self):
+        """all=true still returns the full list"""
+        rows = get_tables({'all': 'true'})
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[0]['due_date'], '2024-01-15')
+        self.assertEqual(len(get_metadata({'all': 'true'})), 3)
+
+    def test_pages_follow_cursor_until_exhausted(self):
+        """Following next_cursor visits every row exactly once"""
+        seen, cursor = [], None
+        while True:
+            params = {'limit': '4'}
+            if cursor:
+                params['after'] = cursor
+            page = get_tables(params)
+            seen.extend((r['loan_id'], r['period']) for r in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(len(set(seen)), 9)
+
+    def test_filters(self):
+        """loan_id, user_id and status filters narrow both endpoints"""
+        self.assertEqual(len(get_tables({'loan_id': 'loan-a'})['items']), 3)
+        self.assertEqual({r['loan_id'] for r in get_tables({'user_id': 'user-1'})['items']}, {'loan-a', 'loan-c'})
+        self.assertEqual([r['period'] for r in get_tables({'status': 'late'})['items']], [2.0])
+        self.assertEqual([m['loan_id'] for m in get_metadata({'user_id': 'user-2'})['items']], ['loan-b'])
+        self.assertEqual([m['loan_id'] for m in get_metadata({'status': 'late'})['items']], ['loan-b'])
+
+    def test_invalid_cursor_and_limit(self):
+        """Bad pagination parameters raise ValueError for a 400 response"""
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+        with self.assertRaises(ValueError):
+            get_tables({'after': 'not-a-cursor'})
+        with self.assertRaises(ValueError):
+            get_metadata({'limit': 'ten'})
+        self.assertEqual(parse_limit('999999'), MAX_PAGE_SIZE)
+
+    def test_streaming_mode(self):
+        """Generators yield every matching row"""
+        self.assertEqual(len(list(iter_tables(batch_size=2))), 9)
+        self.assertEqual([m['loan_id'] for m in iter_metadata({'user_id': 'user-1'})], ['loan-a', 'loan-c'])
+
+
+
+class TestSaveTableFromTerms(unittest.TestCase):
+
+    def setUp(self):
+        self.engine, self.Session = make_sqlite_sessionmaker()
+        self.patcher = patch('database.SessionLocal', self.Session)
+        self.patcher.start()
+        self.metadata = {
+            'user_id': 'user-1', 'risk_distance': 1.2, 'risk_score': 20, 'risk_category': 'Low',
+            'closest_cluster': 0,
+        }
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def test_schedule_generated_by_period(self):
+        """Only the terms are posted; rows, rate and totals are produced server-side"""
+        result = save_table({'metadata': self.metadata, 'terms': {
+            'amount': 1000, 'term': 3, 'user_risk': 75, 'service_fee': 5, 'insurance_fee': 2,
+        }})
+        self.assertEqual(result['rows'], 3)
+
+        session = self.Session()
+        rows = session.query(LoanTables).filter_by(loan_id=result['loan_id']).order_by(LoanTables.period).all()
+        metadata = session.query(LoanMetadata).filter_by(loan_id=result['loan_id']).one()
+        session.close()
+        self.assertEqual([float(r.installment) for r in rows], [353.19] * 3)
+        self.assertAlmostEqual(sum(float(r.principal) for r in rows), 1000.0, places=2)
+        self.assertEqual((float(metadata.rate), float(metadata.term), float(metadata.balance)), (23.0, 3.0, 1000.0))
+        self.assertEqual(rows[0].status, 'pending')
+
+    def test_schedule_generated_by_instalment(self):
+        result = save_table({'metadata': self.metadata, 'terms': {'amount': 1000, 'instalment': 350, 'user_risk': 75}})
+        self.assertEqual(result['rows'], 3)
+
+    def test_fractional_amount_kept(self):
+        """The schedule's principal adds up to a non-integer amount stored in the metadata"""
+        result = save_table({'metadata': self.metadata, 'terms': {'amount': 1500.75, 'term': 3, 'user_risk': 75}})
+
+        session = self.Session()
+        rows = session.query(LoanTables).filter_by(loan_id=result['loan_id']).all()
+        metadata = session.query(LoanMetadata).filter_by(loan_id=result['loan_id']).one()
+        session.close()
+        self.assertAlmostEqual(sum(float(r.principal) for r in rows), 1500.75, places=2)
+        self.assertEqual((float(metadata.amount), float(metadata.balance)), (1500.75, 1500.75))
+
+    def test_incomplete_terms(self):
+        """Missing or malformed terms raise ValueError for a 400 response"""
+        for terms, message in [
+            ({'amount': 1000, 'user_risk': 75}, 'term or instalment'),
+            ({'amount': 1000, 'term': 3}, 'user_risk'),
+            ({'amount': 1000, 'term': [1], 'user_risk': 75}, 'invalid terms value'),
+            ({'amount': 1000, 'term': 2.5, 'user_risk': 75}, 'whole number'),
+            ({'amount': 1000, 'instalment': -5, 'user_risk': 75}, 'instalment must be positive'),
+        ]:
+            with self.assertRaisesRegex(ValueError, message):
+                save_table({'metadata': self.metadata, 'terms': terms})
+
+
+if __name__ == '__main__':
+    unittest.main()